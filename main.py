@@ -1,4 +1,4 @@
-import asyncio
+import threading
 import time
 
 import cv2
@@ -43,15 +43,12 @@ def main():
     dpg.bind_theme(theme=settings.createDialogTheme())
     dpg.show_viewport()
 
-    def asyncMain():
-        editor.update()
-
-    loop = asyncio.new_event_loop()
-    loop.run_in_executor(None, asyncMain)
+    # a daemon thread, so a node that never returns from update() or close() doesn't keep the app alive
+    threading.Thread(target=editor.update, daemon=True).start()
 
     while dpg.is_dearpygui_running():
         dpg.render_dearpygui_frame()
-        time.sleep(0.033)
+        time.sleep(1 / settings.displayRefreshRate)
 
     editor.terminate()
     dpg.destroy_context()
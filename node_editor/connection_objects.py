@@ -21,6 +21,7 @@ class NodeAttribute:
         self._blocked: bool = False
         self._attrType = attrType
         self._data: Union[np.ndarray, None] = None
+        self._version: int = 0
         self._connections: list[Connection] = list()
 
     @property
@@ -39,6 +40,18 @@ class NodeAttribute:
     def data(self, value: Union[np.ndarray, None]):
         if value is not None:
             self._data = value
+            self._version += 1
+
+    @property
+    def version(self):
+        """number of times data was set; an input attribute carries the version of the output it is connected to"""
+        return self._version
+
+    def copyFrom(self, other: "NodeAttribute"):
+        """take over a copy of the data of another attribute together with its version"""
+        if other.data is not None:
+            self._data = other.data.copy()
+            self._version = other.version
 
     @property
     def blocked(self):
@@ -130,11 +143,17 @@ class Tree:
         self._nodes: list[TreeNode] = list()
         self._connections: list[Connection] = list()
         self._tagToEntityMap: dict = dict()
+        self._updatingNode: Union[TreeNode, None] = None
 
     @property
     def levels(self):
         return self._levels
 
+    @property
+    def updatingNode(self):
+        """the node whose update function runs right now, None between passes"""
+        return self._updatingNode
+
     @property
     def nodes(self):
         return self._nodes
@@ -173,8 +192,7 @@ class Tree:
             for node in level:
                 for outAttr in node.outAttrs:
                     for connection in outAttr.connections:
-                        connection.targetAttr.data = \
-                            None if connection.originAttr.data is None else connection.originAttr.data.copy()
+                        connection.targetAttr.copyFrom(other=connection.originAttr)
 
     def updateNodes(self):
         newLevels = list()
@@ -190,7 +208,9 @@ class Tree:
         newLevels.reverse()
         for level in newLevels:
             for node in level:
+                self._updatingNode = node
                 node.updateFcn()
+        self._updatingNode = None
 
     def __traceBranch(self, node: TreeNode, levelsDict: dict, counter: int):
         counter += 1
@@ -212,13 +232,13 @@ class Tree:
 
     def removeNodeByTag(self, tag: int):
         node = self._tagToEntityMap[tag]
-        for connection in node.connections:
+        for connection in list(node.connections):
             self.removeConnectionByObject(connection=connection)
         self._nodes.remove(node)
         del self._tagToEntityMap[tag]
 
     def removeNodeByObject(self, node: TreeNode):
-        for connection in node.connections:
+        for connection in list(node.connections):
             self.removeConnectionByObject(connection=connection)
         self._nodes.remove(node)
         del self._tagToEntityMap[node.tag]
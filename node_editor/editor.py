@@ -1,3 +1,4 @@
+import threading
 import time
 from importlib.util import spec_from_file_location, module_from_spec
 from pathlib import Path
@@ -9,6 +10,9 @@ from settings import AppSettings
 
 
 class NodeEditor(object):
+    # seconds terminate() waits for the graph thread to close the nodes
+    _terminateTimeout: float = 10.0
+
     def __init__(self,
                  settings: AppSettings,
                  menuDict: dict,
@@ -26,6 +30,11 @@ class NodeEditor(object):
         self._lastPos: tuple = (0, 0)
         self._paused: bool = False
         self._nodesPlannedToBeClosed: list = list()
+        # cleared while update() runs on the graph thread, terminate() waits for it
+        self._updateStopped = threading.Event()
+        self._updateStopped.set()
+        # the node __removeNodes() is closing right now
+        self._closingNode = None
 
         self._editorContextMenuTag: int = self.getUniqueTag()
 
@@ -103,9 +112,21 @@ class NodeEditor(object):
         self._paused = False
 
     def terminate(self):
+        """stop the graph and close every node, which finishes the files the writers still have open
+
+        blocks until the graph thread is done, as the nodes delete their items when they close, but
+        for no longer than _terminateTimeout seconds
+        """
         self._paused = True
-        self._nodesPlannedToBeClosed.extend(list(self._nodeTagToNodeMap.values()))
+        self._nodesPlannedToBeClosed.extend(list(self._nodeTagToNodeMap.keys()))
         self._terminated = True
+        if not self._updateStopped.wait(timeout=self._terminateTimeout):
+            print(f"exiting without waiting for the graph, {self.__busyNodeName()} did not finish "
+                  f"within {self._terminateTimeout:.0f} s")
+            return
+        if self._nodesPlannedToBeClosed:
+            # the graph thread never ran or stopped on an error
+            self.__removeNodes()
 
     def __callbackAddNode(self, sender, data, user_data):
         # user_data is a node constructor
@@ -128,12 +149,25 @@ class NodeEditor(object):
                 self.callbackRemoveLink(None, linkTag)
 
     def __removeNodes(self):
-        for nodeTag in self._nodesPlannedToBeClosed:
-            node = self._tree.getNodeByTag(tag=nodeTag)
-            del self._nodeTagToNodeMap[nodeTag]
-            dpg.delete_item(item=node.tag)
-            self._tree.removeNodeByObject(node=node)
-        self._nodesPlannedToBeClosed.clear()
+        # the UI thread may add tags meanwhile, and a node may be selected for deletion twice
+        while self._nodesPlannedToBeClosed:
+            nodeTag = self._nodesPlannedToBeClosed.pop(0)
+            nodeObj = self._nodeTagToNodeMap.pop(nodeTag, None)
+            if nodeObj is None:
+                continue
+            self._tree.removeNodeByObject(node=self._tree.getNodeByTag(tag=nodeTag))
+            # the node stops its threads, servers and writers and deletes its own items
+            self._closingNode = nodeObj
+            nodeObj.close()
+            self._closingNode = None
+
+    def __busyNodeName(self) -> str:
+        nodeObj = self._closingNode
+        if nodeObj is None and self._tree.updatingNode is not None:
+            nodeObj = self._nodeTagToNodeMap.get(self._tree.updatingNode.tag)
+        if nodeObj is None:
+            return "the graph thread"
+        return f"the {nodeObj.nodeLabel} node {nodeObj.tag}"
 
     def __callbackAddLink(self, _, data):
         # data is (outAttrTag, inAttrTag)
@@ -161,23 +195,30 @@ class NodeEditor(object):
         dpg.delete_item(item=data)
 
     def update(self):
-        while not self._terminated:
-            if self._paused:
-                time.sleep(0.3)
-                continue
+        self._updateStopped.clear()
+        try:
+            while not self._terminated:
+                if self._paused:
+                    time.sleep(0.3)
+                    continue
+                if self._nodesPlannedToBeClosed:
+                    self.__removeNodes()
+                if self._tree.connections:
+
+                    self._tree.updateLevels()
+                    if not self._tree.levels:
+                        continue
+                    self._tree.updateConnections()
+                    self._tree.updateNodes()
+                else:
+                    time.sleep(0.3)
             if self._nodesPlannedToBeClosed:
                 self.__removeNodes()
-            if self._tree.connections:
+        finally:
+            self._updateStopped.set()
 
-                self._tree.updateLevels()
-                if not self._tree.levels:
-                    continue
-                self._tree.updateConnections()
-                self._tree.updateNodes()
-            else:
-                time.sleep(0.3)
-        if self._nodesPlannedToBeClosed:
-            self.__removeNodes()
+    def getNode(self, tag: int):
+        return self._nodeTagToNodeMap.get(tag)
 
     def getUniqueTag(self):
         tag = self._counter
@@ -89,6 +89,9 @@ class Node(NodeBase):
 
         self.__resize()
 
+    def requestedInputSize(self):
+        return self._desiredWidth, self._desiredHeight
+
     def __resize(self):
         if self._currentImage is None:
             return
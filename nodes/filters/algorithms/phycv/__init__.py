@@ -1,7 +1,6 @@
+from .backends import *
+from .engine import *
 from .page import *
-from .page_gpu import *
 from .pst import *
-from .pst_gpu import *
 from .utils import *
 from .vevid import *
-from .vevid_gpu import *
@@ -0,0 +1,222 @@
+from typing import Union
+
+import cv2
+import numpy as np
+
+
+class Backend:
+    """common array interface the phycv engines are written against
+
+    Every operation works on the last two axes, so a single (H, W) image and a stack of
+    (N, H, W) images (or (N, bins, H, W) kernels) go through the same code path.
+    """
+    name: str = str()
+    xp = None
+
+    def as_array(self, img: np.ndarray):
+        raise NotImplementedError
+
+    def to_numpy(self, x) -> np.ndarray:
+        raise NotImplementedError
+
+    def frequency_grid(self, height: int, width: int) -> tuple:
+        raise NotImplementedError
+
+    def fft2(self, x):
+        raise NotImplementedError
+
+    def ifft2(self, x):
+        raise NotImplementedError
+
+    def fftshift(self, x):
+        raise NotImplementedError
+
+    def angle(self, x):
+        raise NotImplementedError
+
+    def frame_min(self, x):
+        raise NotImplementedError
+
+    def frame_max(self, x):
+        raise NotImplementedError
+
+    def frame_quantile(self, x, q: float):
+        raise NotImplementedError
+
+    def as_float(self, x):
+        raise NotImplementedError
+
+    def stack(self, arrays: list, axis: int = 0):
+        raise NotImplementedError
+
+    def channels_last(self, x):
+        raise NotImplementedError
+
+    def resize(self, x, height: int, width: int, area: bool = False):
+        """resize the last two axes of a real array, with pixel area averaging (for decimation) or bicubically"""
+        raise NotImplementedError
+
+
+class NumpyBackend(Backend):
+    name = "numpy"
+    xp = np
+
+    def as_array(self, img: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(img, dtype=np.float32)
+
+    def to_numpy(self, x: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(x)
+
+    def frequency_grid(self, height: int, width: int) -> tuple[np.ndarray, np.ndarray]:
+        u = np.linspace(-0.5, 0.5, height, dtype=np.float32)
+        v = np.linspace(-0.5, 0.5, width, dtype=np.float32)
+        return tuple(np.meshgrid(u, v, indexing="ij"))
+
+    def fft2(self, x: np.ndarray) -> np.ndarray:
+        return np.fft.fft2(x, axes=(-2, -1))
+
+    def ifft2(self, x: np.ndarray) -> np.ndarray:
+        return np.fft.ifft2(x, axes=(-2, -1))
+
+    def fftshift(self, x: np.ndarray) -> np.ndarray:
+        return np.fft.fftshift(x, axes=(-2, -1))
+
+    def angle(self, x: np.ndarray) -> np.ndarray:
+        return np.angle(x)
+
+    def frame_min(self, x: np.ndarray) -> np.ndarray:
+        return x.min(axis=(-2, -1), keepdims=True)
+
+    def frame_max(self, x: np.ndarray) -> np.ndarray:
+        return x.max(axis=(-2, -1), keepdims=True)
+
+    def frame_quantile(self, x: np.ndarray, q: float) -> np.ndarray:
+        flat = x.reshape(*x.shape[:-2], -1)
+        return np.quantile(flat, q, axis=-1)[..., np.newaxis, np.newaxis]
+
+    def as_float(self, x: np.ndarray) -> np.ndarray:
+        return x.astype(np.float32, copy=False)
+
+    def stack(self, arrays: list, axis: int = 0) -> np.ndarray:
+        return np.stack(arrays, axis=axis)
+
+    def channels_last(self, x: np.ndarray) -> np.ndarray:
+        return np.moveaxis(x, -3, -1)
+
+    def resize(self, x: np.ndarray, height: int, width: int, area: bool = False) -> np.ndarray:
+        interpolation = cv2.INTER_AREA if area else cv2.INTER_CUBIC
+        if x.ndim == 2:
+            return cv2.resize(x, (width, height), interpolation=interpolation)
+        planes = x.reshape(-1, *x.shape[-2:])
+        output = np.empty(shape=(len(planes), height, width), dtype=x.dtype)
+        for plane, out in zip(planes, output):
+            cv2.resize(plane, (width, height), dst=out, interpolation=interpolation)
+        return output.reshape(*x.shape[:-2], height, width)
+
+
+class TorchBackend(Backend):
+    name = "torch"
+
+    def __init__(self, device: str = "cpu", num_threads: Union[int, None] = None):
+        """initialize the torch backend
+
+        Args:
+            device (str, optional): torch device the kernels and images live on. Defaults to "cpu".
+            num_threads (int, optional): intra-op thread count for the CPU device. Defaults to torch's own choice.
+        """
+        import torch
+        import torch.fft
+
+        self.xp = torch
+        self._device = torch.device(device)
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+    @property
+    def device(self):
+        return self._device
+
+    def as_array(self, img: np.ndarray):
+        return self.xp.from_numpy(np.ascontiguousarray(img, dtype=np.float32)).to(self._device)
+
+    def to_numpy(self, x) -> np.ndarray:
+        return x.detach().contiguous().cpu().numpy()
+
+    def frequency_grid(self, height: int, width: int) -> tuple:
+        u = self.xp.linspace(-0.5, 0.5, height, dtype=self.xp.float32, device=self._device)
+        v = self.xp.linspace(-0.5, 0.5, width, dtype=self.xp.float32, device=self._device)
+        return tuple(self.xp.meshgrid(u, v, indexing="ij"))
+
+    def fft2(self, x):
+        return self.xp.fft.fft2(x, dim=(-2, -1))
+
+    def ifft2(self, x):
+        return self.xp.fft.ifft2(x, dim=(-2, -1))
+
+    def fftshift(self, x):
+        return self.xp.fft.fftshift(x, dim=(-2, -1))
+
+    def angle(self, x):
+        return self.xp.angle(x)
+
+    def frame_min(self, x):
+        return x.amin(dim=(-2, -1), keepdim=True)
+
+    def frame_max(self, x):
+        return x.amax(dim=(-2, -1), keepdim=True)
+
+    def frame_quantile(self, x, q: float):
+        flat = x.reshape(*x.shape[:-2], -1)
+        return self.xp.quantile(flat, q, dim=-1)[..., None, None]
+
+    def as_float(self, x):
+        return x.to(self.xp.float32)
+
+    def stack(self, arrays: list, axis: int = 0):
+        return self.xp.stack(arrays, dim=axis)
+
+    def channels_last(self, x):
+        return x.movedim(-3, -1)
+
+    def resize(self, x, height: int, width: int, area: bool = False):
+        from torch.nn.functional import interpolate
+
+        planes = x.reshape(-1, 1, *x.shape[-2:])
+        if area:
+            output = interpolate(planes, size=(height, width), mode="area")
+        else:
+            output = interpolate(planes, size=(height, width), mode="bicubic", align_corners=False)
+        return output.reshape(*x.shape[:-2], height, width)
+
+
+def available_backends() -> list[str]:
+    names = ["numpy"]
+    try:
+        import torch
+    except ImportError:
+        return names
+    names.append("torch")
+    if torch.cuda.is_available():
+        names.append("torch:cuda")
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        names.append("torch:mps")
+    return names
+
+
+def get_backend(name: str = "numpy", num_threads: Union[int, None] = None) -> Backend:
+    """create a backend from its name
+
+    Args:
+        name (str, optional): "numpy", "torch" (CPU) or "torch:<device>" such as "torch:cuda". Defaults to "numpy".
+        num_threads (int, optional): intra-op thread count of the torch CPU backend. Defaults to None.
+
+    Returns:
+        Backend
+    """
+    if name == "numpy":
+        return NumpyBackend()
+    if name == "torch":
+        return TorchBackend(device="cpu", num_threads=num_threads)
+    if name.startswith("torch:"):
+        return TorchBackend(device=name.split(":", maxsplit=1)[1], num_threads=num_threads)
+    raise ValueError(f"unknown phycv backend: {name}")
@@ -0,0 +1,228 @@
+import time
+from typing import Iterable, Iterator, Union
+
+import cv2
+import numpy as np
+
+from .backends import Backend, get_backend
+from .utils import low_pass_kernel
+
+
+DEFAULT_CHUNK_SIZE: int = 8
+ADAPTIVE_TOLERANCE: float = 1e-2
+ADAPTIVE_OVERSAMPLING: float = 2.0
+MIN_ADAPTIVE_SIZE: int = 32
+
+
+class PhaseEngine:
+    def __init__(self, backend: Union[str, Backend] = "numpy"):
+        """initialize the state shared by the phycv engines
+
+        The frequency grid, the low pass filter and the algorithm kernels are kept between calls and
+        only rebuilt when the image size or the parameters they depend on change.
+
+        Args:
+            backend (str or Backend, optional): backend name accepted by get_backend() or a Backend. Defaults to "numpy".
+        """
+        self._backend: Backend = get_backend(name=backend) if isinstance(backend, str) else backend
+        self.h: Union[int, None] = None
+        self.w: Union[int, None] = None
+        self.U = None
+        self.V = None
+        self.RHO = None
+        self.hs: Union[int, None] = None
+        self.ws: Union[int, None] = None
+        self.adaptive_tol: Union[float, None] = None
+        self._lpf_key: Union[tuple, None] = None
+        self._lpf = None
+
+    @property
+    def backend(self):
+        return self._backend
+
+    def init_grid(self, h: int, w: int) -> bool:
+        """create the frequency grid for the given image size
+
+        Args:
+            h (int): height of the image to be processed
+            w (int): width of the image to be processed
+
+        Returns:
+            bool: True if the grid had to be rebuilt
+        """
+        if (h, w) == (self.h, self.w):
+            return False
+        self.h = h
+        self.w = w
+        self.U, self.V = self._backend.frequency_grid(height=h, width=w)
+        self.RHO = self._backend.xp.hypot(self.U, self.V)
+        self.hs = h
+        self.ws = w
+        self._lpf_key = None
+        return True
+
+    def init_processing_size(self, cutoff: Union[float, None]):
+        """pick the size the spectrum is processed at
+
+        In adaptive mode (adaptive_tol is not None) everything above the cutoff frequency is
+        negligible, so the image is decimated until its Nyquist frequency covers the cutoff
+        ADAPTIVE_OVERSAMPLING times over; the margin keeps the interpolation back to full size
+        accurate. The size is rounded up to one the FFT handles efficiently. Otherwise, or without a
+        cutoff, the full resolution is used.
+
+        Args:
+            cutoff (float or None): highest frequency (cycles per pixel) that still matters
+        """
+        if self.adaptive_tol is None or cutoff is None:
+            self.hs, self.ws = self.h, self.w
+            return
+        sizes = list()
+        for size in (self.h, self.w):
+            decimated = int(np.ceil(2 * ADAPTIVE_OVERSAMPLING * cutoff * size))
+            sizes.append(min(size, cv2.getOptimalDFTSize(max(MIN_ADAPTIVE_SIZE, decimated))))
+        self.hs, self.ws = sizes
+
+    @property
+    def decimated(self) -> bool:
+        return (self.hs, self.ws) != (self.h, self.w)
+
+    def crop(self, x):
+        """keep the centered (unshifted) part of a full-size spectral array that the processing size covers
+
+        The bins of the decimated spectrum sit at the same frequencies as the central bins of the
+        full one, so kernels are built (and normalized) on the full grid and cropped.
+
+        Args:
+            x (np.ndarray or torch.Tensor): array over the full frequency grid, before fftshift
+        """
+        if not self.decimated:
+            return x
+        top = self.h // 2 - self.hs // 2
+        left = self.w // 2 - self.ws // 2
+        return x[..., top:top + self.hs, left:left + self.ws]
+
+    def decimate(self, img):
+        """area-resample an image on the backend to the processing size"""
+        if not self.decimated:
+            return img
+        return self._backend.resize(img, height=self.hs, width=self.ws, area=True)
+
+    def upsample(self, x):
+        """bicubically resample a real result at the processing size back to the image size"""
+        if not self.decimated:
+            return x
+        return self._backend.resize(x, height=self.h, width=self.w)
+
+    def lpf_cutoff(self, sigma_LPF: float) -> Union[float, None]:
+        """frequency at which the gaussian low pass filter falls below adaptive_tol"""
+        if self.adaptive_tol is None:
+            return None
+        return sigma_LPF * np.sqrt(2 * np.log(1 / self.adaptive_tol) / np.log(2))
+
+    def low_pass_filter(self, sigma_LPF: float):
+        """get the cached spectral low pass filter of the current grid and processing size
+
+        Args:
+            sigma_LPF (float): std of the low pass filter
+        """
+        key = (sigma_LPF, self.hs, self.ws)
+        if self._lpf_key != key:
+            self._lpf = low_pass_kernel(rho=self.crop(self.RHO), sigma_LPF=sigma_LPF, backend=self._backend)
+            self._lpf_key = key
+        return self._lpf
+
+    def load_img(self, img_array: np.ndarray):
+        """move an in-memory grayscale float32 image (or an (N, H, W) stack) to the backend
+
+        Args:
+            img_array (np.ndarray): image in the form of np.ndarray
+
+        Returns:
+            np.ndarray or torch.Tensor
+        """
+        self.init_grid(h=img_array.shape[-2], w=img_array.shape[-1])
+        return self._backend.as_array(img_array)
+
+    def run(self, img_array: np.ndarray, *args, **kwargs) -> np.ndarray:
+        raise NotImplementedError
+
+    def adaptive_error(self, img_array: np.ndarray, *args, adaptive_tol: float = ADAPTIVE_TOLERANCE,
+                       **kwargs) -> dict:
+        """measure what adaptive mode costs in accuracy and gains in speed on a sample input
+
+        run() is called once exactly and once with the given tolerance; the engine's own
+        adaptive_tol is restored afterwards.
+
+        Args:
+            img_array (np.ndarray): input accepted by run()
+            adaptive_tol (float, optional): tolerance to evaluate. Defaults to ADAPTIVE_TOLERANCE.
+
+        Returns:
+            dict: processing size, mean and max absolute error, PSNR in dB and speedup over the exact path
+        """
+        previous_tol = self.adaptive_tol
+        outputs, durations = list(), list()
+        try:
+            for tol in (None, adaptive_tol):
+                self.adaptive_tol = tol
+                self.run(img_array, *args, **kwargs)  # warm up the kernel caches of this processing size
+                start = time.perf_counter()
+                outputs.append(self.run(img_array, *args, **kwargs).astype(np.float64))
+                durations.append(time.perf_counter() - start)
+            size = (self.hs, self.ws)
+        finally:
+            self.adaptive_tol = previous_tol
+        error = np.abs(outputs[1] - outputs[0])
+        mse = np.mean(error ** 2)
+        return {"size": size,
+                "mae": float(error.mean()),
+                "max_error": float(error.max()),
+                "psnr": float("inf") if mse == 0 else float(10 * np.log10(1 / mse)),
+                "speedup": durations[0] / durations[1]}
+
+    def run_batch(self, img_stack: np.ndarray, *args, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> np.ndarray:
+        """run the engine over an (N, H, W, ...) stack, chunk_size frames per FFT call
+
+        All frames of a chunk go through one broadcast FFT, kernel multiply, phase extraction and
+        normalization while sharing the cached kernels. chunk_size bounds the memory of the
+        intermediate complex arrays.
+
+        Args:
+            img_stack (np.ndarray): stack of images accepted by run()
+            chunk_size (int, optional): number of frames processed together. Defaults to DEFAULT_CHUNK_SIZE.
+
+        Returns:
+            np.ndarray: stack of outputs, one per input frame
+        """
+        chunk_size = max(1, chunk_size)
+        output = None
+        for start in range(0, len(img_stack), chunk_size):
+            chunk_output = self.run(img_stack[start:start + chunk_size], *args, **kwargs)
+            if output is None:
+                output = np.empty(shape=(len(img_stack),) + chunk_output.shape[1:], dtype=chunk_output.dtype)
+            output[start:start + len(chunk_output)] = chunk_output
+        return output
+
+    def iter_batches(self, frames: Iterable[np.ndarray], *args, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     **kwargs) -> Iterator[np.ndarray]:
+        """lazily run the engine over a sequence of frames (a folder, a video segment), chunk by chunk
+
+        Consecutive frames are grouped into chunks of up to chunk_size frames of the same size;
+        outputs are yielded one frame at a time and in input order.
+
+        Args:
+            frames (Iterable[np.ndarray]): frames accepted by run()
+            chunk_size (int, optional): number of frames processed together. Defaults to DEFAULT_CHUNK_SIZE.
+
+        Returns:
+            Iterator[np.ndarray]
+        """
+        chunk_size = max(1, chunk_size)
+        chunk: list[np.ndarray] = list()
+        for frame in frames:
+            if chunk and (len(chunk) == chunk_size or frame.shape != chunk[0].shape):
+                yield from self.run(np.stack(chunk), *args, **kwargs)
+                chunk.clear()
+            chunk.append(frame)
+        if chunk:
+            yield from self.run(np.stack(chunk), *args, **kwargs)
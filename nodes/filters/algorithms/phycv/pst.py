@@ -1,99 +1,68 @@
-import cv2
-import numpy as np
-from numpy.fft import fft2, fftshift, ifft2
-
-from .utils import cart2pol, denoise, morph, normalize
+from typing import Union
 
+import numpy as np
 
-class PST:
-    def __init__(self, h=None, w=None):
-        """initialize the PST CPU version class
+from .backends import Backend
+from .engine import PhaseEngine
+from .utils import denoise, morph, normalize
 
-        Args:
-            h (int, optional): height of the image to be processed. Defaults to None.
-            w (int, optional): width of the image to be processed. Defaults to None.
-        """
-        self.h = h
-        self.w = w
 
-    def load_img(self, img_file=None, img_array=None):
-        """load the image from an ndarray or from an image file
+class PST(PhaseEngine):
+    def __init__(self, backend: Union[str, Backend] = "numpy"):
+        """initialize the PST engine
 
         Args:
-            img_file (str, optional): path to the image. Defaults to None.
-            img_array (np.ndarray, optional): image in the form of np.ndarray. Defaults to None.
+            backend (str or Backend, optional): "numpy", "torch" or "torch:<device>". Defaults to "numpy".
         """
-        if img_array is not None:
-            self.img = img_array
-            self.img = img_array.shape[0]
-            self.img = img_array.shape[1]
-        else:
-            self.img = cv2.imread(img_file)
-            if not self.h and not self.w:
-                self.h = self.img.shape[0]
-                self.w = self.img.shape[1]
-            else:
-                self.img = cv2.imresize(self.img, [self.h, self.w])
-        # convert to grayscale if it is RGB
-        if self.img.ndim == 3:
-            self.img = cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+        super().__init__(backend=backend)
+        self._kernel_key: Union[tuple, None] = None
+        self.pst_kernel = None
 
     def init_kernel(self, S, W):
-        """initialize the phase kernel of PST
+        """initialize the spectral phase kernel of PST for the current grid and processing size, reusing it when
+        nothing changed
 
         Args:
             S (float): phase strength of PST
             W (float): warp strength of PST
         """
-        # set the frequency grid
-        u = np.linspace(-0.5, 0.5, self.h)
-        v = np.linspace(-0.5, 0.5, self.w)
-        [U, V] = np.meshgrid(u, v, indexing="ij")
-        [self.THETA, self.RHO] = cart2pol(U, V)
+        key = (self.h, self.w, self.hs, self.ws, S, W)
+        if key == self._kernel_key:
+            return
+        xp = self.backend.xp
         # construct the PST Kernel
-        self.pst_kernel = W * self.RHO * np.arctan(W * self.RHO) - 0.5 * np.log(
-            1 + (W * self.RHO) ** 2
-        )
-        self.pst_kernel = S * self.pst_kernel / np.max(self.pst_kernel)
+        kernel = W * self.RHO * xp.arctan(W * self.RHO) - 0.5 * xp.log(1 + (W * self.RHO) ** 2)
+        kernel = S * kernel / kernel.max()
+        # keep the fftshifted complex exponential so applying it is a single multiplication
+        self.pst_kernel = self.backend.fftshift(xp.exp(-1j * self.crop(kernel)))
+        self._kernel_key = key
 
-    def apply_kernel(self, sigma_LPF, thresh_min, thresh_max, morph_flag):
-        """apply the phase kernel onto the image
+    def apply_kernel(self, img, sigma_LPF, thresh_min, thresh_max, morph_flag):
+        """apply the phase kernel onto the image, at the processing size
 
         Args:
+            img (np.ndarray or torch.Tensor): image on the backend, from load_img()
             sigma_LPF (float): std of the low pass filter
             thresh_min (float): minimum thershold, we keep features < thresh_min
             thresh_max (float): maximum thershold, we keep features > thresh_max
             morph_flag (boolean): whether apply morphological operation
+
+        Returns:
+            np.ndarray or torch.Tensor: PST output on the backend
         """
-        self.img_denoised = denoise(img=self.img, rho=self.RHO, sigma_LPF=sigma_LPF)
-        self.img_pst = ifft2(
-            fft2(self.img_denoised) * fftshift(np.exp(-1j * self.pst_kernel))
-        )
-        self.pst_feature = normalize(np.angle(self.img_pst))
-        if morph_flag == 0:
-            self.pst_output = self.pst_feature
-        else:
-            self.pst_output = morph(
-                img=self.img,
-                feature=self.pst_feature,
-                thresh_max=thresh_max,
-                thresh_min=thresh_min,
-            )
+        backend = self.backend
+        img_denoised = denoise(img=self.decimate(img), lpf=self.low_pass_filter(sigma_LPF=sigma_LPF), backend=backend)
+        img_pst = backend.ifft2(backend.fft2(img_denoised) * self.pst_kernel)
+        pst_feature = normalize(self.upsample(backend.as_float(backend.angle(img_pst))), backend=backend)
+        if not morph_flag:
+            return pst_feature
+        return morph(img=img, feature=pst_feature, thresh_min=thresh_min, thresh_max=thresh_max, backend=backend)
 
-    def run(
-            self,
-            img_file,
-            S,
-            W,
-            sigma_LPF,
-            thresh_min,
-            thresh_max,
-            morph_flag,
-    ):
+    def run(self, img_array, S, W, sigma_LPF, thresh_min, thresh_max, morph_flag) -> np.ndarray:
         """wrap all steps of PST into a single run method
 
         Args:
-            img_file (str): path to the image.
+            img_array (np.ndarray): grayscale float32 image or (N, H, W) stack of them
             S (float): phase strength of PST
             W (float): warp strength of PST
             sigma_LPF (float): std of the low pass filter
@@ -102,10 +71,10 @@ class PST:
             morph_flag (boolean): whether apply morphological operation
 
         Returns:
-            np.ndarray: PST output
+            np.ndarray: PST output, (H, W) or (N, H, W)
         """
-        self.load_img(img_file=img_file)
+        img = self.load_img(img_array=img_array)
+        self.init_processing_size(cutoff=self.lpf_cutoff(sigma_LPF))
         self.init_kernel(S, W)
-        self.apply_kernel(sigma_LPF, thresh_min, thresh_max, morph_flag)
-
-        return self.pst_output
+        pst_output = self.apply_kernel(img, sigma_LPF, thresh_min, thresh_max, morph_flag)
+        return self.backend.to_numpy(pst_output)
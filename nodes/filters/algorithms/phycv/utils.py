@@ -1,18 +1,20 @@
 import numpy as np
-import torch
-import torch.fft
 
+from .backends import Backend
 
-def normalize(x):
-    """normalize the input to 0-1
+
+def normalize(x, backend: Backend):
+    """normalize every frame of the input to 0-1
 
     Args:
-        x (np.ndarray or torch.Tensor): input array or tensor
+        x (np.ndarray or torch.Tensor): input array or tensor, normalized over its last two axes
+        backend (Backend): backend the input lives on
 
     Returns:
         np.ndarray or torch.Tensor
     """
-    return (x - x.min()) / (x.max() - x.min())
+    x_min = backend.frame_min(x)
+    return (x - x_min) / (backend.frame_max(x) - x_min)
 
 
 def cart2pol(x, y):
@@ -30,118 +32,51 @@ def cart2pol(x, y):
     return (theta, rho)
 
 
-def cart2pol_torch(x, y):
-    """convert cartesian coordiates to polar coordinates with PyTorch
+def low_pass_kernel(rho, sigma_LPF, backend: Backend):
+    """build the fftshifted gaussian low pass filter used for denoising
 
     Args:
-        x (torch.Tensor): cartesian coordinates in x direction
-        y (torch.Tensor): cartesian coordinates in x direction
+        rho (np.ndarray or torch.Tensor): polar coordinates
+        sigma_LPF (float): std of the low pass filter
+        backend (Backend): backend rho lives on
 
     Returns:
-        tuple: polar coordinates theta and rho
+        np.ndarray or torch.Tensor: spectral low pass filter
     """
-    theta = torch.atan2(y, x)
-    rho = torch.hypot(x, y)
-    return (theta, rho)
+    return backend.fftshift(backend.xp.exp(-0.5 * (rho / np.sqrt((sigma_LPF ** 2) / np.log(2))) ** 2))
 
 
-def denoise(img, rho, sigma_LPF):
+def denoise(img, lpf, backend: Backend):
     """apply a low pass filter to denoise the image
 
     Args:
-        img (np.ndarray): original image
-        rho (np.ndarray): polar coordinates
-        sigma_LPF (float): variance of the low pass filter
-
-    Returns:
-        np.ndarray: denoised image
-    """
-    img_orig_f = np.fft.fft2(img)
-    expo = np.fft.fftshift(
-        np.exp(
-            -0.5 * np.power((np.divide(rho, np.sqrt((sigma_LPF ** 2) / np.log(2)))), 2)
-        )
-    )
-    img_filtered = np.real(np.fft.ifft2((np.multiply(img_orig_f, expo))))
-
-    return img_filtered
-
-
-def denoise_torch(img, rho, sigma_LPF):
-    """apply a low pass filter to denoise the image with PyTorch
-
-    Args:
-        img (torch.Tensor): original image
-        rho (torch.Tensor): polar coordinates
-        sigma_LPF (float): std of the low pass filter
+        img (np.ndarray or torch.Tensor): original image or stack of images
+        lpf (np.ndarray or torch.Tensor): spectral low pass filter from low_pass_kernel()
+        backend (Backend): backend the image lives on
 
     Returns:
-        torch.Tensor: denoised image
+        np.ndarray or torch.Tensor: denoised image
     """
-    img_orig_f = torch.fft.fft2(img)
-    expo = torch.fft.fftshift(
-        torch.exp(
-            -0.5
-            * torch.pow((torch.divide(rho, np.sqrt((sigma_LPF ** 2) / np.log(2)))), 2)
-        )
-    )
-    img_filtered = torch.real(torch.fft.ifft2((torch.mul(img_orig_f, expo))))
-
-    return img_filtered
+    return backend.xp.real(backend.ifft2(backend.fft2(img) * lpf))
 
 
-def morph(img, feature, thresh_min, thresh_max):
+def morph(img, feature, thresh_min, thresh_max, backend: Backend):
     """apply morphological operation to transform analog features to digial features
 
     Args:
-        img (np.ndarray): original image
-        feature (np.ndarray): analog feature
-        thresh_min (0<= float <=1): minimum thershold, we keep features < quantile(feature, thresh_min)
-        thresh_max (0<= float <=1): maximum thershold, we keep features < quantile(feature, thresh_min)
-
-    Returns:
-        np.ndarray: digital features (binary edge)
-    """
-    # downsample feature to reduce computational time of np.quantile() for large arrays
-    if len(feature.shape) == 3:
-        quantile_max = np.quantile(feature[::4, ::4, ::4], thresh_max)
-        quantile_min = np.quantile(feature[::4, ::4, ::4], thresh_min)
-    elif len(feature.shape) == 2:
-        quantile_max = np.quantile(feature[::4, ::4], thresh_max)
-        quantile_min = np.quantile(feature[::4, ::4], thresh_min)
-
-    digital_feature = np.zeros(feature.shape)
-    digital_feature[feature > quantile_max] = 1
-    digital_feature[feature < quantile_min] = 1
-    digital_feature[img < (np.amax(img) / 20)] = 0
-
-    return digital_feature.astype(np.float32)
-
-
-def morph_torch(img, feature, thresh_min, thresh_max, device):
-    """apply morphological operation to transform analog features to digial features in PyTorch
-
-    Args:
-        img (torch.Tensor): original image
-        feature (torch.Tensor): analog feature
+        img (np.ndarray or torch.Tensor): original image, (H, W) or (N, H, W)
+        feature (np.ndarray or torch.Tensor): analog feature, with the same trailing axes as img
         thresh_min (0<= float <=1): minimum thershold, we keep features < quantile(feature, thresh_min)
-        thresh_max (0<= float <=1): maximum thershold, we keep features < quantile(feature, thresh_min)
-        device (torch.device)
+        thresh_max (0<= float <=1): maximum thershold, we keep features > quantile(feature, thresh_max)
+        backend (Backend): backend the arrays live on
 
     Returns:
-        torch.Tensor: digital features (binary edge)
+        np.ndarray or torch.Tensor: digital features (binary edge)
     """
-    # downsample feature to reduce computational time of torch.quantile() for large tensors
-    if len(feature.shape) == 3:
-        quantile_max = torch.quantile(feature[::4, ::4, ::4], thresh_max)
-        quantile_min = torch.quantile(feature[::4, ::4, ::4], thresh_min)
-    elif len(feature.shape) == 2:
-        quantile_max = torch.quantile(feature[::4, ::4], thresh_max)
-        quantile_min = torch.quantile(feature[::4, ::4], thresh_min)
-
-    digital_feature = torch.zeros(feature.shape).to(device)
-    digital_feature[feature > quantile_max] = 1
-    digital_feature[feature < quantile_min] = 1
-    digital_feature[img < (torch.max(img) / 20)] = 0
-
-    return torch.squeeze(digital_feature)
+    # downsample feature to reduce computational time of the quantile for large arrays
+    sampled = feature[..., ::4, ::4]
+    quantile_max = backend.frame_quantile(sampled, thresh_max)
+    quantile_min = backend.frame_quantile(sampled, thresh_min)
+    digital_feature = (feature > quantile_max) | (feature < quantile_min)
+    digital_feature = digital_feature & (img >= backend.frame_max(img) / 20)
+    return backend.as_float(digital_feature)
@@ -1,122 +1,158 @@
-import cv2
+from typing import Union
+
 import numpy as np
-from numpy.fft import fft2, fftshift, ifft2
 
-from .utils import cart2pol
+from .backends import Backend
+from .engine import PhaseEngine
 
 
-class VEVID:
-    def __init__(self, h=None, w=None):
-        """initialize the VEVID CPU version class
+class VEVID(PhaseEngine):
+    def __init__(self, backend: Union[str, Backend] = "numpy"):
+        """initialize the VEVID engine
 
         Args:
-            h (int, optional): height of the image to be processed. Defaults to None.
-            w (int, optional): width of the image to be processed. Defaults to None.
+            backend (str or Backend, optional): "numpy", "torch" or "torch:<device>". Defaults to "numpy".
         """
-        self.h = h
-        self.w = w
+        super().__init__(backend=backend)
+        self._kernel_key: Union[tuple, None] = None
+        self.vevid_kernel = None
+
+    def load_img(self, img_array: np.ndarray, color: bool = False):
+        """extract the HSV channel VEVID works on from an RGB(A) float32 image, or an (N, H, W, C) stack
 
-    def load_img(self, img_file=None, img_array=None):
-        """load the image from an ndarray or from an image file
+        Only the value channel (max of R, G, B) and, for color enhancement, the saturation channel are
+        computed; hue is never needed since merge_channel() rebuilds RGB from them in closed form.
 
         Args:
-            img_file (str, optional): path to the image. Defaults to None.
-            img_array (np.ndarray, optional): image in the form of np.ndarray. Defaults to None.
-        """
-        if img_array is not None:
-            # directly load the image from numpy array
-            self.img_bgr = img_array
-            self.h = img_array.shape[0]
-            self.w = img_array.shape[1]
-        else:
-            # load the image from the image file
-            self.img_bgr = cv2.imread(img_file)
-            if not self.h and not self.w:
-                self.h = self.img_bgr.shape[0]
-                self.w = self.img_bgr.shape[1]
-            else:
-                self.img_bgr = cv2.resize(self.img_bgr, [self.w, self.h])
+            img_array (np.ndarray): RGB or RGBA image in the range of 0-1
+            color (bool, optional): whether to run color enhancement (saturation channel). Defaults to False.
 
-        self.img_hsv = cv2.cvtColor(self.img_bgr, cv2.COLOR_BGR2HSV) / 255.0
+        Returns:
+            tuple: value and saturation (None unless color) as np.ndarray, and the selected channel on the backend
+        """
+        # elementwise maximum/minimum of the channel planes, a reduction over the short last axis is far slower
+        value = np.maximum(np.maximum(img_array[..., 0], img_array[..., 1]), img_array[..., 2], dtype=np.float32)
+        saturation = None
+        if color:
+            saturation = np.minimum(np.minimum(img_array[..., 0], img_array[..., 1]), img_array[..., 2],
+                                    dtype=np.float32)
+            np.subtract(value, saturation, out=saturation)
+            np.divide(saturation, value, out=saturation, where=value > 0)
+        self.init_grid(h=value.shape[-2], w=value.shape[-1])
+        return value, saturation, self.backend.as_array(saturation if color else value)
 
     def init_kernel(self, S, T):
-        """initialize the phase kernel of VEViD
+        """initialize the phase kernel of VEViD for the current grid, reusing it when nothing changed
 
         Args:
             S (float): phase strength
             T (float): variance of the spectral phase function
         """
-        # create the frequency grid
-        u = np.linspace(-0.5, 0.5, self.h)
-        v = np.linspace(-0.5, 0.5, self.w)
-        [U, V] = np.meshgrid(u, v, indexing="ij")
-        # construct the kernel
-        [self.THETA, self.RHO] = cart2pol(U, V)
-        self.vevid_kernel = np.exp(-self.RHO ** 2 / T)
-        self.vevid_kernel = (self.vevid_kernel / np.max(abs(self.vevid_kernel))) * S
-
-    def apply_kernel(self, b, G, color=False, lite=False):
-        """apply the phase kernel onto the image
+        key = (self.h, self.w, self.hs, self.ws, S, T)
+        if key == self._kernel_key:
+            return
+        xp = self.backend.xp
+        kernel = xp.exp(-self.RHO ** 2 / T)
+        kernel = (kernel / xp.abs(kernel).max()) * S
+        # the input is real, so only the kernel's departure from 1 contributes to the imaginary part;
+        # keeping exp(-1j * kernel) - 1 makes the filtered spectrum vanish above the kernel's cutoff
+        self.vevid_kernel = self.backend.fftshift(xp.exp(-1j * self.crop(kernel))) - 1
+        self._kernel_key = key
+
+    def kernel_cutoff(self, S, T) -> Union[float, None]:
+        """frequency at which the phase kernel, S * exp(-rho ** 2 / T), falls below adaptive_tol
 
         Args:
+            S (float): phase strength
+            T (float): variance of the spectral phase function
+        """
+        if self.adaptive_tol is None:
+            return None
+        return np.sqrt(T * max(0.0, np.log(S / self.adaptive_tol))) if S > 0 else 0.0
+
+    def apply_kernel(self, vevid_input, b, G, lite=False):
+        """apply the phase kernel onto the selected channel
+
+        Args:
+            vevid_input (np.ndarray or torch.Tensor): channel on the backend, from load_img()
             b (float): regularization term
             G (float): phase activation gain
-            color (bool, optional): whether to run color enhancement. Defaults to False.
             lite (bool, optional): whether to run VEViD lite. Defaults to False.
+
+        Returns:
+            np.ndarray or torch.Tensor: normalized phase, the new channel
         """
-        if color:
-            channel_idx = 1
-        else:
-            channel_idx = 2
-        vevid_input = self.img_hsv[:, :, channel_idx]
+        backend = self.backend
+        xp = backend.xp
         if lite:
-            vevid_phase = np.arctan2(-G * (vevid_input + b), vevid_input)
+            # VEViD lite needs no spectrum at all, it is computed in place in a single float32 buffer
+            vevid_phase = vevid_input + b
+            vevid_phase *= -G
+            xp.arctan2(vevid_phase, vevid_input, out=vevid_phase)
         else:
-            vevid_input_f = fft2(vevid_input + b)
-            img_vevid = ifft2(vevid_input_f * fftshift(np.exp(-1j * self.vevid_kernel)))
-            vevid_phase = np.arctan2(G * np.imag(img_vevid), vevid_input)
-        vevid_phase_norm = (vevid_phase - vevid_phase.min()) / (
-                vevid_phase.max() - vevid_phase.min()
-        )
-        self.img_hsv[:, :, channel_idx] = vevid_phase_norm
-        self.img_hsv = cv2.normalize(
-            self.img_hsv, None, 0, 255, cv2.NORM_MINMAX
-        ).astype(np.uint8)
-        self.vevid_output = cv2.cvtColor(self.img_hsv, cv2.COLOR_HSV2RGB)
-
-    def run(self, img_file, S, T, b, G, color=False):
-        """run the full VEViD algorithm
+            img_vevid = backend.ifft2(backend.fft2(self.decimate(vevid_input) + b) * self.vevid_kernel)
+            vevid_phase = backend.as_float(xp.arctan2(G * self.upsample(backend.as_float(xp.imag(img_vevid))),
+                                                      vevid_input))
+        phase_min = backend.frame_min(vevid_phase)
+        vevid_phase -= phase_min
+        vevid_phase /= backend.frame_max(vevid_phase)
+        return vevid_phase
+
+    @staticmethod
+    def merge_channel(img_array, value, saturation, vevid_channel, color=False) -> np.ndarray:
+        """put the enhanced channel back, equivalent to replacing it in HSV and converting back to RGB
+
+        With hue fixed, every RGB component is c = V * (1 - S * f(H)), so a new value scales RGB by
+        V' / V and a new saturation maps c to V - (V - c) * S' / S. The alpha channel is kept as is.
 
         Args:
-            img_file (str): path to the image
-            S (float): phase strength
-            T (float): variance of the spectral phase function
-            b (float): regularization term
-            G (float): phase activation gain
-            color (bool, optional): whether to run color enhancement. Defaults to False.
+            img_array (np.ndarray): RGB(A) input image(s)
+            value (np.ndarray): value channel from load_img()
+            saturation (np.ndarray): saturation channel from load_img(), None unless color
+            vevid_channel (np.ndarray): enhanced channel from apply_kernel()
+            color (bool, optional): whether vevid_channel is the saturation. Defaults to False.
 
         Returns:
-            np.ndarray: enhanced image
+            np.ndarray: enhanced image(s) with the channels of img_array
         """
-        self.load_img(img_file=img_file)
-        self.init_kernel(S, T)
-        self.apply_kernel(b, G, color, lite=False)
-
-        return self.vevid_output
-
-    def run_lite(self, img_file, b, G, color=False):
-        """run the VEViD lite algorithm
+        if color:
+            ratio = np.divide(vevid_channel, saturation, out=np.zeros_like(vevid_channel), where=saturation > 0)
+            output = np.subtract(img_array, value[..., None], dtype=np.float32)
+            output *= ratio[..., None]
+            output += value[..., None]
+            # achromatic pixels have hue 0 in OpenCV's conversion, so they turn red as saturation rises
+            gray = saturation == 0
+            if gray.any():
+                output[gray, 0] = value[gray]
+                output[gray, 1] = output[gray, 2] = value[gray] * (1 - vevid_channel[gray])
+        else:
+            ratio = np.divide(vevid_channel, value, out=np.zeros_like(vevid_channel), where=value > 0)
+            output = np.multiply(img_array, ratio[..., None], dtype=np.float32)
+            black = value == 0
+            if black.any():
+                output[black, :3] = vevid_channel[black][:, None]
+        # only the color channels are enhanced, alpha is kept as is
+        output[..., 3:] = img_array[..., 3:]
+        return output
+
+    def run(self, img_array, S, T, b, G, color=False, lite=False) -> np.ndarray:
+        """run the full VEViD algorithm, or VEViD lite
 
         Args:
-            img_file (str): path to the image
+            img_array (np.ndarray): RGB(A) float32 image or (N, H, W, C) stack in the range of 0-1
+            S (float): phase strength
+            T (float): variance of the spectral phase function
             b (float): regularization term
             G (float): phase activation gain
             color (bool, optional): whether to run color enhancement. Defaults to False.
+            lite (bool, optional): whether to run VEViD lite. Defaults to False.
 
         Returns:
-            np.ndarray: enhanced image
+            np.ndarray: enhanced image(s), with the channels of img_array
         """
-        self.load_img(img_file=img_file)
-        self.apply_kernel(b, G, color, lite=True)
-
-        return self.vevid_output
+        value, saturation, vevid_input = self.load_img(img_array=img_array, color=color)
+        if not lite:
+            self.init_processing_size(cutoff=self.kernel_cutoff(S, T))
+            self.init_kernel(S, T)
+        vevid_channel = self.backend.to_numpy(self.apply_kernel(vevid_input, b, G, lite=lite))
+        return self.merge_channel(img_array, value, saturation, vevid_channel, color=color)
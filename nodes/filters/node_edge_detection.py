@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import threading
 from typing import Union
 
 import cv2
@@ -8,7 +9,7 @@ import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
-from nodes.filters.algorithms.edge_detection import pst, page
+from nodes.filters.algorithms.phycv import ADAPTIVE_TOLERANCE, PST, PAGE
 from nodes.node import NodeBase
 
 
@@ -24,6 +25,9 @@ class Node(NodeBase):
         self._width: int = self._settings.nodeWidth
         self._currentFilter: str = self._filters[0]
         self._currentImage: Union[np.ndarray, None] = None
+        # the PST and PAGE engines keep kernels between runs; the UI callbacks and update() both
+        # run the filter, so only one of them may use an engine at a time
+        self._filterLock = threading.Lock()
 
         self._cannyGroupTag: int = editorHandle.getUniqueTag()
         self._cannyMinTag: int = editorHandle.getUniqueTag()
@@ -57,6 +61,8 @@ class Node(NodeBase):
         self._pstMinThreshold: float = 0.1
         self._pstMaxThreshold: float = 0.8
         self._pstUseMorph: bool = True
+        self._pstAdaptive: bool = False
+        self._pst: PST = PST(backend=self._settings.phycvBackend)
 
         self._pageGroupTag: int = editorHandle.getUniqueTag()
         self._pageDirectionBinsRange: tuple[int, int] = (1, 100)
@@ -72,6 +78,8 @@ class Node(NodeBase):
         self._pageMinThreshold: float = 0
         self._pageMaxThreshold: float = 0.9
         self._pageUseMorph: bool = True
+        self._pageAdaptive: bool = False
+        self._page: PAGE = PAGE(direction_bins=self._pageDirectionBins, backend=self._settings.phycvBackend)
 
         self._attrImageInput = NodeAttribute(tag=editorHandle.getUniqueTag(),
                                              parentNodeTag=self._tag,
@@ -226,6 +234,10 @@ class Node(NodeBase):
                                      default_value=self._pstUseMorph,
                                      callback=self.__callbackPSTUseMorphChange)
 
+                    dpg.add_checkbox(label="adaptive resolution",
+                                     default_value=self._pstAdaptive,
+                                     callback=self.__callbackPSTAdaptiveChange)
+
                 with dpg.group(tag=self._pageGroupTag, indent=35, show=False):
                     with dpg.group(horizontal=True):
                         dpg.add_text(default_value="bins")
@@ -320,6 +332,10 @@ class Node(NodeBase):
                                      default_value=self._pageUseMorph,
                                      callback=self.__callbackPageUseMorphChange)
 
+                    dpg.add_checkbox(label="adaptive resolution",
+                                     default_value=self._pageAdaptive,
+                                     callback=self.__callbackPageAdaptiveChange)
+
             dpg.add_node_attribute(tag=self._attrImageOutput.tag,
                                    attribute_type=dpg.mvNode_Attr_Output,
                                    shape=dpg.mvNode_PinShape_Triangle)
@@ -358,6 +374,10 @@ class Node(NodeBase):
         self.__applyFilter()
 
     def __applyFilter(self):
+        with self._filterLock:
+            self.__runFilter()
+
+    def __runFilter(self):
         if self._currentImage is None:
             return
         img = self._currentImage.copy()
@@ -384,28 +404,28 @@ class Node(NodeBase):
             self._attrImageOutput.data = cv2.cvtColor(img, cv2.COLOR_GRAY2RGBA)
 
         elif self._currentFilter == "PST":
-            img = pst(img=img,
-                      phaseStrength=self._pstPhaseStrength,
-                      warpStrength=self._pstWarpStrength,
-                      lpfSigma=self._pstLPFSigma,
-                      minThreshold=self._pstMinThreshold,
-                      maxThreshold=self._pstMaxThreshold,
-                      useMorph=self._pstUseMorph)
+            img = self._pst.run(img_array=img,
+                                S=self._pstPhaseStrength,
+                                W=self._pstWarpStrength,
+                                sigma_LPF=self._pstLPFSigma,
+                                thresh_min=self._pstMinThreshold,
+                                thresh_max=self._pstMaxThreshold,
+                                morph_flag=self._pstUseMorph)
             self._attrImageOutput.data = cv2.cvtColor(img, cv2.COLOR_GRAY2RGBA)
 
         elif self._currentFilter == "PAGE":
-            img = page(img=img,
-                       directionBins=self._pageDirectionBins,
-                       mu1=self._pageMu1,
-                       mu2=self._pageMu2,
-                       sigma1=self._pageSigma1,
-                       sigma2=self._pageSigma2,
-                       phaseStrength1=self._pagePhaseStrength1,
-                       phaseStrength2=self._pagePhaseStrength2,
-                       lpfSigma=self._pageLPFSigma,
-                       minThreshold=self._pageMinThreshold,
-                       maxThreshold=self._pageMaxThreshold,
-                       useMorph=self._pageUseMorph)
+            img = self._page.run(img_array=img,
+                                 direction_bins=self._pageDirectionBins,
+                                 mu_1=self._pageMu1,
+                                 mu_2=self._pageMu2,
+                                 sigma_1=self._pageSigma1,
+                                 sigma_2=self._pageSigma2,
+                                 S1=self._pagePhaseStrength1,
+                                 S2=self._pagePhaseStrength2,
+                                 sigma_LPF=self._pageLPFSigma,
+                                 thresh_min=self._pageMinThreshold,
+                                 thresh_max=self._pageMaxThreshold,
+                                 morph_flag=self._pageUseMorph)
             self._attrImageOutput.data = cv2.cvtColor(img, cv2.COLOR_RGB2RGBA)
 
     def __callbackCannyMinChange(self, _, data):
@@ -472,6 +492,12 @@ class Node(NodeBase):
         self._pstUseMorph = data
         self.__applyFilter()
 
+    def __callbackPSTAdaptiveChange(self, _, data):
+        self._pstAdaptive = data
+        with self._filterLock:
+            self._pst.adaptive_tol = ADAPTIVE_TOLERANCE if data else None
+        self.__applyFilter()
+
     def __callbackPageDirectionBinsChange(self, _, data):
         self._pageDirectionBins = data
         self.__applyFilter()
@@ -515,3 +541,9 @@ class Node(NodeBase):
     def __callbackPageUseMorphChange(self, _, data):
         self._pageUseMorph = data
         self.__applyFilter()
+
+    def __callbackPageAdaptiveChange(self, _, data):
+        self._pageAdaptive = data
+        with self._filterLock:
+            self._page.adaptive_tol = ADAPTIVE_TOLERANCE if data else None
+        self.__applyFilter()
@@ -1,3 +1,4 @@
+import threading
 from typing import Union
 
 import dearpygui.dearpygui as dpg
@@ -5,7 +6,7 @@ import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
-from nodes.filters.algorithms.light_enhancement import vevid
+from nodes.filters.algorithms.phycv import ADAPTIVE_TOLERANCE, VEVID
 from nodes.node import NodeBase
 
 
@@ -21,6 +22,9 @@ class Node(NodeBase):
         super().__init__(tag=tag, editor=editorHandle)
         self._width: int = self._settings.nodeWidth
         self._currentImage: Union[np.ndarray, None] = None
+        # the VEVID engine keeps kernels between runs; the UI callbacks and update() both run the
+        # filter, so only one of them may use the engine at a time
+        self._filterLock = threading.Lock()
         self._currentFilter = self._filters[0]
 
         self._vevidGroupTag: int = editorHandle.getUniqueTag()
@@ -32,6 +36,8 @@ class Node(NodeBase):
         self._vevidPhaseActivationGain: float = 1.4
         self._vevidEnhanceColor: bool = False
         self._vevidLiteMode: bool = True
+        self._vevidAdaptive: bool = False
+        self._vevid: VEVID = VEVID(backend=self._settings.phycvBackend)
 
         self._attrImageInput = NodeAttribute(tag=editorHandle.getUniqueTag(),
                                              parentNodeTag=self._tag,
@@ -111,6 +117,10 @@ class Node(NodeBase):
                                      default_value=self._vevidLiteMode,
                                      callback=self.__callbackVEVIDLiteMode)
 
+                    dpg.add_checkbox(label="adaptive resolution",
+                                     default_value=self._vevidAdaptive,
+                                     callback=self.__callbackVEVIDAdaptive)
+
             dpg.add_node_attribute(tag=self._attrImageOutput.tag,
                                    attribute_type=dpg.mvNode_Attr_Output,
                                    shape=dpg.mvNode_PinShape_Triangle)
@@ -125,17 +135,20 @@ class Node(NodeBase):
         self.__applyFilter()
 
     def __applyFilter(self):
+        with self._filterLock:
+            self.__runFilter()
+
+    def __runFilter(self):
         if self._currentImage is None:
             return
-        img = self._currentImage.copy()
         if self._currentFilter == "VEVID":
-            img = vevid(img=img,
-                        phaseStrength=self._vevidPhaseStrength,
-                        spectralPhaseFcnVariance=self._vevidSpectralPhaseFcnVariance,
-                        regularizationTerm=self._vevidRegularizationTerm,
-                        phaseActivationGain=self._vevidPhaseActivationGain,
-                        enhanceColor=self._vevidEnhanceColor,
-                        liteMode=self._vevidLiteMode)
+            img = self._vevid.run(img_array=self._currentImage,
+                                  S=self._vevidPhaseStrength,
+                                  T=self._vevidSpectralPhaseFcnVariance,
+                                  b=self._vevidRegularizationTerm,
+                                  G=self._vevidPhaseActivationGain,
+                                  color=self._vevidEnhanceColor,
+                                  lite=self._vevidLiteMode)
             self._attrImageOutput.data = img
 
     def __callbackComboChange(self, _, data):
@@ -167,3 +180,9 @@ class Node(NodeBase):
     def __callbackVEVIDLiteMode(self, _, data):
         self._vevidLiteMode = data
         self.__applyFilter()
+
+    def __callbackVEVIDAdaptive(self, _, data):
+        self._vevidAdaptive = data
+        with self._filterLock:
+            self._vevid.adaptive_tol = ADAPTIVE_TOLERANCE if data else None
+        self.__applyFilter()
@@ -1,17 +1,19 @@
 from typing import Union
 
-import cv2
 import dearpygui.dearpygui as dpg
 import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
+from nodes.inputs.objects.image_objects import getDecodedImageStore, readImage
 from nodes.node import NodeBase
 
 
 class Node(NodeBase):
     nodeLabel = "Image"
 
+    _decodeScales = {"full size": 1, "1/2 size": 2, "1/4 size": 4, "1/8 size": 8, "auto": None}
+
     def __init__(self,
                  tag: int,
                  pos: tuple[int, int],
@@ -21,6 +23,10 @@ class Node(NodeBase):
         self._frameSizeTextTag: int = editorHandle.getUniqueTag()
 
         self._currentImage: Union[np.ndarray, None] = None
+        self._filePath: Union[str, None] = None
+        self._decodeScale: Union[int, None] = 1
+        self._targetSize: Union[tuple[int, int], None] = None
+        self._cacheDecoded: bool = False
 
         self._attrImageOutput = NodeAttribute(tag=editorHandle.getUniqueTag(),
                                               parentNodeTag=self._tag,
@@ -38,6 +44,13 @@ class Node(NodeBase):
                 dpg.add_button(label='select image',
                                width=self._width,
                                callback=lambda: dpg.show_item(item=fileDialogTag))
+                dpg.add_combo(items=list(self._decodeScales.keys()),
+                              default_value=list(self._decodeScales.keys())[0],
+                              width=self._width,
+                              callback=self.__callbackDecodeScale)
+                dpg.add_checkbox(label="cache decoded",
+                                 default_value=self._cacheDecoded,
+                                 callback=self.__callbackCacheDecoded)
 
             with dpg.node_attribute(tag=self._attrImageOutput.tag,
                                     attribute_type=dpg.mvNode_Attr_Output,
@@ -46,16 +59,41 @@ class Node(NodeBase):
                              indent=self._width - 100)
 
     def update(self):
-        return None
+        if self._filePath is None or self._decodeScale is not None:
+            return
+        # auto: decode at the smallest size the downstream Resize nodes still fill
+        targetSize = self.downstreamInputSize(attr=self._attrImageOutput)
+        if targetSize != self._targetSize:
+            self._targetSize = targetSize
+            self.__loadImage()
 
     def __callbackOpenFile(self, sender: str, data: dict):
         # data is a dictionary with some keys being "file_path_name", \
         # "file_name", "current_path", "current_filter"
-        img = cv2.imread(filename=data['file_path_name'], flags=cv2.IMREAD_UNCHANGED)
-        if img.ndim == 3 and img.shape[2] == 4:
-            img = cv2.cvtColor(src=img, code=cv2.COLOR_BGRA2RGBA)
-        else:
-            img = cv2.cvtColor(src=img, code=cv2.COLOR_BGR2RGBA)
-        img = img.astype(np.float32) / 255
+        self._filePath = data['file_path_name']
+        self.__loadImage()
+
+    def __callbackDecodeScale(self, _, data):
+        self._decodeScale = self._decodeScales[data]
+        self._targetSize = None
+        if self._filePath is not None:
+            self.__loadImage()
+
+    def __callbackCacheDecoded(self, _, data):
+        self._cacheDecoded = data
+
+    def __loadImage(self):
+        read = readImage
+        if self._cacheDecoded:
+            # the store is shared with the Image Folder nodes
+            read = getDecodedImageStore(cacheDir=self._settings.CacheDirPath.joinpath("decoded"),
+                                        budgetBytes=self._settings.decodedImageCacheBudget).read
+        img = read(filePath=self._filePath,
+                   scale=self._decodeScale or 1,
+                   targetSize=self._targetSize if self._decodeScale is None else None)
+        if img is None:
+            print(f"can't properly open this file:\n{self._filePath}")
+            return
+        self._currentImage = img
         self._attrImageOutput.data = img
         dpg.set_value(item=self._frameSizeTextTag, value=img.shape[:2])
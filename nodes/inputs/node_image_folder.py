@@ -1,18 +1,20 @@
+import threading
+from concurrent.futures import CancelledError, Future
 from pathlib import Path
 from typing import Union
 
-import cv2
 import dearpygui.dearpygui as dpg
-import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
+from nodes.inputs.objects.image_objects import FolderIndex, ImagePrefetcher, getDecodedImageStore
 from nodes.node import NodeBase
 
 
 class Node(NodeBase):
     nodeLabel = "Image Folder"
-    _filePatterns = ["*.png", "*.PNG", "*.jpg", "*.jpeg", "*.JPEG"]
+    _prefetchDepth: int = 8
+    _decodeScales = {"full size": 1, "1/2 size": 2, "1/4 size": 4, "1/8 size": 8, "auto": None}
 
     def __init__(self,
                  tag: int,
@@ -23,7 +25,16 @@ class Node(NodeBase):
         self._searchSubDirs: bool = False
         self._currentImageIndex: int = 0
         self._currentPath: Union[Path, None] = None
-        self._pathList: list[Path] = list()
+        self._pathList: list[str] = list()
+        self._folderIndex: Union[FolderIndex, None] = None
+        self._watch: bool = False
+        self._prefetcher: Union[ImagePrefetcher, None] = None
+        # the image a UI callback asked for, shown by update() once it is decoded
+        self._pendingImage: Union[Future, None] = None
+        # held by update() and by the callbacks that change or replace the folder and the prefetcher
+        self._folderLock = threading.Lock()
+        self._decodeScale: Union[int, None] = 1
+        self._cacheDecoded: bool = False
         self._intDragTag = editorHandle.getUniqueTag()
         self._frameSizeTextTag: int = editorHandle.getUniqueTag()
         self._fileCount: int = 0
@@ -48,7 +59,16 @@ class Node(NodeBase):
                     dpg.add_button(label='select folder',
                                    width=self._width,
                                    callback=lambda: dpg.show_item(item=folderDialogTag))
-                    dpg.add_checkbox(label="subdirs", callback=self.__callbackSearchSubDirs)
+                    with dpg.group(horizontal=True):
+                        dpg.add_checkbox(label="subdirs", callback=self.__callbackSearchSubDirs)
+                        dpg.add_checkbox(label="watch", default_value=self._watch, callback=self.__callbackWatch)
+                    dpg.add_combo(items=list(self._decodeScales.keys()),
+                                  default_value=list(self._decodeScales.keys())[0],
+                                  width=self._width,
+                                  callback=self.__callbackDecodeScale)
+                    dpg.add_checkbox(label="cache decoded",
+                                     default_value=self._cacheDecoded,
+                                     callback=self.__callbackCacheDecoded)
 
             with dpg.node_attribute(tag=editorHandle.getUniqueTag(),
                                     attribute_type=dpg.mvNode_Attr_Static):
@@ -74,51 +94,110 @@ class Node(NodeBase):
                              indent=self._width - 100)
 
     def update(self):
-        if self._iterate:
-            if self._loop and self._currentImageIndex + 1 == self._fileCount:
-                self._currentImageIndex = -1
-            if self._fileCount == 0 or self._currentImageIndex + 1 == self._fileCount:
+        with self._folderLock:
+            if self._prefetcher is None:
                 return
-            self._currentImageIndex += 1
+            self.__syncFileCount()
+            if self._decodeScale is None:
+                # auto: decode at the smallest size the downstream Resize nodes still fill
+                targetSize = self.downstreamInputSize(attr=self._attrImageOutput)
+                if targetSize != self._prefetcher.targetSize:
+                    self._prefetcher.targetSize = targetSize
+                    if not self._iterate and self._fileCount:
+                        self._pendingImage = self._prefetcher.fetch(index=self._currentImageIndex)
+            self.__showPendingImage()
+            if self._iterate and self._fileCount:
+                nextIndex = self._currentImageIndex + 1
+                if self._loop and nextIndex == self._fileCount:
+                    nextIndex = 0
+                if nextIndex == self._fileCount:
+                    return
+                future = self._prefetcher.fetch(index=nextIndex)
+                if not future.done():
+                    # the graph keeps running while the image is still being decoded
+                    return
+                self._currentImageIndex = nextIndex
+                dpg.set_value(item=self._intDragTag, value=self._currentImageIndex)
+                self.__showImage(future=future)
+
+    def close(self):
+        with self._folderLock:
+            self.__closeFolder()
+        dpg.delete_item(item=self._tag)
+
+    def __closeFolder(self):
+        if self._folderIndex is not None:
+            self._folderIndex.stop()
+            self._folderIndex = None
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            if self._prefetcher.store is not None:
+                self._prefetcher.store.flush()
+            self._prefetcher = None
+        self._pendingImage = None
+        self._pathList = list()
+        self._fileCount = 0
+
+    def __syncFileCount(self):
+        # the folder index keeps appending files while it scans, and in watch mode afterwards; when
+        # files are deleted or renamed it lists the rest in a new list, which the indices then refer to
+        replaced = self._folderIndex.paths is not self._pathList
+        if replaced:
+            self._pathList = self._folderIndex.paths
+            self._prefetcher.paths = self._pathList
+        count = len(self._pathList)
+        if count == self._fileCount and not replaced:
+            return
+        firstImage = self._fileCount == 0
+        self._fileCount = count
+        if count == 0:
+            dpg.configure_item(item=self._intDragTag, format="0 / 0", max_value=0)
+            return
+        dpg.configure_item(item=self._intDragTag, format=f"index %f / {count - 1}", max_value=count - 1)
+        if firstImage or replaced:
+            self._currentImageIndex = 0 if firstImage else min(self._currentImageIndex, count - 1)
             dpg.set_value(item=self._intDragTag, value=self._currentImageIndex)
-            self.__loadCurrentIndexImage()
+            self._pendingImage = self._prefetcher.fetch(index=self._currentImageIndex)
 
     def __callbackGetImages(self, sender: str, data: dict):
         # data is a dictionary with some keys being "file_path_name", \
         # "file_name", "current_path", "current_filter"
-        self._currentPath = Path(data['file_path_name'])
-        self._pathList.clear()
-        if self._searchSubDirs:
-            for pattern in self._filePatterns:
-                self._pathList.extend(list(self._currentPath.rglob(pattern=pattern)))
-        else:
-            for pattern in self._filePatterns:
-                self._pathList.extend(list(self._currentPath.glob(pattern=pattern)))
-
-        if not self._pathList:
-            dpg.configure_item(item=self._intDragTag,
-                               format="0 / 0")
+        currentPath = Path(data['file_path_name'])
+        folderIndex = FolderIndex(root=currentPath,
+                                  recursive=self._searchSubDirs,
+                                  cacheDir=self._settings.CacheDirPath.joinpath("folders"),
+                                  watch=self._watch)
+        prefetcher = ImagePrefetcher(paths=folderIndex.paths, depth=self._prefetchDepth, loop=self._loop)
+        prefetcher.scale = self._decodeScale or 1
+        prefetcher.store = self.__decodedImageStore()
+        # the folder is listed on the index thread; update() shows the first image once it is found
+        with self._folderLock:
+            self.__closeFolder()
+            self._currentPath = currentPath
+            dpg.configure_item(item=self._intDragTag, format="0 / 0", max_value=0)
+            self._folderIndex = folderIndex
+            # the list the prefetcher got, __syncFileCount() moves both to a newer one
+            self._pathList = prefetcher.paths
+            self._prefetcher = prefetcher
+            self.__syncFileCount()
+
+    def __showPendingImage(self):
+        future = self._pendingImage
+        if future is None or not future.done():
+            return
+        self._pendingImage = None
+        self.__showImage(future=future)
+
+    def __showImage(self, future: Future):
+        # only called with a finished future, result() does not wait
+        try:
+            img = future.result()
+        except CancelledError:
+            # a jump of the index slider made the image obsolete
             return
-
-        self._currentImageIndex = 0
-        dpg.configure_item(item=self._intDragTag,
-                           format=f"index %f / {len(self._pathList) - 1}",
-                           default_value=0,
-                           max_value=len(self._pathList) - 1)
-
-        self._fileCount = len(self._pathList)
-        self.__loadCurrentIndexImage()
-
-    def __loadCurrentIndexImage(self):
-        img = cv2.imread(filename=str(self._pathList[self._currentImageIndex].resolve()), flags=cv2.IMREAD_UNCHANGED)
         if img is None:
-            print(f"can't properly open this file:\n{self._pathList[self._currentImageIndex].resolve()}")
+            print(f"can't properly open this file:\n{self._pathList[self._currentImageIndex]}")
             return
-        if img.ndim == 3 and img.shape[2] == 4:
-            img = cv2.cvtColor(src=img, code=cv2.COLOR_BGRA2RGBA)
-        else:
-            img = cv2.cvtColor(src=img, code=cv2.COLOR_BGR2RGBA)
-        img = img.astype(np.float32) / 255
         self._attrImageOutput.data = img
         dpg.set_value(item=self._frameSizeTextTag, value=img.shape[:2])
 
@@ -127,12 +206,49 @@ class Node(NodeBase):
         if self._currentPath is not None:
             self.__callbackGetImages(sender=str(), data={"file_path_name": str(self._currentPath.resolve())})
 
+    def __callbackWatch(self, _, data):
+        self._watch = data
+        with self._folderLock:
+            if self._folderIndex is not None:
+                self._folderIndex.watch = data
+
     def __callbackIterate(self, _, data):
         self._iterate = data
 
+    def __callbackDecodeScale(self, _, data):
+        self._decodeScale = self._decodeScales[data]
+        with self._folderLock:
+            if self._prefetcher is None or self._fileCount == 0:
+                return
+            self._prefetcher.scale = self._decodeScale or 1
+            if self._decodeScale is not None:
+                self._prefetcher.targetSize = None
+            self._pendingImage = self._prefetcher.fetch(index=self._currentImageIndex)
+
+    def __callbackCacheDecoded(self, _, data):
+        self._cacheDecoded = data
+        with self._folderLock:
+            if self._prefetcher is not None:
+                self._prefetcher.store = self.__decodedImageStore()
+
+    def __decodedImageStore(self):
+        # later passes over the folder map the decoded images instead of decoding them again
+        if not self._cacheDecoded:
+            return None
+        return getDecodedImageStore(cacheDir=self._settings.CacheDirPath.joinpath("decoded"),
+                                    budgetBytes=self._settings.decodedImageCacheBudget)
+
     def __callbackLoop(self, _, data):
         self._loop = data
+        with self._folderLock:
+            if self._prefetcher is not None:
+                self._prefetcher.loop = data
 
     def __callbackCurrentImageChange(self, _, data):
-        self._currentImageIndex = data
-        self.__loadCurrentIndexImage()
+        with self._folderLock:
+            if self._prefetcher is None or data >= self._fileCount:
+                return
+            # read ahead in the direction the slider moves, everything scheduled elsewhere is cancelled
+            direction = -1 if data < self._currentImageIndex else 1
+            self._currentImageIndex = data
+            self._pendingImage = self._prefetcher.fetch(index=data, direction=direction)
@@ -0,0 +1,199 @@
+import threading
+from typing import Union
+
+import dearpygui.dearpygui as dpg
+
+from node_editor.connection_objects import NodeAttribute, AttributeType
+from node_editor.editor import NodeEditor
+from nodes.inputs.objects.camera_objects import CameraCapture, DeviceCapture, FileCapture, SynchronizedCapture, \
+    probeCameras
+from nodes.node import NodeBase
+
+
+class Node(NodeBase):
+    nodeLabel = "Multi Camera"
+
+    _noSourceItem: str = "none"
+    _virtualCameraItem: str = "video file"
+
+    def __init__(self,
+                 tag: int,
+                 pos: tuple[int, int],
+                 editorHandle: NodeEditor):
+        super().__init__(tag=tag, editor=editorHandle)
+        self._width: int = self._settings.nodeWidth
+        self._editorHandle = editorHandle
+        self._deviceItems: dict[str, int] = dict()
+        self._captures: list[Union[CameraCapture, None]] = list()
+        self._sourceComboTags: list[int] = list()
+        # the synchronizer and the output slots of its sources, replaced together as one tuple so
+        # that update() never pairs the slots of one with the other
+        self._sync: Union[tuple[SynchronizedCapture, list[int]], None] = None
+        self._tolerance: float = 20.0
+        self._pendingSlot: int = 0
+        self._sourceCount: int = 2
+        # sources are added and removed on the graph thread while any pin is linked, see update()
+        self._requestedSourceCount: int = self._sourceCount
+        self._sourcesLock = threading.Lock()
+
+        self._fileDialogTag: int = editorHandle.getUniqueTag()
+        self._countersTextTag: int = editorHandle.getUniqueTag()
+
+        with dpg.node(tag=self._tag,
+                      parent=editorHandle.tag,
+                      label=self.nodeLabel,
+                      pos=pos):
+            editorHandle.createVideoFileSelectionDialog(tag=self._fileDialogTag, callback=self.__callbackOpenFile)
+            with dpg.node_attribute(tag=editorHandle.getUniqueTag(),
+                                    attribute_type=dpg.mvNode_Attr_Static):
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="cameras")
+                    dpg.add_input_int(width=self._width - 65,
+                                      default_value=self._sourceCount,
+                                      min_value=1,
+                                      min_clamped=True,
+                                      on_enter=True,
+                                      callback=self.__callbackSourceCountChange)
+                dpg.add_drag_float(width=self._width,
+                                   format="tolerance %.1f ms",
+                                   default_value=self._tolerance,
+                                   min_value=0.5,
+                                   max_value=500,
+                                   clamped=True,
+                                   callback=self.__callbackToleranceChange)
+                dpg.add_text(tag=self._countersTextTag, wrap=self._width)
+
+        for _ in range(self._sourceCount):
+            self.__addSource()
+        # the device list is shared with the Webcam nodes, see probeCameras()
+        threading.Thread(target=self.__updateDeviceItems, daemon=True).start()
+
+    def update(self):
+        if self._requestedSourceCount != self._sourceCount:
+            self.__applySourceCount()
+        # the source callbacks replace the synchronizer on the UI thread
+        synchronizer = self._sync
+        if synchronizer is None:
+            return
+        sync, syncSlots = synchronizer
+        synchronized = sync.read()
+        if synchronized is None:
+            return
+        _, frames = synchronized
+        for slot, frame in zip(syncSlots, frames):
+            self.outAttrs[slot].data = frame
+        dropped = " ".join(str(x) for x in sync.dropped)
+        duplicated = " ".join(str(x) for x in sync.duplicated)
+        dpg.set_value(item=self._countersTextTag,
+                      value=f"dropped {dropped}\nduplicated {duplicated}\nunmatched {sync.unmatched}")
+
+    def close(self):
+        with self._sourcesLock:
+            for slot in range(len(self._captures)):
+                self.__releaseCapture(slot=slot)
+        dpg.delete_item(item=self._tag)
+        dpg.delete_item(item=self._fileDialogTag)
+
+    def __updateDeviceItems(self):
+        devices = probeCameras()
+        self._deviceItems = {f"{index}: {name}": index for index, name in sorted(devices.items())}
+        for comboTag in self._sourceComboTags:
+            dpg.configure_item(item=comboTag, items=self.__sourceItems())
+
+    def __sourceItems(self) -> list[str]:
+        return [self._noSourceItem] + list(self._deviceItems) + [self._virtualCameraItem]
+
+    def __addSource(self):
+        slot = len(self.outAttrs)
+        attr = NodeAttribute(tag=self._editor.getUniqueTag(), parentNodeTag=self._tag, attrType=AttributeType.Image)
+        self.outAttrs.append(attr)
+        self._captures.append(None)
+        comboTag = self._editor.getUniqueTag()
+        self._sourceComboTags.append(comboTag)
+        with dpg.node_attribute(tag=attr.tag,
+                                parent=self._tag,
+                                attribute_type=dpg.mvNode_Attr_Output,
+                                shape=dpg.mvNode_PinShape_Triangle):
+            dpg.add_combo(tag=comboTag,
+                          items=self.__sourceItems(),
+                          default_value=self._noSourceItem,
+                          width=self._width,
+                          callback=self.__callbackSourceChange,
+                          user_data=slot)
+
+    def __removeSource(self):
+        slot = len(self.outAttrs) - 1
+        self.__releaseCapture(slot=slot)
+        attr = self.outAttrs.pop()
+        self._captures.pop()
+        self._sourceComboTags.pop()
+        for connection in list(attr.connections):
+            self._editor.callbackRemoveLink(sender=None, data=connection.tag)
+        dpg.delete_item(item=attr.tag)
+
+    def __applySourceCount(self):
+        with self._sourcesLock:
+            count = self._requestedSourceCount
+            if count == self._sourceCount:
+                return
+            # update() must not see the slots of the old sources any more
+            self._sync = None
+            while len(self.outAttrs) < count:
+                self.__addSource()
+            while len(self.outAttrs) > count:
+                self.__removeSource()
+            self._sourceCount = count
+            self.__synchronize()
+
+    def __callbackSourceCountChange(self, _, data):
+        self._requestedSourceCount = data
+        # the graph thread walks the pins and links of linked nodes only, so the pins of a node
+        # without links can change right away; otherwise update() changes them between graph passes
+        if not any(attr.connections for attr in self.outAttrs):
+            self.__applySourceCount()
+
+    def __callbackToleranceChange(self, _, data):
+        self._tolerance = data
+        synchronizer = self._sync
+        if synchronizer is not None:
+            synchronizer[0].tolerance = data / 1000
+
+    def __callbackSourceChange(self, _, data, user_data: int):
+        if data == self._virtualCameraItem:
+            self._pendingSlot = user_data
+            self._editorHandle.pause()
+            dpg.show_item(item=self._fileDialogTag)
+            return
+        capture = None
+        if data != self._noSourceItem:
+            capture = DeviceCapture(deviceIndex=self._deviceItems[data],
+                                    width=self._settings.webcamWidth,
+                                    height=self._settings.webcamHeight)
+        self.__useCapture(slot=user_data, capture=capture)
+
+    def __callbackOpenFile(self, _, data):
+        self.__useCapture(slot=self._pendingSlot, capture=FileCapture(filePath=data["file_path_name"]))
+        self._editorHandle.resume()
+
+    def __useCapture(self, slot: int, capture: Union[CameraCapture, None]):
+        with self._sourcesLock:
+            if slot >= len(self._captures):
+                # the source was removed meanwhile
+                return
+            self.__releaseCapture(slot=slot)
+            self._captures[slot] = capture.start() if capture is not None else None
+            self.__synchronize()
+
+    def __releaseCapture(self, slot: int):
+        capture = self._captures[slot]
+        if capture is not None:
+            capture.stop()
+            self._captures[slot] = None
+
+    def __synchronize(self):
+        # the counters start over whenever the set of sources changes
+        syncSlots = [slot for slot, capture in enumerate(self._captures) if capture is not None]
+        captures = [self._captures[slot] for slot in syncSlots]
+        sync = SynchronizedCapture(captures=captures, tolerance=self._tolerance / 1000) if captures else None
+        self._sync = (sync, syncSlots) if sync is not None else None
+        dpg.set_value(item=self._countersTextTag, value=str())
@@ -1,18 +1,18 @@
-import time
+import threading
+from typing import Union
 
-import cv2
 import dearpygui.dearpygui as dpg
-import numpy as np
-from PIL import ImageGrab
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
+from nodes.inputs.objects.screen_objects import ScreenCapture, availableScreenGrabbers
 from nodes.node import NodeBase
 
 
 class Node(NodeBase):
     nodeLabel = "Screen Recorder"
-    _modes = ["only main screen", "all screens"]
+    # index of each mode in the grabber's monitor list
+    _modes = {"only main screen": 1, "all screens": 0}
 
     def __init__(self,
                  tag: int,
@@ -20,15 +20,21 @@ class Node(NodeBase):
                  editorHandle: NodeEditor):
         super().__init__(tag=tag, editor=editorHandle)
         self._width: int = self._settings.nodeWidth
-        self._captureMode: str = self._modes[0]
+        self._captureMode: str = list(self._modes.keys())[0]
+        self._grabbers: list[str] = availableScreenGrabbers()
+        self._grabber: str = self._grabbers[0]
         self._keepCapturing: bool = True
         self._captureInterval: float = 0.033
-        self._keepTicking: bool = False
-        self._t1: float = 0
-        self._t2: float = 0
+        # x, y, width and height in the screen, a width or height of 0 reaches to the screen's edge
+        self._region: tuple[int, int, int, int] = (0, 0, 0, 0)
+        self._capture: Union[ScreenCapture, None] = None
+        # held while the capture is started or stopped, which the UI callbacks and close() both do
+        self._captureLock = threading.Lock()
+        self._frameNumber: int = 0
 
         self._captureIntervalGroupTag: int = editorHandle.getUniqueTag()
         self._frameSizeTextTag: int = editorHandle.getUniqueTag()
+        self._unchangedTextTag: int = editorHandle.getUniqueTag()
         self._currentFrameSize: tuple[int, int] = (0, 0)
 
         self._attrImageOutput = NodeAttribute(tag=editorHandle.getUniqueTag(),
@@ -43,10 +49,23 @@ class Node(NodeBase):
                       pos=pos):
             with dpg.node_attribute(tag=editorHandle.getUniqueTag(),
                                     attribute_type=dpg.mvNode_Attr_Static):
-                dpg.add_combo(items=self._modes,
+                dpg.add_combo(items=self._grabbers,
+                              default_value=self._grabber,
+                              width=self._width,
+                              callback=self.__callbackGrabberChange)
+                dpg.add_combo(items=list(self._modes.keys()),
                               default_value=self._captureMode,
                               width=self._width,
                               callback=self.__callbackCaptureModeChange)
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="region")
+                    dpg.add_input_intx(size=4,
+                                       width=self._width - 60,
+                                       default_value=self._region,
+                                       min_value=0,
+                                       min_clamped=True,
+                                       on_enter=True,
+                                       callback=self.__callbackRegionChange)
                 dpg.add_button(label="capture",
                                width=self._width,
                                callback=self.__callbackCapture)
@@ -59,7 +78,9 @@ class Node(NodeBase):
                                         min_value=0,
                                         min_clamped=True,
                                         step=0.01,
-                                        default_value=self._captureInterval)
+                                        default_value=self._captureInterval,
+                                        callback=self.__callbackCaptureIntervalChange)
+                dpg.add_text(tag=self._unchangedTextTag, wrap=self._width)
 
             with dpg.node_attribute(tag=self._attrImageOutput.tag,
                                     attribute_type=dpg.mvNode_Attr_Output,
@@ -67,41 +88,74 @@ class Node(NodeBase):
                 dpg.add_text(tag=self._frameSizeTextTag,
                              wrap=self._width,
                              indent=self._width - 100)
-            self.__capture()
+        self.__startCapture()
 
     def update(self):
-        if not self._keepCapturing:
+        # the callbacks stop and replace the capture on the UI thread; a stopped one still reads
+        capture = self._capture
+        if capture is None:
             return
-        if not self._keepTicking:
-            self._keepTicking = True
-            self._t1 = time.perf_counter()
-        self._t2 = time.perf_counter()
-        if self._t2 - self._t1 > self._captureInterval:
-            self.__capture()
-            self._keepTicking = False
-
-    def __capture(self):
-        if self._captureMode == "all screens":
-            img = ImageGrab.grab(all_screens=True, include_layered_windows=True)
-        else:
-            img = ImageGrab.grab(all_screens=False, include_layered_windows=True)
-
-        img = np.asarray(a=img)
-        img = cv2.cvtColor(src=img, code=cv2.COLOR_RGB2RGBA)
-        img = (img / 255).astype(np.float32)
+        # the capture thread only delivers grabs in which something changed on the screen
+        captured = capture.read()
+        if captured is None or captured[0] == self._frameNumber:
+            return
+        self._frameNumber, _, img = captured
         self._attrImageOutput.data = img
         if self._currentFrameSize != img.shape[:2]:
             self._currentFrameSize = img.shape[:2]
             dpg.set_value(item=self._frameSizeTextTag, value=img.shape[:2])
+        dpg.set_value(item=self._unchangedTextTag, value=f"unchanged grabs {capture.unchanged}")
+
+    def close(self):
+        with self._captureLock:
+            self.__stopCapture()
+        dpg.delete_item(item=self._tag)
+
+    def __startCapture(self):
+        region = None if self._region == (0, 0, 0, 0) else self._region
+        capture = ScreenCapture(grabber=self._grabber,
+                                monitor=self._modes[self._captureMode],
+                                region=region,
+                                interval=self._captureInterval)
+        capture.paused = not self._keepCapturing
+        capture.trigger()
+        with self._captureLock:
+            self.__stopCapture()
+            # update() only ever sees a capture that is running
+            self._capture = capture.start()
+
+    def __stopCapture(self):
+        if self._capture is not None:
+            self._capture.stop()
+            self._capture = None
+        self._frameNumber = 0
 
     def __callbackCapture(self):
-        if self._keepCapturing:
+        capture = self._capture
+        if self._keepCapturing or capture is None:
             return
-        self.__capture()
+        capture.trigger()
+
+    def __callbackGrabberChange(self, _, data):
+        self._grabber = data
+        self.__startCapture()
 
     def __callbackCaptureModeChange(self, _, data):
         self._captureMode = data
-        self.__capture()
+        self.__startCapture()
+
+    def __callbackRegionChange(self, _, data):
+        self._region = tuple(data[:4])
+        capture = self._capture
+        if capture is not None:
+            capture.region = None if self._region == (0, 0, 0, 0) else self._region
+            capture.trigger()
+
+    def __callbackCaptureIntervalChange(self, _, data):
+        self._captureInterval = data
+        capture = self._capture
+        if capture is not None:
+            capture.interval = data
 
     def __callbackKeepCapturingChange(self, _, data):
         self._keepCapturing = data
@@ -109,4 +163,7 @@ class Node(NodeBase):
             dpg.show_item(item=self._captureIntervalGroupTag)
         else:
             dpg.hide_item(item=self._captureIntervalGroupTag)
-        self.__capture()
+        capture = self._capture
+        if capture is not None:
+            capture.paused = not data
+            capture.trigger()
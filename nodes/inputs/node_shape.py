@@ -1,9 +1,11 @@
+from typing import Union
+
 import dearpygui.dearpygui as dpg
 import numpy as np
-from PIL import Image, ImageDraw
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
+from nodes.inputs.objects.shape_objects import EMPTY_SPRITE, renderShape
 from nodes.node import NodeBase
 
 
@@ -42,7 +44,11 @@ class Node(NodeBase):
         self._regularPolygonBoundRadius: int = 100
         self._regularPolygonRotation: int = 0
 
-        self._polygonPoints: list[tuple[int, int]] = list()
+        self._polygonPoints: list[tuple[int, int]] = [(0, 0), (200, 60), (80, 180)]
+        self._polygonPoint: tuple[int, int] = (0, 0)
+        self._polygonPointsListTag: int = editorHandle.getUniqueTag()
+
+        self._sprite: Union[np.ndarray, None] = None
 
         self._attrImageOutput = NodeAttribute(tag=editorHandle.getUniqueTag(),
                                               parentNodeTag=self._tag,
@@ -130,10 +136,21 @@ class Node(NodeBase):
                 with dpg.group(tag=self._shapeToTagMap["polygon"],
                                indent=15,
                                show=False):
-                    dpg.add_button(label="set points", width=self._width - 100)
                     with dpg.group(horizontal=True):
-                        dpg.add_text(default_value="points")
-                        dpg.add_listbox(width=self._width - 108)
+                        dpg.add_input_intx(size=2,
+                                           width=self._width - 80,
+                                           default_value=self._polygonPoint,
+                                           callback=self.__callbackPolygonPointChange)
+                        dpg.add_button(label="add", width=50, callback=self.__callbackAddPolygonPoint)
+                    dpg.add_listbox(tag=self._polygonPointsListTag,
+                                    items=self.__polygonPointItems(),
+                                    num_items=4,
+                                    width=self._width - 15)
+                    with dpg.group(horizontal=True):
+                        dpg.add_button(label="remove", width=(self._width - 23) // 2,
+                                       callback=self.__callbackRemovePolygonPoint)
+                        dpg.add_button(label="clear", width=(self._width - 23) // 2,
+                                       callback=self.__callbackClearPolygonPoints)
 
                 with dpg.group(horizontal=True, indent=15):
                     dpg.add_text(default_value="stroke")
@@ -163,60 +180,60 @@ class Node(NodeBase):
     def update(self):
         return None
 
-    def __draw(self):
+    def __geometry(self) -> tuple:
         if self._currentShape == "circle":
-            length = self._circleRadius * 2
-            img = Image.new(mode="RGBA", size=(length, length), color=(0, 0, 0, 0))
-            draw = ImageDraw.Draw(im=img, mode="RGBA")
-            draw.ellipse(xy=(0, 0, length, length),
-                         fill=self._fillColor if self._fill else None,
-                         outline=self._strokeColor,
-                         width=self._strokeWidth)
-
-        elif self._currentShape == "ellipse":
-            img = Image.new(mode="RGBA",
-                            size=(self._ellipseHorizontalDiameter, self._ellipseVerticalDiameter),
-                            color=(0, 0, 0, 0))
-            draw = ImageDraw.Draw(im=img, mode="RGBA")
-            draw.ellipse(xy=(0, 0, self._ellipseHorizontalDiameter, self._ellipseVerticalDiameter),
-                         fill=self._fillColor if self._fill else None,
-                         outline=self._strokeColor,
-                         width=self._strokeWidth)
-
-        elif self._currentShape == "rectangle":
-            width = self._rectangleWidth
-            height = self._rectangleHeight
-            img = Image.new(mode="RGBA", size=(width, height))
-            draw = ImageDraw.Draw(im=img, mode="RGBA")
-            draw.rectangle(xy=(0, 0, width, height),
-                           fill=self._fillColor if self._fill else None,
-                           outline=self._strokeColor,
-                           width=self._strokeWidth)
-
-        elif self._currentShape == "line":
-            img = Image.new(mode="RGBA",
-                            size=(self._lineLength, self._strokeWidth))
-            draw = ImageDraw.Draw(im=img, mode="RGBA")
-            draw.line(xy=(0, 0, self._lineLength, 0),
-                      fill=self._strokeColor,
-                      width=self._strokeWidth)
-
-        elif self._currentShape == "regular polygon":
-            length = self._regularPolygonBoundRadius * 2
-            img = Image.new(mode="RGBA", size=(length, length), color=(0, 0, 0, 0))
-            draw = ImageDraw.Draw(im=img, mode="RGBA")
-            draw.regular_polygon(bounding_circle=(length // 2, length // 2, self._regularPolygonBoundRadius),
-                                 n_sides=self._regularPolygonSidesN,
-                                 rotation=self._regularPolygonRotation,
-                                 fill=self._fillColor if self._fill else None,
-                                 outline=self._strokeColor)
-
-        elif self._currentShape == "polygon":
-            pass
-
-        img = (np.asarray(a=img) / 255).astype(np.float32)
+            return "circle", self._circleRadius, self._strokeWidth
+        if self._currentShape == "ellipse":
+            return "ellipse", self._ellipseHorizontalDiameter, self._ellipseVerticalDiameter, self._strokeWidth
+        if self._currentShape == "rectangle":
+            return "rectangle", self._rectangleWidth, self._rectangleHeight, self._strokeWidth
+        if self._currentShape == "line":
+            return "line", self._lineLength, self._strokeWidth
+        if self._currentShape == "regular polygon":
+            return ("regular polygon", self._regularPolygonBoundRadius, self._regularPolygonSidesN,
+                    self._regularPolygonRotation, self._strokeWidth)
+        return "polygon", tuple(self._polygonPoints), self._strokeWidth
+
+    def __draw(self):
+        # a line is all stroke, every other shape only has one if it is at least a pixel wide
+        stroke = self._strokeColor if self._strokeWidth > 0 or self._currentShape == "line" else None
+        fill = self._fillColor if self._fill and self._currentShape != "line" else None
+        img = renderShape(geometry=self.__geometry(), strokeColor=stroke, fillColor=fill)
+        if img is None:
+            # an empty or degenerate shape clears the output instead of leaving the last one on it
+            img = EMPTY_SPRITE
+        # the renderer hands out the same cached sprite for the same parameters, so downstream
+        # nodes only see a new version when the pixels changed
+        if img is self._sprite:
+            return
+        self._sprite = img
         self._attrImageOutput.data = img
 
+    def __polygonPointItems(self) -> list[str]:
+        return [f"{x}, {y}" for x, y in self._polygonPoints]
+
+    def __updatePolygonPoints(self):
+        dpg.configure_item(item=self._polygonPointsListTag, items=self.__polygonPointItems())
+        self.__draw()
+
+    def __callbackPolygonPointChange(self, _, data):
+        self._polygonPoint = tuple(data[:2])
+
+    def __callbackAddPolygonPoint(self):
+        self._polygonPoints.append(self._polygonPoint)
+        self.__updatePolygonPoints()
+
+    def __callbackRemovePolygonPoint(self):
+        selected = dpg.get_value(item=self._polygonPointsListTag)
+        items = self.__polygonPointItems()
+        if selected in items:
+            del self._polygonPoints[items.index(selected)]
+            self.__updatePolygonPoints()
+
+    def __callbackClearPolygonPoints(self):
+        self._polygonPoints.clear()
+        self.__updatePolygonPoints()
+
     def __callbackShapeChange(self, _, data):
         self._currentShape = data
         for shape, groupTag in self._shapeToTagMap.items():
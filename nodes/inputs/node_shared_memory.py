@@ -0,0 +1,110 @@
+import time
+from typing import Union
+
+import dearpygui.dearpygui as dpg
+
+from node_editor.connection_objects import NodeAttribute, AttributeType
+from node_editor.editor import NodeEditor
+from nodes.node import NodeBase
+from nodes.outputs.objects.shared_memory_objects import FrameRingReader
+
+
+class Node(NodeBase):
+    nodeLabel = "Shared Memory"
+    # seconds between attempts to attach to a ring that does not exist yet
+    _retryInterval: float = 0.5
+
+    def __init__(self,
+                 tag: int,
+                 pos: tuple[int, int],
+                 editorHandle: NodeEditor):
+        super().__init__(tag=tag, editor=editorHandle)
+        self._width: int = self._settings.nodeWidth
+        self._ringName: str = "nodium"
+        self._ring: Union[FrameRingReader, None] = None
+        # set by the ring name callback, update() detaches and attaches to the new ring
+        self._ringStale: bool = False
+        self._lastAttempt: float = 0
+        self._sequence: int = 0
+        self._statusTextTag: int = editorHandle.getUniqueTag()
+        self._frameSizeTextTag: int = editorHandle.getUniqueTag()
+        self._currentFrameSize: tuple[int, int] = (0, 0)
+
+        self._attrImageOutput = NodeAttribute(tag=editorHandle.getUniqueTag(),
+                                              parentNodeTag=self._tag,
+                                              attrType=AttributeType.Image)
+
+        self.outAttrs.append(self._attrImageOutput)
+
+        with dpg.node(tag=self._tag,
+                      parent=editorHandle.tag,
+                      label=self.nodeLabel,
+                      pos=pos):
+            with dpg.node_attribute(tag=editorHandle.getUniqueTag(),
+                                    attribute_type=dpg.mvNode_Attr_Static):
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="ring name")
+                    dpg.add_input_text(width=self._width - 80,
+                                       default_value=self._ringName,
+                                       on_enter=True,
+                                       callback=self.__callbackRingNameChange)
+                dpg.add_text(tag=self._statusTextTag, wrap=self._width)
+
+            with dpg.node_attribute(tag=self._attrImageOutput.tag,
+                                    attribute_type=dpg.mvNode_Attr_Output,
+                                    shape=dpg.mvNode_PinShape_Triangle):
+                dpg.add_text(tag=self._frameSizeTextTag,
+                             wrap=self._width,
+                             indent=self._width - 100)
+
+    def update(self):
+        # the ring is only closed here, never while read() is still copying from it
+        if self._ringStale:
+            self._ringStale = False
+            self.__detach()
+            self._lastAttempt = 0
+        if self._ring is None and not self.__attach():
+            return
+        if self._ring.closed:
+            # the writer went away or made a new ring for larger frames
+            self.__detach()
+            dpg.set_value(item=self._statusTextTag, value="ring closed, waiting for a writer")
+            return
+        # a copy is taken so a frame being passed along the graph is never overwritten by the writer
+        frame = self._ring.read(after=self._sequence, copy=True)
+        if frame is None:
+            return
+        self._sequence, timestamp, img = frame
+        self._attrImageOutput.data = img
+        if self._currentFrameSize != img.shape[:2]:
+            self._currentFrameSize = img.shape[:2]
+            dpg.set_value(item=self._frameSizeTextTag, value=img.shape[:2])
+        dpg.set_value(item=self._statusTextTag,
+                      value=f"frame {self._sequence}, {(time.time() - timestamp) * 1000:.1f} ms old")
+
+    def close(self):
+        self.__detach()
+        dpg.delete_item(item=self._tag)
+
+    def __attach(self) -> bool:
+        now = time.perf_counter()
+        if not self._ringName or now - self._lastAttempt < self._retryInterval:
+            return False
+        self._lastAttempt = now
+        try:
+            self._ring = FrameRingReader(name=self._ringName)
+        except (OSError, ValueError):
+            dpg.set_value(item=self._statusTextTag, value=f"waiting for {self._ringName}")
+            return False
+        self._sequence = 0
+        return True
+
+    def __detach(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        self._sequence = 0
+
+    def __callbackRingNameChange(self, _, data):
+        self._ringName = data
+        self._ringStale = True
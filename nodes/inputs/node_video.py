@@ -1,3 +1,5 @@
+import threading
+import time
 from typing import Union
 
 import cv2
@@ -6,13 +8,16 @@ import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
-from nodes.inputs.objects.video_objects import VideoFile
+from nodes.inputs.objects.decoder_backends import availableDecoderBackends
+from nodes.inputs.objects.video_objects import ThumbnailStrip, VideoDecoder, VideoFile
 from nodes.node import NodeBase
 
 
 class Node(NodeBase):
     nodeLabel = "Video"
 
+    _thumbnailInterval: float = 1.0
+
     def __init__(self,
                  tag: int,
                  pos: tuple[int, int],
@@ -22,11 +27,25 @@ class Node(NodeBase):
         self._editorHandle = editorHandle
 
         self._cvf: Union[VideoFile, None] = None
+        self._decoder: Union[VideoDecoder, None] = None
+        # held while the video is opened or closed, which the UI callbacks and close() both do
+        self._videoLock = threading.Lock()
+        self._frameInterval: float = 0
+        self._nextFrameTime: float = 0
+        self._seekPending: bool = False
+        self._thumbnails: Union[ThumbnailStrip, None] = None
+        self._filePath: Union[str, None] = None
+        self._decoderBackends: list[str] = availableDecoderBackends()
+        self._decoderBackend: str = self._settings.videoDecoderBackend
+        if self._decoderBackend not in self._decoderBackends:
+            self._decoderBackend = self._decoderBackends[0]
 
         self._frameSizeTextTag: int = editorHandle.getUniqueTag()
         self._isPlayingTag: int = editorHandle.getUniqueTag()
         self._seekSliderTag: int = editorHandle.getUniqueTag()
         self._controlAttrTag: int = editorHandle.getUniqueTag()
+        self._thumbnailTextureTag: int = editorHandle.getUniqueTag()
+        self._thumbnailImageTag: int = editorHandle.getUniqueTag()
 
         self._loop: bool = True
         self._play: bool = False
@@ -39,6 +58,13 @@ class Node(NodeBase):
                                               attrType=AttributeType.Image)
         self.outAttrs.append(self._attrImageOutput)
 
+        with dpg.texture_registry(show=False):
+            dpg.add_raw_texture(width=1,
+                                height=1,
+                                default_value=np.zeros(shape=4, dtype=np.float32),
+                                tag=self._thumbnailTextureTag,
+                                format=dpg.mvFormat_Float_rgba)
+
         with dpg.node(tag=self._tag, parent=editorHandle.tag, label=self.nodeLabel, pos=pos):
             self.fileDialogTag = editorHandle.getUniqueTag()
             editorHandle.createVideoFileSelectionDialog(tag=self.fileDialogTag, callback=self.__callbackOpenFile)
@@ -47,6 +73,10 @@ class Node(NodeBase):
                 dpg.add_button(label='select video',
                                width=self._width,
                                callback=self.__callbackSelectVideo)
+                dpg.add_combo(items=self._decoderBackends,
+                              default_value=self._decoderBackend,
+                              width=self._width,
+                              callback=self.__callbackDecoderBackend)
 
             with dpg.node_attribute(tag=self._controlAttrTag,
                                     attribute_type=dpg.mvNode_Attr_Static):
@@ -66,6 +96,9 @@ class Node(NodeBase):
                                  max_value=self._seekRange[1],
                                  clamped=True,
                                  callback=self.__callbackSeekFrame)
+                dpg.add_image(tag=self._thumbnailImageTag,
+                              texture_tag=self._thumbnailTextureTag,
+                              show=False)
 
                 with dpg.group(tag=editorHandle.getUniqueTag(), horizontal=True):
                     dpg.add_checkbox(label='loop',
@@ -88,36 +121,61 @@ class Node(NodeBase):
         dpg.show_item(item=self.fileDialogTag)
 
     def update(self):
-        if self._cvf is None:
+        # the callbacks stop and replace the decoder on the UI thread; a stopped one still reads
+        decoder = self._decoder
+        if decoder is None:
             return
-        if not self._play:
+        if not self._play and not self._seekPending:
             return
-        dpg.set_value(item=self._seekSliderTag, value=self._cvf.currentFrame)
-        if not self._cvf.currentFrame + self._skipValue >= self._cvf.frameCount:
-            self._cvf.currentFrame += self._skipValue
-        else:
-            if self._loop:
-                self._cvf.currentFrame = 0
-            else:
-                self._cvf.currentFrame = self._cvf.frameCount - 1
+        now = time.perf_counter()
+        if self._play and now < self._nextFrameTime:
+            return
+        decoded = decoder.read()
+        if decoded is None:
+            if self._play and decoder.finished:
                 dpg.set_value(item=self._isPlayingTag, value=False)
                 self._play = False
                 dpg.enable_item(item=self._seekSliderTag)
-                return
-        frame = self._cvf.readCurrentFrame()
-        frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGR2RGBA)
-        frame = frame.astype(np.float32) / 255
+            return
+        frameIndex, frame = decoded
+        self._seekPending = False
+        if self._play:
+            # keep the file's own pace, catching up by at most one frame after a slow tick
+            self._nextFrameTime = max(self._nextFrameTime + self._frameInterval, now - self._frameInterval)
+        dpg.set_value(item=self._seekSliderTag, value=frameIndex)
         self._attrImageOutput.data = frame
 
     def close(self):
+        with self._videoLock:
+            self.__closeVideo()
+        dpg.delete_item(item=self._tag)
+        dpg.delete_item(item=self._thumbnailTextureTag)
+
+    def __closeVideo(self):
+        if self._thumbnails is not None:
+            self._thumbnails.stop()
+            self._thumbnails = None
+        if self._decoder is not None:
+            self._decoder.stop()
+            self._decoder = None
         if self._cvf is not None:
             self._cvf.closeVideoFile()
-        dpg.delete_item(item=self._tag)
+            self._cvf = None
 
     def __callbackOpenFile(self, _, data):
         # data is a dictionary with some keys being "file_path_name", \
         # "file_name", "current_path", "current_filter"
-        self._cvf = VideoFile(inputFile=data["file_path_name"])
+        with self._videoLock:
+            self.__openVideo(filePath=data["file_path_name"])
+        self._editorHandle.resume()
+
+    def __openVideo(self, filePath: str):
+        self.__closeVideo()
+        self._filePath = filePath
+        self._cvf = VideoFile(inputFile=filePath,
+                              backend=self._decoderBackend,
+                              threads=self._settings.videoDecoderThreads)
+        self._frameInterval = 1 / self._cvf.fps if self._cvf.fps > 0 else 0
         self._seekRange = (0, self._cvf.frameCount - 1)
         dpg.configure_item(item=self._seekSliderTag,
                            default_value=0,
@@ -127,29 +185,83 @@ class Node(NodeBase):
         frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGR2RGBA)
         frame = frame.astype(np.float32) / 255
         self._attrImageOutput.data = frame
+        # from here on the video is only read by the decoder thread
+        self._decoder = VideoDecoder(videoFile=self._cvf,
+                                     skip=self._skipValue,
+                                     loop=self._loop,
+                                     startFrame=self._skipValue)
+        self._thumbnails = ThumbnailStrip(videoFile=self._cvf,
+                                          cacheDir=self._settings.CacheDirPath.joinpath("thumbnails"),
+                                          interval=self._thumbnailInterval)
+        self.__createThumbnailTexture()
 
         dpg.set_value(item=self._frameSizeTextTag, value=frame.shape[:2])
+
+    def __callbackDecoderBackend(self, _, data):
+        self._decoderBackend = data
+        if self._filePath is None:
+            return
+        # reopen the file on the new backend, from the first frame
+        self._editorHandle.pause()
+        with self._videoLock:
+            self.__openVideo(filePath=self._filePath)
         self._editorHandle.resume()
 
     def __callbackLooping(self, _, data):
         self._loop = data
+        decoder = self._decoder
+        if decoder is not None:
+            decoder.loop = data
 
     def __callbackPlaying(self, _, data):
         self._play = data
         if data:
+            dpg.hide_item(item=self._thumbnailImageTag)
+            self._nextFrameTime = time.perf_counter()
+            decoder = self._decoder
+            if decoder is not None and decoder.finished:
+                decoder.seek(frameIndex=0)
             dpg.disable_item(item=self._seekSliderTag)
         else:
             dpg.enable_item(item=self._seekSliderTag)
 
     def __callbackSkipRate(self, _, data):
         self._skipValue = data
+        decoder = self._decoder
+        if decoder is not None:
+            decoder.skip = data
 
     def __callbackSeekFrame(self, _, data):
-        if self._cvf is None:
+        decoder = self._decoder
+        if decoder is None:
             return
         if self._play:
             return
-        frame = self._cvf.retrieveFrame(frameIndex=data)
-        frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGR2RGBA)
-        frame = frame.astype(np.float32) / 255
-        self._attrImageOutput.data = frame
+        # the decoded frame is picked up by update(), without blocking the UI on the seek
+        decoder.seek(frameIndex=data)
+        self._seekPending = True
+        self.__showThumbnail(frameIndex=data)
+
+    def __createThumbnailTexture(self):
+        width, height = self._thumbnails.thumbnailSize
+        dpg.hide_item(item=self._thumbnailImageTag)
+        dpg.delete_item(item=self._thumbnailTextureTag)
+        with dpg.texture_registry(show=False):
+            dpg.add_raw_texture(width=width,
+                                height=height,
+                                default_value=np.zeros(shape=width * height * 4, dtype=np.float32),
+                                tag=self._thumbnailTextureTag,
+                                format=dpg.mvFormat_Float_rgba)
+        dpg.configure_item(item=self._thumbnailImageTag,
+                           texture_tag=self._thumbnailTextureTag,
+                           width=width,
+                           height=height)
+
+    def __showThumbnail(self, frameIndex: int):
+        # an instant preview while the decoder is still on its way to the exact frame
+        thumbnail = self._thumbnails.thumbnail(frameIndex=frameIndex) if self._thumbnails is not None else None
+        if thumbnail is None:
+            return
+        thumbnail = cv2.cvtColor(src=thumbnail, code=cv2.COLOR_RGB2RGBA).astype(np.float32) / 255
+        dpg.set_value(item=self._thumbnailTextureTag, value=thumbnail.ravel())
+        dpg.show_item(item=self._thumbnailImageTag)
@@ -3,31 +3,39 @@
 import threading
 from typing import Union
 
-import cv2
 import dearpygui.dearpygui as dpg
-import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
+from nodes.inputs.objects.camera_objects import CameraCapture, DeviceCapture, FileCapture, probeCameras
 from nodes.node import NodeBase
 
 
 class Node(NodeBase):
     nodeLabel = "Webcam"
 
+    _virtualCameraItem: str = "video file"
+
     def __init__(self,
                  tag: int,
                  pos: tuple[int, int],
                  editorHandle: NodeEditor):
         super().__init__(tag=tag, editor=editorHandle)
         self._width: int = self._settings.nodeWidth
-        self._deviceIndexList: list[int] = list()
-        self._currentVideoCapture: Union[cv2.VideoCapture, None] = None
+        self._editorHandle = editorHandle
+        self._deviceItems: dict[str, int] = dict()
+        self._capture: Union[CameraCapture, None] = None
+        # held while the capture is read or replaced; the UI callbacks, the device probe and
+        # close() all replace it
+        self._captureLock = threading.Lock()
+        self._frameNumber: int = 0
         self._currentDevice: int = 0
         self._loadingAttrTag: int = editorHandle.getUniqueTag()
         self._loadingTextTag: int = editorHandle.getUniqueTag()
         self._loadingIndicatorTag: int = editorHandle.getUniqueTag()
         self._deviceComboTag: int = editorHandle.getUniqueTag()
+        self._refreshButtonTag: int = editorHandle.getUniqueTag()
+        self._fileDialogTag: int = editorHandle.getUniqueTag()
 
         self._attrImageOutput = NodeAttribute(tag=editorHandle.getUniqueTag(),
                                               parentNodeTag=self._tag,
@@ -38,6 +46,7 @@ class Node(NodeBase):
                       parent=editorHandle.tag,
                       label=self.nodeLabel,
                       pos=pos):
+            editorHandle.createVideoFileSelectionDialog(tag=self._fileDialogTag, callback=self.__callbackOpenFile)
             with dpg.node_attribute(tag=self._loadingAttrTag,
                                     attribute_type=dpg.mvNode_Attr_Static):
                 with dpg.group():
@@ -45,58 +54,95 @@ class Node(NodeBase):
                                  default_value="Checking available cameras:\n(this can take a while)")
                     dpg.add_loading_indicator(tag=self._loadingIndicatorTag, indent=80)
                     dpg.add_spacer(width=self._width)
+                    dpg.add_combo(tag=self._deviceComboTag,
+                                  width=self._width,
+                                  show=False,
+                                  callback=self.__callbackDeviceChange)
+                    dpg.add_button(tag=self._refreshButtonTag,
+                                   label="refresh devices",
+                                   width=self._width,
+                                   show=False,
+                                   callback=self.__callbackRefreshDevices)
 
             with dpg.node_attribute(tag=self._attrImageOutput.tag,
                                     attribute_type=dpg.mvNode_Attr_Output,
                                     shape=dpg.mvNode_PinShape_Triangle,
                                     show=False):
                 dpg.add_spacer(width=self._width)
-        threading.Thread(target=self.__checkAndAddCameraDevices).start()
+        # devices are probed once per process, later Webcam nodes get the cached list at once
+        threading.Thread(target=self.__checkAndAddCameraDevices, daemon=True).start()
 
     def update(self):
-        if self._currentVideoCapture is None:
-            return
-        ret, frame = self._currentVideoCapture.read()
-        if ret:
-            frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGR2RGBA)
-            frame = frame.astype(np.float32) / 255
-            self._attrImageOutput.data = frame
+        with self._captureLock:
+            capture = self._capture
+            if capture is None:
+                return
+            # the capture thread keeps only the newest frame, so the graph never waits for the camera
+            captured = capture.read()
+            if captured is None or captured[0] == self._frameNumber:
+                return
+            self._frameNumber, _, self._attrImageOutput.data = captured
 
     def close(self):
-        if self._currentVideoCapture is not None:
-            self._currentVideoCapture.release()
+        with self._captureLock:
+            self.__releaseCapture()
         dpg.delete_item(item=self._tag)
+        dpg.delete_item(item=self._fileDialogTag)
 
-    def __checkAndAddCameraDevices(self):
-        for i in range(5):
-            cap = cv2.VideoCapture(i)
-            if cap is None or not cap.isOpened():
-                count = len(self._deviceIndexList)
-                dpg.set_value(item=self._loadingTextTag, value=f"{count} cameras were found")
-                dpg.hide_item(item=self._loadingIndicatorTag)
-                break
-            self._deviceIndexList.append(i)
-            cap.release()
-        if self._deviceIndexList:
+    def __checkAndAddCameraDevices(self, refresh: bool = False):
+        devices = probeCameras(refresh=refresh)
+        capture = self._capture
+        if isinstance(capture, DeviceCapture) and not capture.finished:
+            # a device this node holds open may not open a second time during the probe
+            devices.setdefault(self._currentDevice, f"device {self._currentDevice}")
+        self._deviceItems = {f"{index}: {name}": index for index, name in sorted(devices.items())}
+        dpg.hide_item(item=self._loadingIndicatorTag)
+        if self._deviceItems:
             dpg.hide_item(item=self._loadingTextTag)
-            dpg.hide_item(item=self._loadingIndicatorTag)
-            items = [f"device {x}" for x in self._deviceIndexList]
-            dpg.add_combo(parent=self._loadingAttrTag,
-                          tag=self._deviceComboTag,
-                          width=self._width,
-                          items=items,
-                          default_value=items[0],
-                          callback=self.__callbackDeviceChange)
+        else:
+            dpg.set_value(item=self._loadingTextTag, value="0 cameras were found")
+        # a video file played in real time stands in for a camera, e.g. for testing without one
+        items = list(self._deviceItems) + [self._virtualCameraItem]
+        current = dpg.get_value(item=self._deviceComboTag)
+        dpg.configure_item(item=self._deviceComboTag, items=items, show=True)
+        dpg.show_item(item=self._refreshButtonTag)
+        if current in items:
+            return
+        dpg.set_value(item=self._deviceComboTag, value=items[0])
+        if self._deviceItems:
             dpg.show_item(item=self._attrImageOutput.tag)
-            self.__useWebcam(deviceIndex=0)
+            self.__useWebcam(deviceIndex=self._deviceItems[items[0]])
+
+    def __callbackRefreshDevices(self):
+        dpg.hide_item(item=self._refreshButtonTag)
+        dpg.show_item(item=self._loadingIndicatorTag)
+        threading.Thread(target=self.__checkAndAddCameraDevices, args=(True,), daemon=True).start()
 
     def __callbackDeviceChange(self, sender, data):
-        index = int(data.split(" ")[-1])
-        self.__useWebcam(deviceIndex=index)
+        if data == self._virtualCameraItem:
+            self._editorHandle.pause()
+            dpg.show_item(item=self._fileDialogTag)
+            return
+        self.__useWebcam(deviceIndex=self._deviceItems[data])
+
+    def __callbackOpenFile(self, _, data):
+        self.__useCapture(capture=FileCapture(filePath=data["file_path_name"]))
+        dpg.show_item(item=self._attrImageOutput.tag)
+        self._editorHandle.resume()
 
     def __useWebcam(self, deviceIndex: int):
-        if self._currentVideoCapture is not None:
-            self._currentVideoCapture.release()
-        self._currentVideoCapture = cv2.VideoCapture(deviceIndex, cv2.CAP_DSHOW)
-        self._currentVideoCapture.set(cv2.CAP_PROP_FRAME_WIDTH, self._settings.webcamWidth)
-        self._currentVideoCapture.set(cv2.CAP_PROP_FRAME_HEIGHT, self._settings.windowHeight)
+        self._currentDevice = deviceIndex
+        self.__useCapture(capture=DeviceCapture(deviceIndex=deviceIndex,
+                                                width=self._settings.webcamWidth,
+                                                height=self._settings.webcamHeight))
+
+    def __useCapture(self, capture: CameraCapture):
+        with self._captureLock:
+            self.__releaseCapture()
+            self._frameNumber = 0
+            self._capture = capture.start()
+
+    def __releaseCapture(self):
+        if self._capture is not None:
+            self._capture.stop()
+            self._capture = None
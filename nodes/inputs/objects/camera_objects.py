@@ -0,0 +1,397 @@
+import re
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+# preferred videoio backends for cameras, fastest to open first; the first one OpenCV was built with is used
+_cameraApiPreferences: dict[str, list[int]] = {"win32": [cv2.CAP_DSHOW, cv2.CAP_MSMF],
+                                               "darwin": [cv2.CAP_AVFOUNDATION],
+                                               "linux": [cv2.CAP_V4L2, cv2.CAP_GSTREAMER]}
+
+
+def defaultCameraApi() -> int:
+    """the videoio backend cameras are opened with on this platform, cv2.CAP_ANY if none of the preferred ones is built in"""
+    available = set(cv2.videoio_registry.getCameraBackends())
+    for api in _cameraApiPreferences.get(sys.platform, list()):
+        if api in available:
+            return api
+    return cv2.CAP_ANY
+
+
+_probeLock = threading.Lock()
+_probedCameras: Union[dict[int, str], None] = None
+
+
+def _linuxCameraCandidates(maxDevices: int) -> dict[int, str]:
+    # every UVC camera registers a capture node (index 0) and a metadata node, only the first can stream
+    candidates = dict()
+    for devicePath in Path("/dev").glob("video*"):
+        match = re.fullmatch(r"video(\d+)", devicePath.name)
+        if match is None or int(match.group(1)) >= maxDevices:
+            continue
+        sysPath = Path("/sys/class/video4linux").joinpath(devicePath.name)
+        try:
+            if sysPath.joinpath("index").read_text().strip() not in ("", "0"):
+                continue
+            name = sysPath.joinpath("name").read_text().strip()
+        except OSError:
+            name = str()
+        candidates[int(match.group(1))] = name or f"device {match.group(1)}"
+    return dict(sorted(candidates.items()))
+
+
+def _openCamera(deviceIndex: int, api: int, results: dict[int, bool]):
+    videoCapture = cv2.VideoCapture(deviceIndex, api)
+    results[deviceIndex] = videoCapture.isOpened()
+    videoCapture.release()
+
+
+def probeCameras(maxDevices: int = 5, timeout: float = 3.0, refresh: bool = False) -> dict[int, str]:
+    """find the camera devices that can be opened, probing them all at once
+
+    The result is cached for the whole process, so only the first call (or one with refresh) pays
+    for opening devices. On Linux only the capture nodes listed under /dev are opened, elsewhere
+    indices 0 to maxDevices - 1 are tried. A device that does not open within timeout seconds is
+    left out; its probe finishes in the background.
+
+    Args:
+        maxDevices (int, optional): number of device indices to consider. Defaults to 5.
+        timeout (float, optional): seconds to wait for all probes together. Defaults to 3.0.
+        refresh (bool, optional): probe again instead of returning the cached result. Defaults to False.
+
+    Returns:
+        dict[int, str]: device index to display name, in index order
+    """
+    global _probedCameras
+    with _probeLock:
+        if _probedCameras is not None and not refresh:
+            return dict(_probedCameras)
+        if sys.platform.startswith("linux"):
+            candidates = _linuxCameraCandidates(maxDevices=maxDevices)
+        else:
+            candidates = {i: f"device {i}" for i in range(maxDevices)}
+        api = defaultCameraApi()
+        results: dict[int, bool] = dict()
+        threads = [threading.Thread(target=_openCamera, args=(i, api, results), daemon=True) for i in candidates]
+        for thread in threads:
+            thread.start()
+        deadline = time.perf_counter() + timeout
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.perf_counter()))
+        _probedCameras = {i: name for i, name in candidates.items() if results.get(i, False)}
+        return dict(_probedCameras)
+
+
+class CameraCapture:
+    # whether the 4th byte of BGRA frames is padding, as in screen grabs, to be made opaque
+    _alphaIsPadding: bool = False
+
+    def __init__(self):
+        """a frame source read by a thread of its own that only ever holds its newest frame
+
+        Frames are converted to RGBA float32 in the range 0-1 on the capture thread and stamped
+        with time.perf_counter() as soon as they are read, so read() never blocks and never
+        returns a frame older than the newest one. Subclasses open the source in _open() and
+        return the next BGR or BGRA frame from _readFrame().
+        """
+        self._condition = threading.Condition()
+        self._frame: Union[np.ndarray, None] = None
+        self._frameNumber: int = 0
+        self._timestamp: float = 0
+        self._readNumber: int = 0
+        self._dropped: int = 0
+        self._history: deque[tuple[int, float, np.ndarray]] = deque(maxlen=1)
+        self._stopped: bool = False
+        self._finished: bool = False
+        self._thread: Union[threading.Thread, None] = None
+
+    @property
+    def frameNumber(self):
+        """number of frames captured so far"""
+        return self._frameNumber
+
+    @property
+    def dropped(self):
+        """number of frames replaced by a newer one before they were read"""
+        return self._dropped
+
+    @property
+    def historySize(self):
+        """number of recent frames kept for history(), the newest one included"""
+        return self._history.maxlen
+
+    @historySize.setter
+    def historySize(self, value: int):
+        with self._condition:
+            self._history = deque(self._history, maxlen=max(1, value))
+
+    @property
+    def finished(self):
+        """whether the source could not be opened or ran out of frames"""
+        return self._finished
+
+    def start(self) -> "CameraCapture":
+        self._thread = threading.Thread(target=self.__captureLoop, daemon=True)
+        self._thread.start()
+        return self
+
+    def read(self) -> Union[tuple[int, float, np.ndarray], None]:
+        """the newest frame without waiting
+
+        Returns:
+            tuple: frame number, capture time (time.perf_counter() seconds) and RGBA float32 frame,
+                None if nothing was captured yet
+        """
+        with self._condition:
+            if self._frame is None:
+                return None
+            self._readNumber = self._frameNumber
+            return self._frameNumber, self._timestamp, self._frame
+
+    def history(self) -> list[tuple[int, float, np.ndarray]]:
+        """the last historySize frames, oldest first, as (frame number, capture time, RGBA float32 frame)"""
+        with self._condition:
+            return list(self._history)
+
+    def waitFrame(self, after: int, timeout: Union[float, None] = None) -> Union[tuple[int, float, np.ndarray], None]:
+        """wait until a frame newer than frame number `after` is captured and return it like read()"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._frameNumber > after or self._stopped or self._finished,
+                                     timeout=timeout)
+        return self.read() if self._frameNumber > after else None
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _open(self) -> bool:
+        raise NotImplementedError
+
+    def _readFrame(self) -> Union[np.ndarray, None]:
+        raise NotImplementedError
+
+    def _release(self):
+        pass
+
+    def __captureLoop(self):
+        try:
+            if not self._open():
+                return
+            while not self._stopped:
+                frame = self._readFrame()
+                timestamp = time.perf_counter()
+                if self._finished:
+                    return
+                if frame is None:
+                    # a camera that stopped delivering is polled, not spun on
+                    time.sleep(0.01)
+                    continue
+                if frame.shape[2] == 4:
+                    frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGRA2RGBA)
+                    if self._alphaIsPadding:
+                        # cheaper than going through BGR, which needs a second full pass
+                        frame[..., 3] = 255
+                else:
+                    frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGR2RGBA)
+                # one pass and one allocation instead of astype() followed by a division
+                frame = np.multiply(frame, np.float32(1 / 255), dtype=np.float32)
+                with self._condition:
+                    if self._readNumber < self._frameNumber:
+                        self._dropped += 1
+                    self._frame = frame
+                    self._timestamp = timestamp
+                    self._frameNumber += 1
+                    self._history.append((self._frameNumber, timestamp, frame))
+                    self._condition.notify_all()
+        finally:
+            self._release()
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+
+class DeviceCapture(CameraCapture):
+    def __init__(self, deviceIndex: int, width: int, height: int, apiPreference: Union[int, None] = None):
+        """capture from a camera device
+
+        Args:
+            deviceIndex (int): index of the camera
+            width (int): requested frame width
+            height (int): requested frame height
+            apiPreference (int, optional): videoio backend, one of cv2.CAP_*. Defaults to defaultCameraApi().
+        """
+        super().__init__()
+        self._deviceIndex: int = deviceIndex
+        self._width: int = width
+        self._height: int = height
+        self._apiPreference: int = defaultCameraApi() if apiPreference is None else apiPreference
+        self._VC: Union[cv2.VideoCapture, None] = None
+
+    @property
+    def deviceIndex(self):
+        return self._deviceIndex
+
+    def _open(self):
+        self._VC = cv2.VideoCapture(self._deviceIndex, self._apiPreference)
+        if not self._VC.isOpened():
+            return False
+        self._VC.set(cv2.CAP_PROP_FRAME_WIDTH, self._width)
+        self._VC.set(cv2.CAP_PROP_FRAME_HEIGHT, self._height)
+        # the thread keeps up with the camera, so the driver queue is of no use and only adds latency
+        self._VC.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return True
+
+    def _readFrame(self):
+        success, frame = self._VC.read()
+        return frame if success else None
+
+    def _release(self):
+        if self._VC is not None:
+            self._VC.release()
+
+
+class FileCapture(CameraCapture):
+    def __init__(self, filePath: Union[Path, str], fps: Union[float, None] = None, loop: bool = True):
+        """a virtual camera that plays a video file in real time, for testing and benchmarking without hardware
+
+        Frames are delivered at the file's (or the given) frame rate whether they are read or not,
+        so a slow consumer drops frames exactly like it would on a real camera.
+
+        Args:
+            filePath (Path or str): video file
+            fps (float, optional): frame rate of the virtual camera. Defaults to the file's own.
+            loop (bool, optional): whether to restart at the end of the file. Defaults to True.
+        """
+        super().__init__()
+        self._filePath: Path = Path(filePath)
+        self._fps: Union[float, None] = fps
+        self._loop: bool = loop
+        self._VC: Union[cv2.VideoCapture, None] = None
+        self._nextFrameTime: float = 0
+
+    @property
+    def filePath(self):
+        return self._filePath
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def _open(self):
+        self._VC = cv2.VideoCapture(str(self._filePath))
+        if not self._VC.isOpened():
+            return False
+        if self._fps is None:
+            self._fps = self._VC.get(cv2.CAP_PROP_FPS) or 30.0
+        self._nextFrameTime = time.perf_counter()
+        return True
+
+    def _readFrame(self):
+        success, frame = self._VC.read()
+        if not success and self._loop:
+            self._VC.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._VC.read()
+        if not success:
+            self._finished = True
+            return None
+        # a camera exposes frames on its own clock, not when the decoder happens to be done
+        delay = self._nextFrameTime - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._nextFrameTime = max(self._nextFrameTime + 1 / self._fps, time.perf_counter() - 1 / self._fps)
+        return frame
+
+    def _release(self):
+        if self._VC is not None:
+            self._VC.release()
+
+
+class SynchronizedCapture:
+    def __init__(self, captures: list[CameraCapture], tolerance: float = 0.02, historySize: int = 8):
+        """match the frames of several captures, each running on its own thread, by their capture time
+
+        A set is built around the newest frame of the capture that is furthest behind, which every
+        other capture has already caught up with; from each of the others the frame captured closest
+        to it is taken out of the recent history. The set is only complete if all of them lie within
+        tolerance of it.
+
+        Args:
+            captures (list[CameraCapture]): started captures, in output order
+            tolerance (float, optional): largest capture time difference to the set's reference frame, in seconds. Defaults to 0.02.
+            historySize (int, optional): frames kept per capture to match from. Defaults to 8.
+        """
+        self._captures: list[CameraCapture] = captures
+        self._tolerance: float = tolerance
+        for capture in captures:
+            capture.historySize = max(capture.historySize, historySize)
+        self._lastNumbers: list[int] = [0] * len(captures)
+        self._lastReference: tuple[int, int] = (-1, 0)
+        self._dropped: list[int] = [0] * len(captures)
+        self._duplicated: list[int] = [0] * len(captures)
+        self._unmatched: int = 0
+
+    @property
+    def captures(self):
+        return self._captures
+
+    @property
+    def tolerance(self):
+        return self._tolerance
+
+    @tolerance.setter
+    def tolerance(self, value: float):
+        self._tolerance = value
+
+    @property
+    def dropped(self) -> list[int]:
+        """per capture, frames that were captured but skipped over by every set"""
+        return self._dropped
+
+    @property
+    def duplicated(self) -> list[int]:
+        """per capture, frames that went out again in a later set, for lack of a closer one"""
+        return self._duplicated
+
+    @property
+    def unmatched(self) -> int:
+        """number of reference frames no complete set within tolerance was found for"""
+        return self._unmatched
+
+    def read(self) -> Union[tuple[float, list[np.ndarray]], None]:
+        """the newest synchronized set without waiting
+
+        Returns:
+            tuple: capture time of the reference frame and one RGBA float32 frame per capture,
+                None if no new complete set is available
+        """
+        histories = [capture.history() for capture in self._captures]
+        if not histories or not all(histories):
+            return None
+        reference = min(range(len(histories)), key=lambda i: histories[i][-1][1])
+        referenceNumber, referenceTime, _ = histories[reference][-1]
+        # a reference frame that already went out in a set would only repeat that set
+        if referenceNumber <= self._lastNumbers[reference] or (reference, referenceNumber) == self._lastReference:
+            return None
+        self._lastReference = (reference, referenceNumber)
+        matches = [min(history, key=lambda item: abs(item[1] - referenceTime)) for history in histories]
+        if any(abs(timestamp - referenceTime) > self._tolerance for _, timestamp, _ in matches):
+            self._unmatched += 1
+            return None
+        for i, (frameNumber, _, _) in enumerate(matches):
+            lastNumber = self._lastNumbers[i]
+            if frameNumber <= lastNumber:
+                self._duplicated[i] += 1
+            elif lastNumber:
+                self._dropped[i] += frameNumber - lastNumber - 1
+            self._lastNumbers[i] = max(lastNumber, frameNumber)
+        return referenceTime, [frame for _, _, frame in matches]
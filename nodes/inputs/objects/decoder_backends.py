@@ -0,0 +1,363 @@
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+
+class DecoderBackend:
+    """sequential video decoder that VideoFile is written against
+
+    It mirrors the part of cv2.VideoCapture that VideoFile uses: grab() decodes the next frame,
+    retrieve() converts the last grabbed frame to BGR uint8 (into the given array if there is one)
+    and seek() makes the next grab() return the given frame.
+    """
+    name: str = str()
+
+    def __init__(self, filePath: Union[Path, str], threads: int = 0):
+        self._filePath: Path = Path(filePath)
+        self._threads: int = threads
+
+    @property
+    def filePath(self):
+        return self._filePath
+
+    @property
+    def threads(self):
+        return self._threads
+
+    @property
+    def fps(self) -> float:
+        raise NotImplementedError
+
+    @property
+    def frameCount(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def frameWidth(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def frameHeight(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def timestamp(self) -> float:
+        """presentation time of the last grabbed frame in milliseconds"""
+        raise NotImplementedError
+
+    def isOpened(self) -> bool:
+        raise NotImplementedError
+
+    def grab(self) -> bool:
+        raise NotImplementedError
+
+    def retrieve(self, image: Union[np.ndarray, None] = None) -> tuple[bool, Union[np.ndarray, None]]:
+        raise NotImplementedError
+
+    def read(self, image: Union[np.ndarray, None] = None) -> tuple[bool, Union[np.ndarray, None]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve(image=image)
+
+    def seek(self, frameIndex: int):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def reopen(self) -> "DecoderBackend":
+        """open the same file again, with the same settings, on an independent decoder"""
+        return createDecoderBackend(name=self.name, filePath=self._filePath, threads=self._threads)
+
+
+class OpenCVBackend(DecoderBackend):
+    def __init__(self, filePath: Union[Path, str], threads: int = 0, apiPreference: int = cv2.CAP_ANY):
+        """decode with cv2.VideoCapture
+
+        Args:
+            filePath (Path or str): video file
+            threads (int, optional): decoding threads, 0 for the backend's own choice. Defaults to 0.
+            apiPreference (int, optional): videoio backend, one of cv2.CAP_*. Defaults to cv2.CAP_ANY.
+        """
+        super().__init__(filePath=filePath, threads=threads)
+        self._apiPreference: int = apiPreference
+        params = [cv2.CAP_PROP_N_THREADS, threads] if threads > 0 else list()
+        self._VC = cv2.VideoCapture(str(self._filePath), apiPreference, params)
+        self.name = "opencv" if apiPreference == cv2.CAP_ANY else \
+            f"opencv:{cv2.videoio_registry.getBackendName(apiPreference).lower()}"
+
+    @property
+    def fps(self):
+        return self._VC.get(cv2.CAP_PROP_FPS)
+
+    @property
+    def frameCount(self):
+        return int(self._VC.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    @property
+    def frameWidth(self):
+        return int(self._VC.get(cv2.CAP_PROP_FRAME_WIDTH))
+
+    @property
+    def frameHeight(self):
+        return int(self._VC.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    @property
+    def timestamp(self):
+        return self._VC.get(cv2.CAP_PROP_POS_MSEC)
+
+    def isOpened(self):
+        return self._VC.isOpened()
+
+    def grab(self):
+        return self._VC.grab()
+
+    def retrieve(self, image=None):
+        if image is None:
+            return self._VC.retrieve()
+        return self._VC.retrieve(image=image)
+
+    def read(self, image=None):
+        if image is None:
+            return self._VC.read()
+        return self._VC.read(image=image)
+
+    def seek(self, frameIndex: int):
+        self._VC.set(cv2.CAP_PROP_POS_FRAMES, frameIndex)
+
+    def release(self):
+        self._VC.release()
+
+
+class PyAVBackend(DecoderBackend):
+    name = "pyav"
+
+    def __init__(self, filePath: Union[Path, str], threads: int = 0):
+        """decode with PyAV, using frame and slice threading, converting straight to bgr24
+
+        Args:
+            filePath (Path or str): video file
+            threads (int, optional): decoding threads, 0 for one per core. Defaults to 0.
+        """
+        import av
+
+        super().__init__(filePath=filePath, threads=threads)
+        self._container = av.open(str(self._filePath))
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        self._stream.thread_count = threads
+        rate = self._stream.average_rate or self._stream.guessed_rate
+        self._fps: float = float(rate) if rate else 0.0
+        self._frameCount: int = self._stream.frames
+        if not self._frameCount and self._stream.duration and self._fps:
+            self._frameCount = round(float(self._stream.duration * self._stream.time_base) * self._fps)
+        self._startTime: int = self._stream.start_time or 0
+        self._frames = self._container.decode(self._stream)
+        self._frame = None
+        self._pending = None
+        self._opened: bool = True
+
+    @property
+    def fps(self):
+        return self._fps
+
+    @property
+    def frameCount(self):
+        return self._frameCount
+
+    @property
+    def frameWidth(self):
+        return self._stream.codec_context.width
+
+    @property
+    def frameHeight(self):
+        return self._stream.codec_context.height
+
+    @property
+    def timestamp(self):
+        if self._frame is None or self._frame.pts is None:
+            return 0.0
+        return float((self._frame.pts - self._startTime) * self._stream.time_base) * 1000
+
+    def isOpened(self):
+        return self._opened
+
+    def grab(self):
+        if self._pending is not None:
+            self._frame, self._pending = self._pending, None
+            return True
+        try:
+            self._frame = next(self._frames)
+        except (StopIteration, ValueError, OSError):
+            self._frame = None
+            return False
+        return True
+
+    def retrieve(self, image=None):
+        if self._frame is None:
+            return False, None
+        frame = self._frame.to_ndarray(format="bgr24")
+        if image is None:
+            return True, frame
+        np.copyto(image, frame)
+        return True, image
+
+    def seek(self, frameIndex: int):
+        # land on the keyframe before the target, then decode forward up to it
+        target = self._startTime + int(frameIndex / self._fps / self._stream.time_base) if self._fps else 0
+        self._container.seek(target, stream=self._stream, backward=True)
+        self._frames = self._container.decode(self._stream)
+        self._pending = None
+        while self.grab():
+            if self._frame.pts is None or self._frame.pts >= target:
+                self._pending = self._frame
+                break
+
+    def release(self):
+        if self._opened:
+            self._container.close()
+            self._opened = False
+
+
+class FFmpegPipeBackend(DecoderBackend):
+    name = "ffmpeg"
+
+    def __init__(self, filePath: Union[Path, str], threads: int = 0, ffmpegPath: Union[str, None] = None):
+        """decode in an ffmpeg subprocess that writes raw bgr24 frames into a pipe
+
+        Stream properties are probed with OpenCV, seeking restarts the process at the target time.
+
+        Args:
+            filePath (Path or str): video file
+            threads (int, optional): decoding threads, 0 for ffmpeg's own choice. Defaults to 0.
+            ffmpegPath (str, optional): ffmpeg executable. Defaults to the one on PATH.
+        """
+        super().__init__(filePath=filePath, threads=threads)
+        self._ffmpegPath: Union[str, None] = ffmpegPath or shutil.which("ffmpeg")
+        if self._ffmpegPath is None:
+            raise FileNotFoundError("ffmpeg executable not found")
+        probe = cv2.VideoCapture(str(self._filePath))
+        self._fps: float = probe.get(cv2.CAP_PROP_FPS)
+        self._frameCount: int = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._frameWidth: int = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self._frameHeight: int = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        probe.release()
+        self._frameBuffer = np.empty(shape=(self._frameHeight, self._frameWidth, 3), dtype=np.uint8)
+        self._process: Union[subprocess.Popen, None] = None
+        self._frameIndex: int = -1
+        self._grabbed: bool = False
+        self.seek(frameIndex=0)
+
+    @property
+    def fps(self):
+        return self._fps
+
+    @property
+    def frameCount(self):
+        return self._frameCount
+
+    @property
+    def frameWidth(self):
+        return self._frameWidth
+
+    @property
+    def frameHeight(self):
+        return self._frameHeight
+
+    @property
+    def timestamp(self):
+        return self._frameIndex / self._fps * 1000 if self._fps else 0.0
+
+    def isOpened(self):
+        return self._process is not None
+
+    def grab(self):
+        self._grabbed = False
+        if self._process is None:
+            return False
+        view = memoryview(self._frameBuffer).cast("B")
+        received = 0
+        while received < len(view):
+            count = self._process.stdout.readinto(view[received:])
+            if not count:
+                return False
+            received += count
+        self._frameIndex += 1
+        self._grabbed = True
+        return True
+
+    def retrieve(self, image=None):
+        if not self._grabbed:
+            return False, None
+        if image is None:
+            return True, self._frameBuffer.copy()
+        np.copyto(image, self._frameBuffer)
+        return True, image
+
+    def seek(self, frameIndex: int):
+        self.release()
+        command = [self._ffmpegPath, "-v", "error", "-nostdin"]
+        if self._threads > 0:
+            command += ["-threads", str(self._threads)]
+        if frameIndex > 0 and self._fps:
+            # half a frame early, so rounding never skips the target
+            command += ["-ss", f"{(frameIndex - 0.5) / self._fps:.6f}"]
+        command += ["-i", str(self._filePath), "-map", "0:v:0", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=self._frameBuffer.nbytes)
+        self._frameIndex = frameIndex - 1
+        self._grabbed = False
+
+    def release(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.stdout.close()
+            self._process.wait()
+            self._process = None
+
+
+def _openCVApis() -> dict[str, int]:
+    return {f"opencv:{cv2.videoio_registry.getBackendName(api).lower()}": api
+            for api in cv2.videoio_registry.getStreamBackends()}
+
+
+def availableDecoderBackends() -> list[str]:
+    names = ["opencv"] + list(_openCVApis())
+    try:
+        import av
+        names.append(PyAVBackend.name)
+    except ImportError:
+        pass
+    if shutil.which("ffmpeg") is not None:
+        names.append(FFmpegPipeBackend.name)
+    return names
+
+
+def createDecoderBackend(name: str, filePath: Union[Path, str], threads: int = 0) -> DecoderBackend:
+    """open a video file on the decoder backend of the given name
+
+    Args:
+        name (str): "opencv", "opencv:<videoio backend>" (e.g. "opencv:ffmpeg"), "pyav" or "ffmpeg"
+        filePath (Path or str): video file
+        threads (int, optional): decoding threads, 0 for the backend's own choice. Defaults to 0.
+
+    Returns:
+        DecoderBackend
+    """
+    if name == "opencv":
+        return OpenCVBackend(filePath=filePath, threads=threads)
+    if name.startswith("opencv:"):
+        apis = _openCVApis()
+        if name not in apis:
+            raise ValueError(f"unknown OpenCV videoio backend: {name}")
+        return OpenCVBackend(filePath=filePath, threads=threads, apiPreference=apis[name])
+    if name == PyAVBackend.name:
+        return PyAVBackend(filePath=filePath, threads=threads)
+    if name == FFmpegPipeBackend.name:
+        return FFmpegPipeBackend(filePath=filePath, threads=threads)
+    raise ValueError(f"unknown decoder backend: {name}")
+
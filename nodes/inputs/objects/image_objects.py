@@ -0,0 +1,675 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+
+DECODE_SCALES: tuple[int, ...] = (1, 2, 4, 8)
+IMAGE_EXTENSIONS: tuple[str, ...] = (".png", ".jpg", ".jpeg")
+
+_reducedColorFlags: dict[int, int] = {2: cv2.IMREAD_REDUCED_COLOR_2,
+                                      4: cv2.IMREAD_REDUCED_COLOR_4,
+                                      8: cv2.IMREAD_REDUCED_COLOR_8}
+_reducedGrayscaleFlags: dict[int, int] = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                                          4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                                          8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+
+def readImageHeader(filePath: Union[Path, str]) -> Union[tuple[int, int, int, bool], None]:
+    """read the size of a JPEG or PNG image from its header, without decoding it
+
+    Args:
+        filePath (Path or str): image file
+
+    Returns:
+        tuple: width, height, number of channels and whether it is a JPEG, or None for other
+            formats and broken files
+    """
+    try:
+        with open(filePath, "rb") as file:
+            signature = file.read(2)
+            if signature == b"\x89P":
+                ihdr = file.read(24)
+                if len(ihdr) < 24 or ihdr[10:14] != b"IHDR":
+                    return None
+                width, height, _, colorType = struct.unpack(">IIBB", ihdr[14:24])
+                return width, height, {0: 1, 3: 3, 4: 2, 6: 4}.get(colorType, 3), False
+            if signature != b"\xff\xd8":
+                return None
+            # walk the marker segments up to the start of frame, which holds the size
+            while True:
+                marker = file.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                if marker[1] in (0x01, 0xFF) or 0xD0 <= marker[1] <= 0xD7:
+                    file.seek(-1 if marker[1] == 0xFF else 0, os.SEEK_CUR)
+                    continue
+                length = struct.unpack(">H", file.read(2))[0]
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                    _, height, width, channels = struct.unpack(">BHHB", file.read(6))
+                    return width, height, channels, True
+                file.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def decodeScaleFor(imageSize: tuple[int, int], targetSize: tuple[int, int]) -> int:
+    """the largest of DECODE_SCALES that still decodes the image at least at targetSize
+
+    Args:
+        imageSize (tuple[int, int]): width and height of the image
+        targetSize (tuple[int, int]): width and height the image is brought to next
+
+    Returns:
+        int: reduction factor
+    """
+    for scale in reversed(DECODE_SCALES):
+        if imageSize[0] / scale >= targetSize[0] and imageSize[1] / scale >= targetSize[1]:
+            return scale
+    return 1
+
+
+def readImage(filePath: Union[Path, str],
+              scale: int = 1,
+              targetSize: Union[tuple[int, int], None] = None) -> Union[np.ndarray, None]:
+    """decode an image file into RGBA float32 in the range 0-1, optionally reduced in size
+
+    JPEGs are reduced while they are decoded (IMREAD_REDUCED_*, scaling in the DCT domain),
+    which is several times faster than a full decode; other formats are decoded in full and then
+    area-resampled to the same ceil(size / scale). EXIF orientation is ignored either way, like
+    in the full-size decode, so the scale never changes the orientation of a picture.
+
+    Args:
+        filePath (Path or str): image file
+        scale (int, optional): reduction factor, one of DECODE_SCALES. Defaults to 1.
+        targetSize (tuple[int, int], optional): width and height the image is resized to next; if
+            given, the scale is picked from the header with decodeScaleFor(). Defaults to None.
+
+    Returns:
+        np.ndarray: the image, or None if it can't be decoded
+    """
+    header = readImageHeader(filePath=filePath) if scale > 1 or targetSize is not None else None
+    if targetSize is not None:
+        scale = 1 if header is None else decodeScaleFor(imageSize=header[:2], targetSize=targetSize)
+    if scale > 1 and header is not None and header[3]:
+        flags = _reducedGrayscaleFlags[scale] if header[2] == 1 else _reducedColorFlags[scale]
+        img = cv2.imread(filename=str(filePath), flags=flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    else:
+        img = cv2.imread(filename=str(filePath), flags=cv2.IMREAD_UNCHANGED)
+        if img is not None and scale > 1:
+            height, width = img.shape[:2]
+            img = cv2.resize(src=img, dsize=(-(-width // scale), -(-height // scale)), interpolation=cv2.INTER_AREA)
+    if img is None:
+        return None
+    if img.ndim == 2:
+        img = cv2.cvtColor(src=img, code=cv2.COLOR_GRAY2RGBA)
+    elif img.shape[2] == 4:
+        img = cv2.cvtColor(src=img, code=cv2.COLOR_BGRA2RGBA)
+    else:
+        img = cv2.cvtColor(src=img, code=cv2.COLOR_BGR2RGBA)
+    # 16-bit files are scaled by their own range
+    peak = np.iinfo(img.dtype).max if np.issubdtype(img.dtype, np.integer) else 1
+    return np.multiply(img, np.float32(1 / peak), dtype=np.float32)
+
+
+def _lockDirectory(directory: Path):
+    """an open lock file that holds directory for this process until it exits, None if another process holds it"""
+    lockFile = open(directory.joinpath("lock"), "a+b")
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            lockFile.seek(0)
+            msvcrt.locking(lockFile.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lockFile.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lockFile.close()
+        return None
+    return lockFile
+
+
+class DecodedImageStore:
+    # offsets of the images in a chunk are aligned to this many bytes
+    alignment: int = 64
+
+    def __init__(self, cacheDir: Union[Path, str], budgetBytes: int = 4 * 1024 ** 3, chunkBytes: int = 256 * 1024 ** 2):
+        """decoded RGBA float32 images stored in memory-mapped chunk files, for folders that are read over and over
+
+        Images are appended to the current chunk file and served as read-only views into a memory
+        map of it, so a stored image costs no decoding and no copy. Entries are keyed by file path,
+        size, modification time and decode options, so an edited file is decoded again. When the
+        chunks exceed budgetBytes, the least recently used ones are deleted with all their images.
+
+        A store holds a lock on its directory. Another process using the same cacheDir, e.g. a second
+        NodiumPy chained to the first, gets the first free numbered subdirectory instead, so neither
+        deletes the chunks or overwrites the index of the other.
+
+        Args:
+            cacheDir (Path or str): directory of the chunk files and their index
+            budgetBytes (int, optional): maximum total size of the chunks. Defaults to 4 GiB.
+            chunkBytes (int, optional): size a chunk is closed at. Defaults to 256 MiB.
+        """
+        self._dir: Path = Path(cacheDir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lockFile = _lockDirectory(directory=self._dir)
+        slot = 0
+        while self._lockFile is None:
+            slot += 1
+            self._dir = Path(cacheDir).joinpath(f"slot-{slot}")
+            self._dir.mkdir(exist_ok=True)
+            self._lockFile = _lockDirectory(directory=self._dir)
+        self._indexPath: Path = self._dir.joinpath("index.json")
+        self._budget: int = budgetBytes
+        self._chunkBytes: int = chunkBytes
+        self._lock = threading.Lock()
+        # chunk name -> size in bytes and time of last use
+        self._chunks: dict[str, list] = dict()
+        # key -> chunk name, offset and shape
+        self._entries: dict[str, tuple[str, int, list[int]]] = dict()
+        self._maps: dict[str, np.memmap] = dict()
+        # dropped chunks whose files could not be deleted yet, see __deleteChunkFile()
+        self._undeleted: set[str] = set()
+        self._writeChunk: Union[str, None] = None
+        self._indexSavedAt: float = 0
+        self.__loadIndex()
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @budget.setter
+    def budget(self, value: int):
+        with self._lock:
+            self._budget = value
+            self.__evict()
+
+    @property
+    def nbytes(self):
+        return sum(size for size, _ in self._chunks.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(filePath: Union[Path, str], scale: int = 1, targetSize: Union[tuple[int, int], None] = None) -> Union[str, None]:
+        """the key of a file decoded with the given options, None if the file can't be accessed"""
+        try:
+            stat = os.stat(filePath)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(filePath)}:{stat.st_size}:{stat.st_mtime_ns}:{scale}:{targetSize}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get(self, key: str) -> Union[np.ndarray, None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            chunk, offset, shape = entry
+            nbytes = int(np.prod(shape)) * 4
+            chunkMap = self._maps.get(chunk)
+            if chunkMap is None or len(chunkMap) < offset + nbytes:
+                # the chunk grew since it was mapped
+                try:
+                    chunkMap = np.memmap(self._dir.joinpath(chunk), dtype=np.uint8, mode="r")
+                except (OSError, ValueError):
+                    self.__dropChunk(chunk=chunk)
+                    return None
+                self._maps[chunk] = chunkMap
+            if len(chunkMap) < offset + nbytes:
+                del self._entries[key]
+                return None
+            self._chunks[chunk][1] = time.time()
+            return chunkMap[offset:offset + nbytes].view(np.float32).reshape(shape)
+
+    def put(self, key: str, img: np.ndarray):
+        img = np.ascontiguousarray(img, dtype=np.float32)
+        if img.nbytes > min(self._chunkBytes, self._budget):
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            chunk = self._writeChunk
+            if chunk is None or chunk not in self._chunks or self._chunks[chunk][0] + img.nbytes > self._chunkBytes:
+                chunk = f"chunk-{time.time_ns()}.bin"
+                self._chunks[chunk] = [0, time.time()]
+                self._writeChunk = chunk
+            offset = -(-self._chunks[chunk][0] // self.alignment) * self.alignment
+            try:
+                with open(self._dir.joinpath(chunk), "ab") as file:
+                    file.write(bytes(offset - self._chunks[chunk][0]))
+                    file.write(img.data)
+            except OSError:
+                return
+            self._chunks[chunk] = [offset + img.nbytes, time.time()]
+            self._entries[key] = (chunk, offset, list(img.shape))
+            self.__evict()
+            # the index is written at most once a second, chunk data past it is simply unused
+            if time.perf_counter() - self._indexSavedAt > 1:
+                self.__saveIndex()
+
+    def read(self, filePath: Union[Path, str], scale: int = 1,
+             targetSize: Union[tuple[int, int], None] = None) -> Union[np.ndarray, None]:
+        """readImage() through the store: the stored image if there is one, otherwise the decoded one, stored"""
+        key = self.key(filePath=filePath, scale=scale, targetSize=targetSize)
+        img = None if key is None else self.get(key=key)
+        if img is not None:
+            return img
+        img = readImage(filePath=filePath, scale=scale, targetSize=targetSize)
+        if img is not None and key is not None:
+            self.put(key=key, img=img)
+        return img
+
+    def flush(self):
+        with self._lock:
+            self.__saveIndex()
+
+    def clear(self):
+        with self._lock:
+            for chunk in list(self._chunks):
+                self.__dropChunk(chunk=chunk)
+            self.__saveIndex()
+
+    def __evict(self):
+        for chunk in list(self._undeleted):
+            self.__deleteChunkFile(chunk=chunk)
+        total = sum(size for size, _ in self._chunks.values())
+        for chunk in sorted(self._chunks, key=lambda name: self._chunks[name][1]):
+            if total <= self._budget:
+                break
+            total -= self._chunks[chunk][0]
+            self.__dropChunk(chunk=chunk)
+
+    def __dropChunk(self, chunk: str):
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[0] != chunk}
+        self._chunks.pop(chunk, None)
+        # views handed out keep the pages alive until they are released, the file can go right away
+        self._maps.pop(chunk, None)
+        if chunk == self._writeChunk:
+            self._writeChunk = None
+        self.__deleteChunkFile(chunk=chunk)
+
+    def __deleteChunkFile(self, chunk: str):
+        # on Windows a file can't be deleted while views of its memory map are alive; it is tried
+        # again at the next eviction, and a file left at exit is removed when the index is next loaded
+        try:
+            self._dir.joinpath(chunk).unlink(missing_ok=True)
+        except OSError:
+            self._undeleted.add(chunk)
+            return
+        self._undeleted.discard(chunk)
+
+    def __loadIndex(self):
+        try:
+            data = json.loads(self._indexPath.read_text(encoding="utf-8"))
+            chunks, entries = data["chunks"], data["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            chunks, entries = dict(), dict()
+        for chunk, (size, lastUsed) in chunks.items():
+            path = self._dir.joinpath(chunk)
+            if path.exists() and path.stat().st_size >= size:
+                self._chunks[chunk] = [size, lastUsed]
+        self._entries = {key: (chunk, offset, shape) for key, (chunk, offset, shape) in entries.items()
+                         if chunk in self._chunks}
+        # chunks the index does not know about are left over from a crash
+        for path in self._dir.glob("chunk-*.bin"):
+            if path.name not in self._chunks:
+                self.__deleteChunkFile(chunk=path.name)
+
+    def __saveIndex(self):
+        data = dict(chunks=self._chunks, entries=self._entries)
+        partialPath = self._indexPath.with_suffix(".partial")
+        try:
+            partialPath.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(partialPath, self._indexPath)
+        except OSError:
+            return
+        self._indexSavedAt = time.perf_counter()
+
+
+_decodedImageStores: dict[str, DecodedImageStore] = dict()
+_decodedImageStoresLock = threading.Lock()
+
+
+def getDecodedImageStore(cacheDir: Union[Path, str], budgetBytes: int) -> DecodedImageStore:
+    """the process-wide store of a cache directory, shared by every node that reads images"""
+    with _decodedImageStoresLock:
+        store = _decodedImageStores.get(str(cacheDir))
+        if store is None:
+            store = DecodedImageStore(cacheDir=cacheDir, budgetBytes=budgetBytes)
+            _decodedImageStores[str(cacheDir)] = store
+        elif store.budget != budgetBytes:
+            store.budget = budgetBytes
+        return store
+
+
+class ImagePrefetcher:
+    def __init__(self, paths: list[Union[Path, str]], depth: int = 8, workers: Union[int, None] = None, loop: bool = False):
+        """decode the images following the current one in a thread pool, ahead of their turn
+
+        Every fetch() keeps the next depth images in the direction of travel decoding or decoded and
+        cancels the work on everything outside that window, so a jump of the index only costs the
+        images that were already being decoded. imread and the conversion release the GIL, so the
+        throughput grows with the number of workers.
+
+        Args:
+            paths (list[Path or str]): image files, in iteration order; the list may grow meanwhile
+            depth (int, optional): number of images decoded ahead. Defaults to 8.
+            workers (int, optional): decoding threads. Defaults to the number of cores.
+            loop (bool, optional): whether the window wraps around the end of the list. Defaults to False.
+        """
+        self._paths: list[Union[Path, str]] = paths
+        self._depth: int = max(1, depth)
+        self._loop: bool = loop
+        self._executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._futures: dict[int, Future] = dict()
+        self._lock = threading.Lock()
+        self._scale: int = 1
+        self._targetSize: Union[tuple[int, int], None] = None
+        self._store: Union[DecodedImageStore, None] = None
+
+    @property
+    def paths(self):
+        """image files, in iteration order; replacing the list drops everything scheduled for the old one"""
+        return self._paths
+
+    @paths.setter
+    def paths(self, value: list[Union[Path, str]]):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            self._paths = value
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @property
+    def loop(self):
+        return self._loop
+
+    @loop.setter
+    def loop(self, value: bool):
+        self._loop = value
+
+    @property
+    def scale(self):
+        """reduction factor the images are decoded at, see readImage()"""
+        return self._scale
+
+    @scale.setter
+    def scale(self, value: int):
+        if value != self._scale:
+            self._scale = value
+            self.cancel()
+
+    @property
+    def targetSize(self):
+        """size the images are resized to downstream, which picks the scale per image when set"""
+        return self._targetSize
+
+    @targetSize.setter
+    def targetSize(self, value: Union[tuple[int, int], None]):
+        if value != self._targetSize:
+            self._targetSize = value
+            self.cancel()
+
+    @property
+    def store(self):
+        """DecodedImageStore the images are read through, None to always decode"""
+        return self._store
+
+    @store.setter
+    def store(self, value: Union[DecodedImageStore, None]):
+        if value is not self._store:
+            self._store = value
+            self.cancel()
+
+    def fetch(self, index: int, direction: int = 1) -> Future:
+        """get the decoding of the image at index and schedule the ones after it
+
+        Args:
+            index (int): index of the image that is needed now
+            direction (int, optional): 1 when iterating forward, -1 backward. Defaults to 1.
+
+        Returns:
+            Future: resolves to the RGBA float32 image, or None if it can't be decoded
+        """
+        with self._lock:
+            count = len(self._paths)
+            window = [index]
+            for step in range(1, self._depth + 1):
+                nextIndex = index + step * (1 if direction >= 0 else -1)
+                if self._loop:
+                    nextIndex %= count
+                if not 0 <= nextIndex < count or nextIndex in window:
+                    break
+                window.append(nextIndex)
+            for futureIndex in list(self._futures):
+                if futureIndex not in window:
+                    self._futures.pop(futureIndex).cancel()
+            for futureIndex in window:
+                if futureIndex not in self._futures:
+                    read = readImage if self._store is None else self._store.read
+                    self._futures[futureIndex] = self._executor.submit(read, self._paths[futureIndex],
+                                                                        self._scale, self._targetSize)
+            return self._futures[index]
+
+    def cancel(self):
+        """drop everything that was scheduled"""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FolderIndex:
+    def __init__(self,
+                 root: Union[Path, str],
+                 recursive: bool = False,
+                 extensions: tuple[str, ...] = IMAGE_EXTENSIONS,
+                 cacheDir: Union[Path, str, None] = None,
+                 watch: bool = False,
+                 watchInterval: float = 2.0):
+        """list the image files of a folder in a background thread, in one os.scandir pass
+
+        Files are matched on their lower-cased extension, so every file is listed once whatever the
+        case of its name and the file system. paths grows while the walk goes on: directory by
+        directory, files sorted by name, subdirectories depth first. A paths list is only ever
+        appended to, so indices into it stay valid; when files go away, paths is replaced by a new
+        list without them.
+
+        The listing of every directory is kept with its modification time in cacheDir. Reopening a
+        folder publishes the cached listing at once and then only rescans the directories whose
+        modification time changed; the same check runs every watchInterval seconds in watch mode,
+        which appends new files as they show up and drops deleted and renamed ones.
+
+        Args:
+            root (Path or str): folder to list
+            recursive (bool, optional): whether to include subdirectories. Defaults to False.
+            extensions (tuple[str, ...], optional): lower-case extensions to list. Defaults to IMAGE_EXTENSIONS.
+            cacheDir (Path or str, optional): directory the index is stored in, None to not store it. Defaults to None.
+            watch (bool, optional): whether to keep looking for new files. Defaults to False.
+            watchInterval (float, optional): seconds between two checks in watch mode. Defaults to 2.0.
+        """
+        self._root: Path = Path(root).resolve()
+        self._recursive: bool = recursive
+        self._extensions: frozenset[str] = frozenset(extension.lower() for extension in extensions)
+        self._cachePath: Union[Path, None] = None
+        if cacheDir is not None:
+            Path(cacheDir).mkdir(parents=True, exist_ok=True)
+            key = f"{self._root}:{','.join(sorted(self._extensions))}"
+            self._cachePath = Path(cacheDir).joinpath(hashlib.sha1(key.encode()).hexdigest() + ".json")
+        self._watchInterval: float = watchInterval
+        # relative directory -> modification time, file names and subdirectory names
+        self._directories: dict[str, tuple[int, list[str], list[str]]] = dict()
+        self._paths: list[str] = list()
+        # relative directory -> names of its files already in paths
+        self._published: dict[str, set[str]] = dict()
+        self._complete: bool = False
+        self._condition = threading.Condition()
+        self._watch: bool = watch
+        self._stopped: bool = False
+        self._thread = threading.Thread(target=self.__run, daemon=True)
+        self._thread.start()
+
+    @property
+    def root(self):
+        return self._root
+
+    @property
+    def paths(self) -> list[str]:
+        """absolute paths of the files found so far, shared with the scanning thread, which only appends
+        to it; a new list takes its place when files are deleted or renamed
+        """
+        return self._paths
+
+    @property
+    def complete(self):
+        """whether the first full pass is done"""
+        return self._complete
+
+    @property
+    def watch(self):
+        return self._watch
+
+    @watch.setter
+    def watch(self, value: bool):
+        with self._condition:
+            self._watch = value
+            self._condition.notify_all()
+
+    def waitForPaths(self, timeout: Union[float, None] = None) -> bool:
+        """wait until a first file is found or the first pass is done, return whether there are files"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._paths or self._complete, timeout=timeout)
+        return bool(self._paths)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def __run(self):
+        self.__loadCache()
+        # the cached listing is published as it is and checked right after
+        changed = self.__walk(useCache=True, check=False)
+        changed = self.__walk(useCache=True, check=True) or changed
+        with self._condition:
+            self._complete = True
+            self._condition.notify_all()
+        if changed:
+            self.__saveCache()
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped or self._watch)
+                if not self._stopped:
+                    self._condition.wait(timeout=self._watchInterval)
+                if self._stopped:
+                    return
+            if self.__walk(useCache=True, check=True):
+                self.__saveCache()
+
+    def __walk(self, useCache: bool, check: bool) -> bool:
+        # returns whether any directory listing changed
+        changed = False
+        visited = set()
+        stack = [str()]
+        while stack and not self._stopped:
+            relative = stack.pop()
+            visited.add(relative)
+            listing = self._directories.get(relative) if useCache else None
+            if check or listing is None:
+                directory = self._root.joinpath(relative)
+                try:
+                    mtime = directory.stat().st_mtime_ns
+                except OSError:
+                    continue
+                if listing is None or listing[0] != mtime:
+                    listing = self.__scanDirectory(directory=directory, mtime=mtime)
+                    if listing is None:
+                        continue
+                    self._directories[relative] = listing
+                    changed = True
+            _, files, subdirectories = listing
+            published = self._published.setdefault(relative, set())
+            # a rename keeps the number of files, so the names are compared
+            goneFiles = published.difference(files)
+            if goneFiles:
+                self.__dropFiles(relative=relative, names=goneFiles)
+            newFiles = [name for name in files if name not in published]
+            if newFiles:
+                # strings rather than Path objects, which take several times longer to create
+                prefix = os.path.join(str(self._root), relative, str())
+                published.update(newFiles)
+                self._paths.extend(prefix + name for name in newFiles)
+                with self._condition:
+                    self._condition.notify_all()
+            if self._recursive:
+                stack.extend(os.path.join(relative, name) for name in reversed(subdirectories))
+        if check and not self._stopped:
+            # directories that were deleted, or are inside one
+            for relative in [relative for relative in self._published if relative not in visited]:
+                self.__dropFiles(relative=relative, names=set(self._published.pop(relative)))
+                self._directories.pop(relative, None)
+                changed = True
+        return changed
+
+    def __dropFiles(self, relative: str, names: set[str]):
+        # holders of the current list keep valid indices, the files that are left go to a new one
+        self._published.get(relative, set()).difference_update(names)
+        prefix = os.path.join(str(self._root), relative, str())
+        gone = {prefix + name for name in names}
+        with self._condition:
+            self._paths = [path for path in self._paths if path not in gone]
+            self._condition.notify_all()
+
+    def __scanDirectory(self, directory: Path, mtime: int) -> Union[tuple[int, list[str], list[str]], None]:
+        files, subdirectories = list(), list()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.name)
+                        elif os.path.splitext(entry.name)[1].lower() in self._extensions and entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return mtime, sorted(files), sorted(subdirectories)
+
+    def __loadCache(self):
+        if self._cachePath is None or not self._cachePath.exists():
+            return
+        try:
+            data = json.loads(self._cachePath.read_text(encoding="utf-8"))
+            self._directories = {relative: (mtime, files, subdirectories)
+                                 for relative, (mtime, files, subdirectories) in data["directories"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._directories = dict()
+
+    def __saveCache(self):
+        if self._cachePath is None or self._stopped:
+            return
+        data = dict(root=str(self._root), directories=self._directories)
+        partialPath = self._cachePath.with_suffix(".partial")
+        partialPath.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(partialPath, self._cachePath)
@@ -0,0 +1,265 @@
+import sys
+import time
+from typing import Union
+
+import cv2
+import numpy as np
+
+from nodes.inputs.objects.camera_objects import CameraCapture
+
+
+class ScreenGrabber:
+    """screenshot source that ScreenCapture is written against
+
+    monitors() lists the screens as (left, top, width, height) in desktop coordinates, the first
+    entry being the bounding box of all of them, and grab() returns a region of the desktop as a
+    BGR or BGRA uint8 array; the 4th byte of a BGRA grab is padding, not alpha. A grabber is only
+    used from the thread that created it.
+    """
+    name: str = str()
+
+    def monitors(self) -> list[tuple[int, int, int, int]]:
+        raise NotImplementedError
+
+    def grab(self, region: tuple[int, int, int, int]) -> Union[np.ndarray, None]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MSSGrabber(ScreenGrabber):
+    """grabs through mss (Xlib on Linux, GDI on Windows, CoreGraphics on macOS) without a detour through PIL"""
+    name: str = "mss"
+
+    def __init__(self):
+        import mss
+        self._mss = mss.mss()
+
+    def monitors(self):
+        return [(m["left"], m["top"], m["width"], m["height"]) for m in self._mss.monitors]
+
+    def grab(self, region):
+        left, top, width, height = region
+        shot = self._mss.grab(dict(left=left, top=top, width=width, height=height))
+        # BGRX pixels as the X server, GDI or CoreGraphics hands them over, no conversion on the way;
+        # ScreenCapture makes the padding byte opaque when it converts the frame
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        self._mss.close()
+
+
+class PILGrabber(ScreenGrabber):
+    """grabs through PIL.ImageGrab, which only tells the main screen apart from all of them"""
+    name: str = "pil"
+
+    def __init__(self):
+        from PIL import ImageGrab
+        self._imageGrab = ImageGrab
+        self._main = self._imageGrab.grab().size
+        # only Windows and macOS can grab beyond the main screen
+        self._all = self._imageGrab.grab(all_screens=True).size if sys.platform in ("win32", "darwin") else self._main
+
+    def monitors(self):
+        return [(0, 0, *self._all), (0, 0, *self._main)]
+
+    def grab(self, region):
+        left, top, width, height = region
+        img = self._imageGrab.grab(bbox=(left, top, left + width, top + height), all_screens=self._all != self._main)
+        return cv2.cvtColor(src=np.asarray(img), code=cv2.COLOR_RGB2BGR)
+
+
+class SyntheticGrabber(ScreenGrabber):
+    """a generated desktop for testing without a display
+
+    The desktop is a static gradient with a square that moves on every changeEvery-th grab, so
+    most grabs return an unchanged screen like a real, mostly idle desktop does.
+    """
+    name: str = "synthetic"
+
+    def __init__(self, width: int = 1920, height: int = 1080, changeEvery: int = 10):
+        self._changeEvery: int = changeEvery
+        self._grabs: int = 0
+        gradient = np.linspace(0, 255, width, dtype=np.float32).astype(np.uint8)
+        self._background = np.empty((height, width, 4), dtype=np.uint8)
+        self._background[...] = gradient[None, :, None]
+        self._background[..., 3] = 255
+        self._desktop = self._background.copy()
+
+    def monitors(self):
+        height, width = self._background.shape[:2]
+        return [(0, 0, width, height), (0, 0, width, height)]
+
+    def grab(self, region):
+        if self._grabs % self._changeEvery == 0:
+            height, width = self._background.shape[:2]
+            step = self._grabs // self._changeEvery
+            size = max(8, height // 10)
+            x, y = (step * size) % max(1, width - size), (step * size // 2) % max(1, height - size)
+            np.copyto(self._desktop, self._background)
+            self._desktop[y:y + size, x:x + size, :3] = (0, 0, 255)
+        self._grabs += 1
+        left, top, width, height = region
+        return self._desktop[top:top + height, left:left + width].copy()
+
+
+def availableScreenGrabbers() -> list[str]:
+    names = list()
+    for name, module in ((MSSGrabber.name, "mss"), (PILGrabber.name, "PIL.ImageGrab")):
+        try:
+            __import__(module)
+            names.append(name)
+        except ImportError:
+            pass
+    return names + [SyntheticGrabber.name]
+
+
+def createScreenGrabber(name: str) -> ScreenGrabber:
+    """open the screen grabber of the given name, "mss", "pil" or "synthetic" """
+    if name == MSSGrabber.name:
+        return MSSGrabber()
+    if name == PILGrabber.name:
+        return PILGrabber()
+    if name == SyntheticGrabber.name:
+        return SyntheticGrabber()
+    raise ValueError(f"unknown screen grabber: {name}")
+
+
+class ScreenCapture(CameraCapture):
+    _alphaIsPadding: bool = True
+
+    def __init__(self,
+                 grabber: str,
+                 monitor: int = 1,
+                 region: Union[tuple[int, int, int, int], None] = None,
+                 interval: float = 0.033,
+                 checkStep: int = 4,
+                 threshold: int = 0):
+        """capture a screen, or a region of it, on a thread of its own
+
+        Before a grab is converted to RGBA float32 it is compared to the last delivered one on a
+        grid of every checkStep-th pixel in both directions; if no sampled channel differs by more
+        than threshold the grab is counted as unchanged and dropped, so an idle desktop costs a
+        grab and a subsampled comparison per interval instead of a full-size conversion.
+
+        Args:
+            grabber (str): name of the ScreenGrabber, see availableScreenGrabbers()
+            monitor (int, optional): index into the grabber's monitors(), 0 for all screens. Defaults to 1.
+            region (tuple, optional): (x, y, width, height) relative to the monitor. Defaults to the whole monitor.
+            interval (float, optional): seconds between grabs. Defaults to 0.033.
+            checkStep (int, optional): pixel step of the change check, 1 compares every pixel. Defaults to 4.
+            threshold (int, optional): largest channel difference still counted as unchanged. Defaults to 0.
+        """
+        super().__init__()
+        self._grabberName: str = grabber
+        self._grabber: Union[ScreenGrabber, None] = None
+        self._monitor: int = monitor
+        self._region: Union[tuple[int, int, int, int], None] = region
+        self._interval: float = interval
+        self._checkStep: int = max(1, checkStep)
+        self._threshold: int = threshold
+        self._monitors: list[tuple[int, int, int, int]] = list()
+        self._paused: bool = False
+        self._triggered: bool = False
+        self._nextGrabTime: float = 0
+        self._thumbnail: Union[np.ndarray, None] = None
+        self._unchanged: int = 0
+
+    @property
+    def monitors(self):
+        """screens of the grabber as (left, top, width, height), empty until the capture thread opened it"""
+        return list(self._monitors)
+
+    @property
+    def region(self):
+        return self._region
+
+    @region.setter
+    def region(self, value: Union[tuple[int, int, int, int], None]):
+        with self._condition:
+            self._region = value
+            self._thumbnail = None
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: float):
+        with self._condition:
+            self._interval = value
+            self._condition.notify_all()
+
+    @property
+    def paused(self):
+        """whether grabs only happen on trigger()"""
+        return self._paused
+
+    @paused.setter
+    def paused(self, value: bool):
+        with self._condition:
+            self._paused = value
+            self._condition.notify_all()
+
+    @property
+    def unchanged(self):
+        """number of grabs dropped by the change check"""
+        return self._unchanged
+
+    def trigger(self):
+        """grab once as soon as possible and deliver the result even if nothing changed"""
+        with self._condition:
+            self._triggered = True
+            self._condition.notify_all()
+
+    def _open(self):
+        try:
+            self._grabber = createScreenGrabber(name=self._grabberName)
+            self._monitors = self._grabber.monitors()
+        except Exception as error:
+            print(f"can't open the {self._grabberName} screen grabber: {error}")
+            return False
+        if not 0 <= self._monitor < len(self._monitors):
+            self._monitor = min(1, len(self._monitors) - 1)
+        self._nextGrabTime = time.perf_counter()
+        return True
+
+    def _readFrame(self):
+        while not self._stopped:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped or self._triggered or not self._paused and
+                                         time.perf_counter() >= self._nextGrabTime,
+                                         timeout=None if self._paused else
+                                         max(0.0, self._nextGrabTime - time.perf_counter()))
+                if self._stopped or not self._triggered and (self._paused or time.perf_counter() < self._nextGrabTime):
+                    continue
+                forced, self._triggered = self._triggered, False
+                region = self.__absoluteRegion()
+            self._nextGrabTime = max(self._nextGrabTime + self._interval, time.perf_counter())
+            frame = self._grabber.grab(region=region)
+            if frame is None:
+                return None
+            thumbnail = np.ascontiguousarray(frame[::self._checkStep, ::self._checkStep, :3])
+            if not forced and self._thumbnail is not None and thumbnail.shape == self._thumbnail.shape \
+                    and cv2.norm(thumbnail, self._thumbnail, cv2.NORM_INF) <= self._threshold:
+                self._unchanged += 1
+                continue
+            self._thumbnail = thumbnail
+            return frame
+        return None
+
+    def _release(self):
+        if self._grabber is not None:
+            self._grabber.close()
+
+    def __absoluteRegion(self) -> tuple[int, int, int, int]:
+        left, top, width, height = self._monitors[self._monitor]
+        if self._region is None:
+            return left, top, width, height
+        # the region is clipped to the monitor, an empty width or height extends it to the monitor's edge
+        x, y, regionWidth, regionHeight = self._region
+        x, y = min(max(0, x), width - 1), min(max(0, y), height - 1)
+        regionWidth = width - x if regionWidth <= 0 else min(regionWidth, width - x)
+        regionHeight = height - y if regionHeight <= 0 else min(regionHeight, height - y)
+        return left + x, top + y, regionWidth, regionHeight
@@ -0,0 +1,211 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Union
+
+import cv2
+import numpy as np
+
+# sub-pixel bits of the coordinates handed to the OpenCV drawing functions
+_shift: int = 4
+
+
+class SpriteCache:
+    def __init__(self, budgetBytes: int = 64 * 1024 ** 2):
+        """least recently used cache of rendered arrays, bounded by their total size in bytes
+
+        Args:
+            budgetBytes (int, optional): maximum total size of the cached arrays. Defaults to 64 MiB.
+        """
+        self._budget: int = budgetBytes
+        self._items: OrderedDict[tuple, tuple[np.ndarray, ...]] = OrderedDict()
+        self._nbytes: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: tuple) -> Union[tuple[np.ndarray, ...], None]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: tuple, item: tuple[np.ndarray, ...]):
+        nbytes = sum(x.nbytes for x in item)
+        if nbytes > self._budget:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._nbytes -= sum(x.nbytes for x in previous)
+            self._items[key] = item
+            self._nbytes += nbytes
+            while self._nbytes > self._budget:
+                _, evicted = self._items.popitem(last=False)
+                self._nbytes -= sum(x.nbytes for x in evicted)
+
+
+_maskCache = SpriteCache(budgetBytes=64 * 1024 ** 2)
+_spriteCache = SpriteCache(budgetBytes=128 * 1024 ** 2)
+
+# what a shape without pixels shows instead: a single transparent pixel, always the same array
+EMPTY_SPRITE: np.ndarray = np.zeros((1, 1, 4), dtype=np.float32)
+EMPTY_SPRITE.flags.writeable = False
+
+
+def _fixed(points: np.ndarray) -> np.ndarray:
+    # continuous coordinates have pixel centres at .5, OpenCV's at integers
+    return np.round((np.asarray(points, dtype=np.float64) - 0.5) * (1 << _shift)).astype(np.int32)
+
+
+def _coverage(mask: np.ndarray) -> np.ndarray:
+    # OpenCV only anti-aliases 8-bit images, the coverage is taken from there
+    return np.multiply(mask, np.float32(1 / 255), dtype=np.float32)
+
+
+def _ellipseMask(width: int, height: int, horizontalAxis: float, verticalAxis: float) -> np.ndarray:
+    mask = np.zeros((height, width), dtype=np.uint8)
+    if horizontalAxis > 0 and verticalAxis > 0:
+        center = _fixed((width / 2, height / 2))
+        axes = np.round(np.array((horizontalAxis, verticalAxis)) * (1 << _shift)).astype(np.int32)
+        cv2.ellipse(mask, tuple(center.tolist()), tuple(axes.tolist()), 0, 0, 360, 255, -1, cv2.LINE_AA, _shift)
+    return mask
+
+
+def _regularPolygonVertices(radius: float, sides: int, rotation: float, center: tuple[float, float]) -> np.ndarray:
+    # the first vertex points up, rotation turns the polygon counterclockwise in degrees
+    angles = -math.pi / 2 - math.radians(rotation) + 2 * math.pi * np.arange(sides) / sides
+    return np.stack((center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)), axis=1)
+
+
+def _polygonMask(width: int, height: int, vertices: np.ndarray) -> np.ndarray:
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(mask, [_fixed(vertices)], 255, cv2.LINE_AA, _shift)
+    return mask
+
+
+def shapeMasks(geometry: tuple) -> Union[tuple[np.ndarray, np.ndarray], None]:
+    """fill and stroke coverage of a shape, float32 in the range 0-1, cached by geometry
+
+    The stroke lies inside the shape's bounds like PIL.ImageDraw draws it, except for free polygons,
+    whose stroke is centred on the outline and whose canvas is grown to hold it.
+
+    Args:
+        geometry (tuple): shape name followed by its dimensions and the stroke width last, one of
+            ("circle", radius, w), ("ellipse", width, height, w), ("rectangle", width, height, w),
+            ("line", length, w), ("regular polygon", radius, sides, rotation, w) or
+            ("polygon", ((x, y), ...), w)
+
+    Returns:
+        tuple: fill and stroke coverage of the same size, None if the shape has no pixels
+    """
+    masks = _maskCache.get(key=geometry)
+    if masks is not None:
+        return masks
+    shape, strokeWidth = geometry[0], max(0, geometry[-1])
+    if shape == "circle" or shape == "ellipse":
+        width, height = (geometry[1] * 2,) * 2 if shape == "circle" else geometry[1:3]
+        if width <= 0 or height <= 0:
+            return None
+        fill = _ellipseMask(width, height, width / 2, height / 2)
+        inner = _ellipseMask(width, height, width / 2 - strokeWidth, height / 2 - strokeWidth)
+        stroke = cv2.subtract(fill, inner)
+    elif shape == "rectangle":
+        width, height = geometry[1:3]
+        if width <= 0 or height <= 0:
+            return None
+        fill = np.full((height, width), 255, dtype=np.uint8)
+        stroke = fill.copy()
+        stroke[strokeWidth:height - strokeWidth, strokeWidth:width - strokeWidth] = 0
+    elif shape == "line":
+        length = geometry[1]
+        if length <= 0 or strokeWidth <= 0:
+            return None
+        stroke = np.full((strokeWidth, length), 255, dtype=np.uint8)
+        fill = np.zeros_like(stroke)
+    elif shape == "regular polygon":
+        radius, sides, rotation = geometry[1:4]
+        if radius <= 0 or sides < 3:
+            return None
+        width = height = radius * 2
+        fill = _polygonMask(width, height, _regularPolygonVertices(radius, sides, rotation, (radius, radius)))
+        # an edge moved inwards by the stroke width shrinks the circumradius by w / cos(pi / n)
+        innerRadius = radius - strokeWidth / math.cos(math.pi / sides)
+        inner = _polygonMask(width, height, _regularPolygonVertices(innerRadius, sides, rotation, (radius, radius))) \
+            if innerRadius > 0 else np.zeros_like(fill)
+        stroke = cv2.subtract(fill, inner)
+    elif shape == "polygon":
+        points = np.array(geometry[1], dtype=np.float64).reshape(-1, 2)
+        if len(points) < 3:
+            return None
+        padding = math.ceil(strokeWidth / 2)
+        points = points - points.min(axis=0) + padding
+        width, height = (np.ceil(points.max(axis=0)).astype(int) + padding).tolist()
+        if width < 1 or height < 1:
+            # collinear or identical points without a stroke
+            return None
+        fill = _polygonMask(width, height, points)
+        stroke = np.zeros_like(fill)
+        if strokeWidth > 0:
+            cv2.polylines(stroke, [_fixed(points)], True, 255, strokeWidth, cv2.LINE_AA, _shift)
+    else:
+        raise ValueError(f"unknown shape: {shape}")
+    masks = (_coverage(fill), _coverage(stroke))
+    for mask in masks:
+        mask.flags.writeable = False
+    _maskCache.put(key=geometry, item=masks)
+    return masks
+
+
+def renderShape(geometry: tuple,
+                strokeColor: Union[tuple[int, int, int, int], None],
+                fillColor: Union[tuple[int, int, int, int], None]) -> Union[np.ndarray, None]:
+    """a shape as a read-only RGBA float32 sprite with a transparent background, cached by all its parameters
+
+    Changing only a colour reuses the cached coverage of the geometry, so it costs a composition
+    but no rasterization; a set of parameters seen before costs a dictionary lookup.
+
+    Args:
+        geometry (tuple): shape and dimensions, see shapeMasks()
+        strokeColor (tuple): RGBA 0-255, None for no stroke
+        fillColor (tuple): RGBA 0-255, None for no fill
+
+    Returns:
+        np.ndarray: the sprite, the same array for the same parameters as long as it is cached, None if the shape has no pixels
+    """
+    key = (geometry, strokeColor, fillColor)
+    cached = _spriteCache.get(key=key)
+    if cached is not None:
+        return cached[0]
+    masks = shapeMasks(geometry=geometry)
+    if masks is None:
+        return None
+    fillMask, strokeMask = masks
+    sprite = np.zeros(fillMask.shape + (4,), dtype=np.float32)
+    strokeAlpha = np.zeros_like(strokeMask)
+    fillAlpha = np.zeros_like(fillMask)
+    if strokeColor is not None:
+        np.multiply(strokeMask, np.float32(strokeColor[3] / 255), out=strokeAlpha)
+    if fillColor is not None:
+        # the stroke is composited over the fill
+        np.multiply(fillMask, np.float32(fillColor[3] / 255), out=fillAlpha)
+        fillAlpha *= 1 - strokeAlpha
+    alpha = sprite[..., 3]
+    np.add(strokeAlpha, fillAlpha, out=alpha)
+    for channel in range(3):
+        color = sprite[..., channel]
+        if strokeColor is not None:
+            color += strokeAlpha * np.float32(strokeColor[channel] / 255)
+        if fillColor is not None:
+            color += fillAlpha * np.float32(fillColor[channel] / 255)
+        # colours are not premultiplied, the edges keep their colour and only fade in alpha
+        np.divide(color, alpha, out=color, where=alpha > 0)
+    sprite.flags.writeable = False
+    _spriteCache.put(key=key, item=(sprite,))
+    return sprite
@@ -1,23 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
 from pathlib import Path
 from typing import Union, Iterator
 
 import cv2
 import numpy as np
 
+from nodes.inputs.objects.decoder_backends import DecoderBackend, createDecoderBackend
+
+
+class FrameCache:
+    def __init__(self, budgetBytes: int = 256 * 1024 ** 2):
+        """least recently used cache of decoded frames, bounded by their total size in bytes
+
+        Args:
+            budgetBytes (int, optional): maximum total size of the cached frames. Defaults to 256 MiB.
+        """
+        self._budget: int = budgetBytes
+        self._frames: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._nbytes: int = 0
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, frameIndex: int):
+        return frameIndex in self._frames
+
+    def get(self, frameIndex: int) -> Union[np.ndarray, None]:
+        frame = self._frames.get(frameIndex)
+        if frame is not None:
+            self._frames.move_to_end(frameIndex)
+        return frame
+
+    def put(self, frameIndex: int, frame: np.ndarray):
+        if frame.nbytes > self._budget:
+            return
+        previous = self._frames.pop(frameIndex, None)
+        if previous is not None:
+            self._nbytes -= previous.nbytes
+        self._frames[frameIndex] = frame
+        self._nbytes += frame.nbytes
+        while self._nbytes > self._budget:
+            _, evicted = self._frames.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+
+    def clear(self):
+        self._frames.clear()
+        self._nbytes = 0
+
 
 class VideoFile:
-    def __init__(self, inputFile: Union[Path, str]):
+    # targets up to this many frames ahead are reached by decoding forward rather than seeking
+    maxForwardDistance: int = 64
+
+    def __init__(self,
+                 inputFile: Union[Path, str],
+                 cacheBudget: int = 256 * 1024 ** 2,
+                 buildIndex: bool = True,
+                 backend: str = "opencv",
+                 threads: int = 0):
+        """
+        Args:
+            inputFile (Path or str): video file
+            cacheBudget (int, optional): size of the decoded-frame cache in bytes. Defaults to 256 MiB.
+            buildIndex (bool, optional): whether to build the keyframe index in the background. Defaults to True.
+            backend (str, optional): decoder backend, one of availableDecoderBackends(). Defaults to "opencv".
+            threads (int, optional): decoding threads, 0 for the backend's own choice. Defaults to 0.
+        """
         filePath = Path(inputFile)
         assert filePath.exists() and filePath.is_file()
-        self._VC = cv2.VideoCapture(str(filePath.resolve()))
-        self._fps: int = self._VC.get(cv2.CAP_PROP_FPS)
-        self._frameCount: int = self._VC.get(cv2.CAP_PROP_FRAME_COUNT)
+        self._filePath: Path = filePath.resolve()
+        self._VC: DecoderBackend = createDecoderBackend(name=backend, filePath=self._filePath, threads=threads)
+        self._fps: int = self._VC.fps
+        self._frameCount: int = self._VC.frameCount
+        self._frameWidth: int = self._VC.frameWidth
+        self._frameHeight: int = self._VC.frameHeight
         self._currentFrame: int = 0
+        self._frameCache = FrameCache(budgetBytes=cacheBudget)
+        self._keyframes: Union[np.ndarray, None] = None
+        self._timestamps: Union[np.ndarray, None] = None
+        self._closed: bool = False
+        # the keyframe index is built from the packets alone, on a capture of its own
+        self._indexThread: Union[threading.Thread, None] = None
+        if buildIndex:
+            self._indexThread = threading.Thread(target=self.__buildIndex, daemon=True)
+            self._indexThread.start()
 
     @property
-    def videoCapture(self):
+    def videoCapture(self) -> DecoderBackend:
         return self._VC
 
+    @property
+    def backend(self) -> str:
+        return self._VC.name
+
     @property
     def fps(self):
         return self._fps
@@ -26,66 +112,477 @@ class VideoFile:
     def frameCount(self):
         return self._frameCount
 
+    @property
+    def frameWidth(self):
+        return self._frameWidth
+
+    @property
+    def frameHeight(self):
+        return self._frameHeight
+
+    @property
+    def filePath(self):
+        return self._filePath
+
+    @property
+    def frameCache(self):
+        return self._frameCache
+
+    @property
+    def keyframes(self) -> Union[np.ndarray, None]:
+        """sorted indices of the keyframes, None until the index is built or if it cannot be built"""
+        return self._keyframes
+
+    @property
+    def timestamps(self) -> Union[np.ndarray, None]:
+        """presentation time of every frame in milliseconds, None until the index is built"""
+        return self._timestamps
+
     @property
     def currentFrame(self):
-        return self.videoCapture.get(cv2.CAP_PROP_POS_FRAMES)
+        """index of the frame the next readCurrentFrame() returns"""
+        return self._currentFrame
 
     @currentFrame.setter
     def currentFrame(self, value):
-        self._currentFrame = value
-        self.videoCapture.set(cv2.CAP_PROP_POS_FRAMES, value)
+        self._currentFrame = int(value)
+        self.videoCapture.seek(frameIndex=self._currentFrame)
 
     @property
     def isOpened(self):
         return self.videoCapture.isOpened()
 
+    def keyframeBefore(self, frameIndex: int) -> Union[int, None]:
+        """index of the closest keyframe at or before frameIndex, None while the index is not available"""
+        keyframes = self._keyframes
+        if keyframes is None or not len(keyframes):
+            return None
+        position = np.searchsorted(keyframes, frameIndex, side="right")
+        return int(keyframes[max(position - 1, 0)])
+
     def readCurrentFrame(self) -> np.ndarray:
         success, frame = self.videoCapture.read()
         if success:
             # frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self._frameCache.put(self._currentFrame, frame)
+            self._currentFrame += 1
             return frame
 
     def readNextFrame(self) -> np.ndarray:
         self.currentFrame += 1
         return self.readCurrentFrame()
 
-    def retrieveFrame(self, frameIndex: int) -> np.ndarray:
-        self.currentFrame = frameIndex
+    def retrieveFrame(self, frameIndex: int, grabSkipped: bool = False) -> np.ndarray:
+        """get a BGR frame, from the cache if possible, otherwise by decoding forward to it
+
+        Far or backward targets are decoded from the closest keyframe before them, which is as far
+        back as any seek has to go anyway; every frame decoded on the way is cached, so scrubbing
+        around the position is served from the cache. The returned frame must not be modified.
+
+        Args:
+            frameIndex (int): index of the frame
+            grabSkipped (bool, optional): drop the frames before frameIndex with grab() instead of
+                decoding and caching them, for playback with a skip rate. Defaults to False.
+
+        Returns:
+            np.ndarray: the frame, or None if it could not be read
+        """
+        frame = self._frameCache.get(frameIndex)
+        if frame is not None:
+            return frame
+        if not self._currentFrame <= frameIndex <= self._currentFrame + self.maxForwardDistance:
+            keyframe = self.keyframeBefore(frameIndex)
+            if keyframe is None:
+                # without an index the seek is left to the capture
+                self.currentFrame = frameIndex
+            elif not keyframe <= self._currentFrame <= frameIndex:
+                self.currentFrame = keyframe
+        while self._currentFrame < frameIndex:
+            if grabSkipped:
+                if not self.videoCapture.grab():
+                    return None
+                self._currentFrame += 1
+            elif self.readCurrentFrame() is None:
+                return None
         return self.readCurrentFrame()
 
-    def getFramesEveryNSeconds(self, n: float) -> Iterator[np.ndarray]:
-        numberOfFramesToReturn = int(self.frameCount / self.fps / n)
-        frameIndices = np.linspace(start=0,
-                                   stop=self.frameCount,
-                                   num=numberOfFramesToReturn,
-                                   endpoint=False,
-                                   dtype=np.int)
+    def readRange(self,
+                  start: int = 0,
+                  stop: Union[int, None] = None,
+                  step: int = 1) -> Iterator[tuple[int, float, np.ndarray]]:
+        """decode the frames start, start + step, ... before stop in a single sequential pass
+
+        The pass runs on a decoder of its own, so it can be consumed from another thread while the
+        file is being played. Frames in between are grabbed but never retrieved (converted).
+
+        Args:
+            start (int, optional): index of the first frame. Defaults to 0.
+            stop (int, optional): index the range ends before, None for the end of the file. Defaults to None.
+            step (int, optional): distance between consecutive frames. Defaults to 1.
+
+        Returns:
+            Iterator[tuple[int, float, np.ndarray]]: frame index, timestamp in milliseconds and BGR frame
+        """
+        for frameIndex, timestamp, videoCapture in self.__decodeRange(start=start, stop=stop, step=step):
+            success, frame = videoCapture.retrieve()
+            if not success:
+                return
+            yield frameIndex, timestamp, frame
 
-        return (self.retrieveFrame(idx) for idx in frameIndices)
+    def readRangeBatches(self,
+                         batchSize: int,
+                         start: int = 0,
+                         stop: Union[int, None] = None,
+                         step: int = 1,
+                         reuseBuffers: bool = True) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """decode the same frames as readRange(), retrieved straight into preallocated (N, H, W, 3) batches
+
+        Args:
+            batchSize (int): number of frames per batch, the last batch can be shorter
+            start (int, optional): index of the first frame. Defaults to 0.
+            stop (int, optional): index the range ends before, None for the end of the file. Defaults to None.
+            step (int, optional): distance between consecutive frames. Defaults to 1.
+            reuseBuffers (bool, optional): fill the same arrays for every batch; the consumer has to
+                copy what it keeps before asking for the next batch. Defaults to True.
+
+        Returns:
+            Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]: frame indices, timestamps in milliseconds
+                and BGR frames of every batch
+        """
+        assert batchSize >= 1
+
+        def allocate():
+            return (np.empty(shape=batchSize, dtype=np.int64),
+                    np.empty(shape=batchSize, dtype=np.float64),
+                    np.empty(shape=(batchSize, self._frameHeight, self._frameWidth, 3), dtype=np.uint8))
+
+        indices, timestamps, frames = allocate()
+        filled = 0
+        for frameIndex, timestamp, videoCapture in self.__decodeRange(start=start, stop=stop, step=step):
+            if not videoCapture.retrieve(image=frames[filled])[0]:
+                break
+            indices[filled] = frameIndex
+            timestamps[filled] = timestamp
+            filled += 1
+            if filled == batchSize:
+                yield indices, timestamps, frames
+                filled = 0
+                if not reuseBuffers:
+                    indices, timestamps, frames = allocate()
+        if filled:
+            yield indices[:filled], timestamps[:filled], frames[:filled]
+
+    def getFramesEveryNSeconds(self, n: float) -> Iterator[np.ndarray]:
+        return self.getFrameEveryNFrame(n=max(1, round(n * self.fps)))
 
     def getFrameEveryNFrame(self, n: int) -> Iterator[np.ndarray]:
-        numberOfFramesToReturn = int(self.frameCount / n)
-        frameIndices = np.linspace(start=0,
-                                   stop=self.frameCount,
-                                   num=numberOfFramesToReturn,
-                                   endpoint=False,
-                                   dtype=np.int)
-        return (self.retrieveFrame(idx) for idx in frameIndices)
+        for _, _, frame in self.readRange(step=n):
+            yield frame
 
     def getInterval(self, startFrame: int, endFrame: int) -> Iterator[np.ndarray]:
         """
 
         :param startFrame: startFrame is included
-        :param endFrame: startFrame is included
+        :param endFrame: endFrame is included
         :return:
         """
         assert startFrame < endFrame
-        if endFrame + 1 < self.frameCount:
-            results = (self.retrieveFrame(frameIndex=idx) for idx in range(startFrame, endFrame + 1))
-        else:
-            results = (self.retrieveFrame(frameIndex=idx) for idx in range(startFrame, self.frameCount - 1))
-        return results
+        for _, _, frame in self.readRange(start=startFrame, stop=endFrame + 1):
+            yield frame
+
+    def __decodeRange(self, start: int, stop: Union[int, None], step: int) -> Iterator[tuple]:
+        # yields the decoder positioned on every selected frame, grabbed but not yet retrieved
+        assert start >= 0 and step >= 1
+        videoCapture = self._VC.reopen()
+        try:
+            position = 0
+            if start > 0:
+                # start decoding from the closest keyframe, which is where a seek lands anyway
+                keyframe = self.keyframeBefore(start)
+                position = start if keyframe is None else keyframe
+                videoCapture.seek(frameIndex=position)
+            frameIndex = start
+            while stop is None or frameIndex < stop:
+                while position <= frameIndex:
+                    if not videoCapture.grab():
+                        return
+                    position += 1
+                yield frameIndex, videoCapture.timestamp, videoCapture
+                frameIndex += step
+        finally:
+            videoCapture.release()
 
     def closeVideoFile(self):
+        self._closed = True
         if self.isOpened:
             self.videoCapture.release()
+        self._frameCache.clear()
+
+    def __buildIndex(self):
+        # in raw mode grab() only reads packets, which carry the keyframe flag and the timestamp
+        videoCapture = cv2.VideoCapture(str(self._filePath), cv2.CAP_FFMPEG)
+        try:
+            if not videoCapture.isOpened() or not videoCapture.set(cv2.CAP_PROP_FORMAT, -1):
+                return
+            keyframes, keyframeTimes, timestamps = list(), list(), list()
+            while not self._closed and videoCapture.grab():
+                timestamp = videoCapture.get(cv2.CAP_PROP_POS_MSEC)
+                if videoCapture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    keyframes.append(len(timestamps))
+                    keyframeTimes.append(timestamp)
+                timestamps.append(timestamp)
+            if self._closed or not keyframes or keyframes[0] != 0:
+                return
+            # packets come in decode order, which differs from presentation order with B-frames, so the
+            # timestamps are sorted and each keyframe is placed by its own; without unique timestamps
+            # the packet positions are kept
+            timestamps = np.sort(np.array(timestamps, dtype=np.float64))
+            if np.all(np.diff(timestamps) > 0):
+                keyframes = np.searchsorted(timestamps, keyframeTimes)
+                keyframes[0] = 0
+            self._timestamps = timestamps
+            self._keyframes = np.unique(np.array(keyframes, dtype=np.int64))
+        finally:
+            videoCapture.release()
+
+
+class ThumbnailStrip:
+    def __init__(self, videoFile: VideoFile, cacheDir: Union[Path, str], interval: float = 1.0, height: int = 64):
+        """low resolution RGB thumbnails of a video, one every interval seconds, in a single memory-mapped array
+
+        The strip is stored in cacheDir under a key made of the file path, size and modification
+        time, so reopening a file maps the finished strip instantly. Otherwise it is built by a worker
+        thread in one sequential pass and thumbnails become available as the pass goes.
+
+        Args:
+            videoFile (VideoFile): opened video file
+            cacheDir (Path or str): directory the strips are stored in
+            interval (float, optional): seconds between thumbnails. Defaults to 1.0.
+            height (int, optional): thumbnail height in pixels, the width keeps the aspect ratio. Defaults to 64.
+        """
+        self._videoFile = videoFile
+        self._step: int = max(1, round(interval * videoFile.fps))
+        self._height: int = height
+        self._width: int = max(1, round(height * videoFile.frameWidth / max(1, videoFile.frameHeight)))
+        self._thumbnails: Union[np.ndarray, None] = None
+        self._available: int = 0
+        self._stopped: bool = False
+
+        cacheDir = Path(cacheDir)
+        cacheDir.mkdir(parents=True, exist_ok=True)
+        stat = videoFile.filePath.stat()
+        key = f"{videoFile.filePath}:{stat.st_size}:{stat.st_mtime_ns}:{self._step}:{self._height}"
+        self._path: Path = cacheDir.joinpath(hashlib.sha1(key.encode()).hexdigest() + ".npy")
+        self._thread: Union[threading.Thread, None] = None
+        if self._path.exists():
+            self._thumbnails = np.load(self._path, mmap_mode="r")
+            self._available = len(self._thumbnails)
+        else:
+            self._thread = threading.Thread(target=self.__build, daemon=True)
+            self._thread.start()
+
+    @property
+    def step(self):
+        """number of frames between consecutive thumbnails"""
+        return self._step
+
+    @property
+    def thumbnailSize(self) -> tuple[int, int]:
+        return self._width, self._height
+
+    @property
+    def available(self):
+        """number of thumbnails built so far"""
+        return self._available
+
+    @property
+    def complete(self):
+        return self._thread is None or not self._thread.is_alive()
+
+    def nearestFrameIndex(self, frameIndex: int) -> int:
+        """the frame closest to frameIndex that has a thumbnail, a coarse seek target"""
+        return min(round(frameIndex / self._step), max(self._available - 1, 0)) * self._step
+
+    def thumbnail(self, frameIndex: int) -> Union[np.ndarray, None]:
+        """the (height, width, 3) RGB uint8 thumbnail closest to frameIndex, None if it is not built yet"""
+        thumbnails = self._thumbnails
+        thumbnailIndex = round(frameIndex / self._step)
+        if thumbnails is None or thumbnailIndex >= self._available:
+            return None
+        return thumbnails[thumbnailIndex]
+
+    def stop(self):
+        self._stopped = True
+        if self._thread is not None:
+            self._thread.join()
+
+    def __build(self):
+        count = int(np.ceil(self._videoFile.frameCount / self._step))
+        if count <= 0:
+            return
+        partialPath = self._path.with_suffix(".partial.npy")
+        thumbnails = np.lib.format.open_memmap(partialPath, mode="w+", dtype=np.uint8,
+                                               shape=(count, self._height, self._width, 3))
+        self._thumbnails = thumbnails
+        built = 0
+        frames = self._videoFile.getFrameEveryNFrame(n=self._step)
+        for frame in frames:
+            if self._stopped or built == count:
+                break
+            thumbnail = cv2.resize(src=frame, dsize=(self._width, self._height), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(src=thumbnail, code=cv2.COLOR_BGR2RGB, dst=thumbnails[built])
+            built += 1
+            self._available = built
+        frames.close()
+        thumbnails.flush()
+        if built < count and not self._stopped:
+            # the reported frame count was too large, keep only what was read
+            trimmed = np.array(thumbnails[:built])
+        else:
+            trimmed = None
+        # the writable map has to be closed before the file is moved or removed
+        self._thumbnails = None
+        del thumbnails
+        if self._stopped:
+            partialPath.unlink(missing_ok=True)
+            return
+        if trimmed is not None:
+            np.save(partialPath, trimmed)
+        os.replace(partialPath, self._path)
+        self._thumbnails = np.load(self._path, mmap_mode="r")
+
+
+class VideoDecoder:
+    def __init__(self,
+                 videoFile: VideoFile,
+                 bufferSize: int = 8,
+                 skip: int = 1,
+                 loop: bool = True,
+                 startFrame: int = 0):
+        """decode a video file sequentially in a background thread into a bounded ring buffer
+
+        The decoder runs ahead of playback by up to bufferSize frames and then waits for read().
+        During playback the frames in between are dropped with grab(), which skips the decoding
+        of read(); seek() targets go through VideoFile.retrieveFrame() and its frame cache. The
+        capture only seeks on real discontinuities (seek(), looping, long jumps).
+        Frames are delivered as RGBA float32 in the range 0-1, the format nodes exchange.
+
+        Args:
+            videoFile (VideoFile): opened video file, owned by the decoder from now on
+            bufferSize (int, optional): number of decoded frames kept ahead. Defaults to 8.
+            skip (int, optional): distance between consecutive decoded frames. Defaults to 1.
+            loop (bool, optional): whether to restart from the first frame at the end. Defaults to True.
+            startFrame (int, optional): index of the first frame to decode. Defaults to 0.
+        """
+        self._videoFile = videoFile
+        self._bufferSize: int = max(1, bufferSize)
+        self._buffer: deque[tuple[int, np.ndarray]] = deque()
+        self._condition = threading.Condition()
+        self._skip: int = max(1, skip)
+        self._loop: bool = loop
+        self._nextIndex: int = startFrame
+        self._seekTarget: Union[int, None] = None
+        self._generation: int = 0
+        self._finished: bool = False
+        self._stopped: bool = False
+        self._thread = threading.Thread(target=self.__decodeLoop, daemon=True)
+        self._thread.start()
+
+    @property
+    def videoFile(self):
+        return self._videoFile
+
+    @property
+    def skip(self):
+        return self._skip
+
+    @skip.setter
+    def skip(self, value: int):
+        # frames already buffered keep their spacing, the new one applies from the next decoded frame
+        with self._condition:
+            self._skip = max(1, value)
+
+    @property
+    def loop(self):
+        return self._loop
+
+    @loop.setter
+    def loop(self, value: bool):
+        with self._condition:
+            self._loop = value
+            if value and self._finished:
+                self._finished = False
+                self._nextIndex = 0
+                self._condition.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        """whether the end of a non-looping video was reached and every decoded frame was read"""
+        with self._condition:
+            return self._finished and not self._buffer
+
+    def seek(self, frameIndex: int):
+        """drop the buffered frames and continue decoding from frameIndex"""
+        with self._condition:
+            self._buffer.clear()
+            self._generation += 1
+            self._seekTarget = int(frameIndex)
+            self._finished = False
+            self._condition.notify_all()
+
+    def read(self) -> Union[tuple[int, np.ndarray], None]:
+        """pop the next decoded frame without waiting
+
+        Returns:
+            tuple: frame index and RGBA float32 frame, or None if no frame is ready yet
+        """
+        with self._condition:
+            if not self._buffer:
+                return None
+            item = self._buffer.popleft()
+            self._condition.notify_all()
+            return item
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def __decodeLoop(self):
+        frameCount = int(self._videoFile.frameCount)
+        while True:
+            with self._condition:
+                while not self._stopped and self._seekTarget is None and \
+                        (self._finished or len(self._buffer) >= self._bufferSize):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                sequential = self._seekTarget is None
+                if not sequential:
+                    self._nextIndex = self._seekTarget
+                    self._seekTarget = None
+                index, generation, skip, loop = self._nextIndex, self._generation, self._skip, self._loop
+
+            if 0 < frameCount <= index:
+                index = 0 if loop else None
+            if index is not None:
+                frame = self._videoFile.retrieveFrame(frameIndex=index, grabSkipped=sequential)
+                success = frame is not None
+                if success:
+                    frame = cv2.cvtColor(src=frame, code=cv2.COLOR_BGR2RGBA)
+                    frame = frame.astype(np.float32) / 255
+                elif loop and index > 0:
+                    # the reported frame count can be larger than the real one
+                    frameCount = index
+                    continue
+
+            with self._condition:
+                if generation != self._generation:
+                    continue
+                if index is None or not success:
+                    self._finished = True
+                else:
+                    self._buffer.append((index, frame))
+                    self._nextIndex = index + skip
+                self._condition.notify_all()
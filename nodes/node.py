@@ -45,5 +45,24 @@ class NodeBase:
     def update(self):
         pass
 
+    def requestedInputSize(self) -> Union[tuple[int, int], None]:
+        """width and height this node brings its input image to right away, None if it uses the image as is"""
+        return None
+
+    def downstreamInputSize(self, attr: NodeAttribute) -> Union[tuple[int, int], None]:
+        """the smallest size the image of an output attribute can be produced at without any of the
+        connected nodes losing resolution, None if one of them needs the image as is
+        """
+        sizes = list()
+        for connection in attr.connections:
+            node = self._editor.getNode(tag=connection.targetNode.tag)
+            size = None if node is None else node.requestedInputSize()
+            if size is None:
+                return None
+            sizes.append(size)
+        if not sizes:
+            return None
+        return max(size[0] for size in sizes), max(size[1] for size in sizes)
+
     def close(self):
         dpg.delete_item(item=self._tag)
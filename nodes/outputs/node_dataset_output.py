@@ -0,0 +1,196 @@
+import threading
+from pathlib import Path
+from typing import Union
+
+import dearpygui.dearpygui as dpg
+
+from node_editor.connection_objects import NodeAttribute, AttributeType
+from node_editor.editor import NodeEditor
+from nodes.node import NodeBase
+from nodes.outputs.objects.dataset_objects import DATASET_DTYPES, DatasetWriter
+
+
+class Node(NodeBase):
+    nodeLabel = "Dataset Writer"
+
+    def __init__(self,
+                 tag: int,
+                 pos: tuple[int, int],
+                 editorHandle: NodeEditor):
+        super().__init__(tag=tag, editor=editorHandle)
+        self._width: int = self._settings.nodeWidth
+        self._folderDialogTag: int = editorHandle.getUniqueTag()
+        self._outDirPath: Union[Path, None] = None
+        self._outDirTextInputTag: int = editorHandle.getUniqueTag()
+        self._datasetName: str = "dataset"
+        self._chunkFrames: int = 256
+        self._dtype: str = DATASET_DTYPES[0]
+        self._alpha: bool = False
+        self._compress: bool = False
+        self._tags: str = str()
+        self._writer: Union[DatasetWriter, None] = None
+        # the record and out dir callbacks open and close the writer on the UI thread while update() uses it
+        self._writerLock = threading.Lock()
+        # the writer that was last closed, it may still be writing its last chunk
+        self._closingWriter: Union[DatasetWriter, None] = None
+        self._lastVersion: int = 0
+        self._isRecording: bool = False
+        self._recordCheckboxTag: int = editorHandle.getUniqueTag()
+        self._statusTextTag: int = editorHandle.getUniqueTag()
+
+        self._attrImageInput = NodeAttribute(tag=editorHandle.getUniqueTag(),
+                                             parentNodeTag=self._tag,
+                                             attrType=AttributeType.Image)
+
+        self.inAttrs.append(self._attrImageInput)
+
+        with dpg.node(tag=self._tag,
+                      parent=editorHandle.tag,
+                      label=self.nodeLabel,
+                      pos=pos):
+            with dpg.node_attribute(tag=self._attrImageInput.tag,
+                                    attribute_type=dpg.mvNode_Attr_Input,
+                                    user_data=self._attrImageInput,
+                                    shape=dpg.mvNode_PinShape_QuadFilled,
+                                    indent=5):
+                editorHandle.createFolderSelectionDialog(tag=self._folderDialogTag, callback=self.__callbackSetOutDir)
+                dpg.add_button(label="select out dir",
+                               width=self._width - 10,
+                               callback=lambda: dpg.show_item(item=self._folderDialogTag))
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="out dir", indent=15)
+                    dpg.add_input_text(tag=self._outDirTextInputTag,
+                                       width=self._width - 90,
+                                       readonly=True)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="dataset", indent=15)
+                    dpg.add_input_text(width=self._width - 90,
+                                       default_value=self._datasetName,
+                                       callback=self.__callbackDatasetNameChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="chunk", indent=32)
+                    dpg.add_input_int(width=self._width - 90,
+                                      min_value=1,
+                                      min_clamped=True,
+                                      default_value=self._chunkFrames,
+                                      callback=self.__callbackChunkFramesChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="dtype", indent=32)
+                    dpg.add_combo(items=DATASET_DTYPES,
+                                  default_value=self._dtype,
+                                  width=self._width - 90,
+                                  callback=self.__callbackDtypeChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="tags", indent=40)
+                    dpg.add_input_text(width=self._width - 90,
+                                       hint="stored with every frame",
+                                       callback=self.__callbackTagsChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_checkbox(label="alpha",
+                                     default_value=self._alpha,
+                                     callback=self.__callbackAlphaChange)
+                    dpg.add_checkbox(label="compress",
+                                     default_value=self._compress,
+                                     callback=self.__callbackCompressChange)
+
+                dpg.add_checkbox(tag=self._recordCheckboxTag,
+                                 label="record",
+                                 default_value=self._isRecording,
+                                 callback=self.__callbackRecordStateChange)
+
+                dpg.add_text(tag=self._statusTextTag, wrap=self._width - 10)
+
+    def update(self):
+        with self._writerLock:
+            if self._writer is None:
+                return
+            data = self._attrImageInput.data
+            if data is None or self._attrImageInput.version == self._lastVersion:
+                return
+            self._lastVersion = self._attrImageInput.version
+            if not self._writer.append(img=data, version=self._lastVersion, tags=self._tags):
+                dpg.set_value(item=self._statusTextTag, value=f"stopped: {self._writer.error}")
+                self.__closeWriter()
+                return
+            dpg.set_value(item=self._statusTextTag,
+                          value=f"{self._writer.frames} frames in {self._writer.chunks} chunks, "
+                                f"queue {self._writer.queued}, rejected {self._writer.rejected}")
+
+    def close(self):
+        with self._writerLock:
+            self.__closeWriter(wait=True)
+            self.__joinClosingWriter()
+        dpg.delete_item(item=self._tag)
+
+    def __openWriter(self) -> bool:
+        # the new writer reads dataset.json, which the last one may not have updated yet
+        self.__joinClosingWriter()
+        try:
+            # recording again into the same dataset appends to it
+            self._writer = DatasetWriter(directory=self._outDirPath.joinpath(self._datasetName),
+                                         chunkFrames=self._chunkFrames,
+                                         dtype=self._dtype,
+                                         alpha=self._alpha,
+                                         compress=self._compress)
+        except (OSError, ValueError) as error:
+            dpg.set_value(item=self._statusTextTag, value=str(error))
+            return False
+        return True
+
+    def __closeWriter(self, wait: bool = False):
+        # the writer thread writes the last chunk in the background
+        if self._writer is not None:
+            self._writer.close(wait=wait)
+            if not wait:
+                self._closingWriter = self._writer
+            self._writer = None
+        self._isRecording = False
+        dpg.set_value(item=self._recordCheckboxTag, value=False)
+
+    def __joinClosingWriter(self):
+        if self._closingWriter is not None:
+            self._closingWriter.close(wait=True)
+            self._closingWriter = None
+
+    def __callbackSetOutDir(self, _, data):
+        with self._writerLock:
+            self.__closeWriter()
+        self._outDirPath = Path(data["file_path_name"])
+        dpg.set_value(item=self._outDirTextInputTag, value=str(self._outDirPath.resolve()))
+
+    def __callbackDatasetNameChange(self, _, data):
+        self._datasetName = data
+
+    def __callbackChunkFramesChange(self, _, data):
+        self._chunkFrames = data
+
+    def __callbackDtypeChange(self, _, data):
+        self._dtype = data
+
+    def __callbackTagsChange(self, _, data):
+        self._tags = data
+
+    def __callbackAlphaChange(self, _, data):
+        self._alpha = data
+
+    def __callbackCompressChange(self, _, data):
+        self._compress = data
+
+    def __callbackRecordStateChange(self, _, data):
+        with self._writerLock:
+            if not data:
+                self.__closeWriter()
+                return
+            if self._writer is not None:
+                return
+            if self._outDirPath is None or not self._datasetName or not self.__openWriter():
+                dpg.set_value(item=self._recordCheckboxTag, value=False)
+                return
+            # only frames that arrive after recording started are appended
+            self._lastVersion = self._attrImageInput.version
+            self._isRecording = True
@@ -3,17 +3,21 @@ from typing import Union
 
 import cv2
 import dearpygui.dearpygui as dpg
-import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
 from nodes.node import NodeBase
+from nodes.outputs.objects.writer_objects import ImageWriterPool
 
 
 class Node(NodeBase):
     nodeLabel = "Image Writer"
 
     _formats = [".jpg", ".png"]
+    _depths = {"8 bit": 8, "16 bit": 16}
+    # what happens to a frame when the encoders are behind and the queue is full
+    _busyPolicies = {"wait": False, "drop frames": True}
+    _queueSize: int = 8
     _settings = None
 
     def __init__(self,
@@ -31,7 +35,15 @@ class Node(NodeBase):
         self._nameChangeIntTextTag: int = editorHandle.getUniqueTag()
         self._baseNameTextInputTag: int = editorHandle.getUniqueTag()
         self._fileFormat: str = self._formats[0]
-        self._currentImage: np.ndarray = np.zeros(shape=(2, 2))
+        self._depth: str = list(self._depths.keys())[0]
+        self._pngCompression: int = 3
+        self._jpegQuality: int = 95
+        self._busyPolicy: str = list(self._busyPolicies.keys())[0]
+        self._pool = ImageWriterPool(queueSize=self._queueSize, dropWhenFull=self._busyPolicies[self._busyPolicy])
+        self._lastVersion: int = 0
+        self._pngGroupTag: int = editorHandle.getUniqueTag()
+        self._jpegGroupTag: int = editorHandle.getUniqueTag()
+        self._statusTextTag: int = editorHandle.getUniqueTag()
         self._isWriting: bool = True
         self._overwrite: bool = True
 
@@ -39,6 +51,8 @@ class Node(NodeBase):
                                              parentNodeTag=self._tag,
                                              attrType=AttributeType.Image)
 
+        self.inAttrs.append(self._attrImageInput)
+
         with dpg.node(tag=self._tag,
                       parent=editorHandle.tag,
                       label=self.nodeLabel,
@@ -70,6 +84,38 @@ class Node(NodeBase):
                                   width=self._width - 90,
                                   callback=self.__callbackFileFormatChange)
 
+                with dpg.group(tag=self._jpegGroupTag, horizontal=True, show=self._fileFormat == ".jpg"):
+                    dpg.add_text(default_value="quality", indent=16)
+                    dpg.add_drag_int(width=self._width - 90,
+                                     min_value=0,
+                                     max_value=100,
+                                     clamped=True,
+                                     default_value=self._jpegQuality,
+                                     callback=self.__callbackJpegQualityChange)
+
+                with dpg.group(tag=self._pngGroupTag, show=self._fileFormat == ".png"):
+                    with dpg.group(horizontal=True):
+                        dpg.add_text(default_value="level", indent=32)
+                        dpg.add_drag_int(width=self._width - 90,
+                                         min_value=0,
+                                         max_value=9,
+                                         clamped=True,
+                                         default_value=self._pngCompression,
+                                         callback=self.__callbackPngCompressionChange)
+                    with dpg.group(horizontal=True):
+                        dpg.add_text(default_value="depth", indent=32)
+                        dpg.add_combo(items=list(self._depths.keys()),
+                                      default_value=self._depth,
+                                      width=self._width - 90,
+                                      callback=self.__callbackDepthChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="when busy", indent=0)
+                    dpg.add_combo(items=list(self._busyPolicies.keys()),
+                                  default_value=self._busyPolicy,
+                                  width=self._width - 90,
+                                  callback=self.__callbackBusyPolicyChange)
+
                 dpg.add_checkbox(label="write",
                                  default_value=self._isWriting,
                                  callback=self.__callbackWriteStateChange)
@@ -82,22 +128,49 @@ class Node(NodeBase):
                     dpg.add_text(tag=self._nameChangeIntTextTag, default_value="unq int: 1")
                     dpg.add_button(label="R", width=30, height=30, callback=self.__callbackResetNameChanger)
 
+                dpg.add_text(tag=self._statusTextTag, wrap=self._width - 10)
+
     def update(self):
         if self._outDirPath is None or not self._isWriting:
             return
         data = self._attrImageInput.data
-        if data is not None:
-            if np.array_equal(data, self._currentImage):
-                return
-            filename = self._outDirPath.joinpath(self._fileBaseName + "_"
+        if data is None or self._attrImageInput.version == self._lastVersion:
+            return
+        self._lastVersion = self._attrImageInput.version
+        filename = self.__nextFilePath()
+        if filename is None:
+            dpg.set_value(item=self._statusTextTag, value="no free file name")
+            return
+        # the name is taken when the frame arrives, so files are numbered in frame order
+        # whichever encoder finishes first
+        if self._fileFormat == ".png":
+            future = self._pool.write(filePath=filename, img=data, depth=self._depths[self._depth], alpha=True,
+                                      params=[cv2.IMWRITE_PNG_COMPRESSION, self._pngCompression])
+        else:
+            future = self._pool.write(filePath=filename, img=data,
+                                      params=[cv2.IMWRITE_JPEG_QUALITY, self._jpegQuality])
+        if future is not None:
+            self._nameChangerInt += 1
+            dpg.set_value(item=self._nameChangeIntTextTag, value=f"unq int: {self._nameChangerInt}")
+        dpg.set_value(item=self._statusTextTag,
+                      value=f"queue {self._pool.pending}, written {self._pool.written}, dropped {self._pool.dropped}")
+
+    def close(self):
+        # frames already handed over are still written
+        self._pool.close(wait=False)
+        dpg.delete_item(item=self._tag)
+
+    def __nextFilePath(self) -> Union[Path, None]:
+        # names that are taken are skipped unless existing files are overwritten
+        for _ in range(10000):
+            filePath = self._outDirPath.joinpath(self._fileBaseName + "_"
                                                  + str(self._nameChangerInt)
                                                  + self._fileFormat)
-            if filename.exists() and not self._overwrite:
-                return
-            self._currentImage = data.copy()
+            if self._overwrite or not filePath.exists():
+                return filePath
             self._nameChangerInt += 1
-            cv2.imwrite(filename=str(filename.resolve()), img=cv2.cvtColor(self._currentImage, cv2.COLOR_BGR2RGB))
             dpg.set_value(item=self._nameChangeIntTextTag, value=f"unq int: {self._nameChangerInt}")
+        return None
 
     def __callbackSetOutDir(self, sender, data):
         self._outDirPath = Path(data["file_path_name"])
@@ -115,6 +188,21 @@ class Node(NodeBase):
 
     def __callbackFileFormatChange(self, sender, data):
         self._fileFormat = data
+        dpg.configure_item(item=self._jpegGroupTag, show=data == ".jpg")
+        dpg.configure_item(item=self._pngGroupTag, show=data == ".png")
+
+    def __callbackJpegQualityChange(self, sender, data):
+        self._jpegQuality = data
+
+    def __callbackPngCompressionChange(self, sender, data):
+        self._pngCompression = data
+
+    def __callbackDepthChange(self, sender, data):
+        self._depth = data
+
+    def __callbackBusyPolicyChange(self, sender, data):
+        self._busyPolicy = data
+        self._pool.dropWhenFull = self._busyPolicies[data]
 
     def __callbackResetNameChanger(self):
         self._nameChangerInt = 1
@@ -0,0 +1,108 @@
+from typing import Union
+
+import dearpygui.dearpygui as dpg
+
+from node_editor.connection_objects import NodeAttribute, AttributeType
+from node_editor.editor import NodeEditor
+from nodes.node import NodeBase
+from nodes.outputs.objects.shared_memory_objects import FrameRingWriter
+
+
+class Node(NodeBase):
+    nodeLabel = "Shared Memory Output"
+
+    def __init__(self,
+                 tag: int,
+                 pos: tuple[int, int],
+                 editorHandle: NodeEditor):
+        super().__init__(tag=tag, editor=editorHandle)
+        self._width: int = self._settings.nodeWidth
+        self._ringName: str = "nodium"
+        self._slots: int = 4
+        self._isPublishing: bool = True
+        self._ring: Union[FrameRingWriter, None] = None
+        # set by the callbacks, update() closes the ring and makes it again for the next frame
+        self._ringStale: bool = False
+        self._lastVersion: int = 0
+        self._statusTextTag: int = editorHandle.getUniqueTag()
+
+        self._attrImageInput = NodeAttribute(tag=editorHandle.getUniqueTag(),
+                                             parentNodeTag=self._tag,
+                                             attrType=AttributeType.Image)
+
+        self.inAttrs.append(self._attrImageInput)
+
+        with dpg.node(tag=self._tag,
+                      parent=editorHandle.tag,
+                      label=self.nodeLabel,
+                      pos=pos):
+            with dpg.node_attribute(tag=self._attrImageInput.tag,
+                                    attribute_type=dpg.mvNode_Attr_Input,
+                                    user_data=self._attrImageInput,
+                                    shape=dpg.mvNode_PinShape_QuadFilled,
+                                    indent=5):
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="ring name")
+                    dpg.add_input_text(width=self._width - 90,
+                                       default_value=self._ringName,
+                                       on_enter=True,
+                                       callback=self.__callbackRingNameChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="slots", indent=30)
+                    dpg.add_input_int(width=self._width - 90,
+                                      min_value=2,
+                                      min_clamped=True,
+                                      default_value=self._slots,
+                                      callback=self.__callbackSlotsChange)
+
+                dpg.add_checkbox(label="publish",
+                                 default_value=self._isPublishing,
+                                 callback=self.__callbackPublishStateChange)
+
+                dpg.add_text(tag=self._statusTextTag, wrap=self._width - 10)
+
+    def update(self):
+        # the ring is only closed and made here, never while write() is still filling a slot
+        if self._ringStale or not self._isPublishing:
+            self._ringStale = False
+            self.__closeRing()
+            # the frame the old ring had goes to the new one, even if the graph sends no other
+            self._lastVersion = 0
+        if not self._isPublishing or not self._ringName:
+            return
+        data = self._attrImageInput.data
+        if data is None or self._attrImageInput.version == self._lastVersion:
+            return
+        self._lastVersion = self._attrImageInput.version
+        # the ring is sized for the first frame and made again for a larger one; readers notice
+        # the old ring closing and attach to the new one
+        if self._ring is None or not self._ring.fits(img=data):
+            self.__closeRing()
+            try:
+                self._ring = FrameRingWriter(name=self._ringName, slotBytes=data.nbytes, slots=self._slots)
+            except (OSError, ValueError) as error:
+                dpg.set_value(item=self._statusTextTag, value=str(error))
+                return
+        sequence = self._ring.write(img=data)
+        dpg.set_value(item=self._statusTextTag, value=f"frame {sequence}, {data.shape} {data.dtype}")
+
+    def close(self):
+        self.__closeRing()
+        dpg.delete_item(item=self._tag)
+
+    def __closeRing(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def __callbackRingNameChange(self, _, data):
+        self._ringName = data
+        self._ringStale = True
+
+    def __callbackSlotsChange(self, _, data):
+        self._slots = data
+        self._ringStale = True
+
+    def __callbackPublishStateChange(self, _, data):
+        self._isPublishing = data
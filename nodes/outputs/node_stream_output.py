@@ -0,0 +1,160 @@
+from typing import Union
+
+import dearpygui.dearpygui as dpg
+
+from node_editor.connection_objects import NodeAttribute, AttributeType
+from node_editor.editor import NodeEditor
+from nodes.node import NodeBase
+from nodes.outputs.objects.stream_objects import MJPEGServer
+
+
+class Node(NodeBase):
+    nodeLabel = "MJPEG Stream"
+
+    def __init__(self,
+                 tag: int,
+                 pos: tuple[int, int],
+                 editorHandle: NodeEditor):
+        super().__init__(tag=tag, editor=editorHandle)
+        self._width: int = self._settings.nodeWidth
+        self._port: int = 8080
+        self._allInterfaces: bool = False
+        self._quality: int = 80
+        self._maxWidth: int = 0
+        self._isServing: bool = False
+        self._server: Union[MJPEGServer, None] = None
+        self._publishedVersion: int = 0
+        self._serveCheckboxTag: int = editorHandle.getUniqueTag()
+        self._urlTextTag: int = editorHandle.getUniqueTag()
+        self._statusTextTag: int = editorHandle.getUniqueTag()
+
+        self._attrImageInput = NodeAttribute(tag=editorHandle.getUniqueTag(),
+                                             parentNodeTag=self._tag,
+                                             attrType=AttributeType.Image)
+
+        self.inAttrs.append(self._attrImageInput)
+
+        with dpg.node(tag=self._tag,
+                      parent=editorHandle.tag,
+                      label=self.nodeLabel,
+                      pos=pos):
+            with dpg.node_attribute(tag=self._attrImageInput.tag,
+                                    attribute_type=dpg.mvNode_Attr_Input,
+                                    user_data=self._attrImageInput,
+                                    shape=dpg.mvNode_PinShape_QuadFilled,
+                                    indent=5):
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="port", indent=40)
+                    dpg.add_input_int(width=self._width - 90,
+                                      min_value=0,
+                                      max_value=65535,
+                                      min_clamped=True,
+                                      max_clamped=True,
+                                      default_value=self._port,
+                                      on_enter=True,
+                                      callback=self.__callbackPortChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="quality", indent=16)
+                    dpg.add_drag_int(width=self._width - 90,
+                                     min_value=0,
+                                     max_value=100,
+                                     clamped=True,
+                                     default_value=self._quality,
+                                     callback=self.__callbackQualityChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="max width")
+                    dpg.add_input_int(width=self._width - 90,
+                                      min_value=0,
+                                      min_clamped=True,
+                                      step=64,
+                                      default_value=self._maxWidth,
+                                      callback=self.__callbackMaxWidthChange)
+
+                dpg.add_checkbox(label="all interfaces",
+                                 default_value=self._allInterfaces,
+                                 callback=self.__callbackAllInterfacesChange)
+
+                dpg.add_checkbox(tag=self._serveCheckboxTag,
+                                 label="serve",
+                                 default_value=self._isServing,
+                                 callback=self.__callbackServeStateChange)
+
+                dpg.add_input_text(tag=self._urlTextTag,
+                                   width=self._width - 10,
+                                   readonly=True)
+                dpg.add_text(tag=self._statusTextTag, wrap=self._width - 10)
+
+    def update(self):
+        # the callbacks stop and replace the server on the UI thread; publishing to one that was
+        # closed meanwhile is ignored
+        server = self._server
+        if server is None:
+            return
+        data = self._attrImageInput.data
+        if data is None or self._attrImageInput.version == self._publishedVersion:
+            return
+        # a frame nobody was watching is offered again once someone connects, so a client of a
+        # graph that is not changing still gets a picture
+        if server.publish(img=data):
+            self._publishedVersion = self._attrImageInput.version
+        dpg.set_value(item=self._statusTextTag,
+                      value=f"{server.clients} clients, encoded {server.encoded}, "
+                            f"dropped {server.dropped}, skipped {server.skipped}")
+
+    def close(self):
+        self.__stopServer()
+        dpg.delete_item(item=self._tag)
+
+    def __startServer(self) -> bool:
+        self.__stopServer()
+        try:
+            self._server = MJPEGServer(host="0.0.0.0" if self._allInterfaces else "127.0.0.1",
+                                       port=self._port,
+                                       quality=self._quality,
+                                       maxWidth=self._maxWidth)
+        except OSError as error:
+            dpg.set_value(item=self._statusTextTag, value=str(error))
+            return False
+        self._publishedVersion = 0
+        dpg.set_value(item=self._urlTextTag, value=self._server.url)
+        dpg.set_value(item=self._statusTextTag, value="waiting for clients")
+        return True
+
+    def __stopServer(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        dpg.set_value(item=self._urlTextTag, value=str())
+
+    def __restartIfServing(self):
+        if self._isServing and not self.__startServer():
+            self._isServing = False
+            dpg.set_value(item=self._serveCheckboxTag, value=False)
+
+    def __callbackPortChange(self, _, data):
+        self._port = data
+        self.__restartIfServing()
+
+    def __callbackAllInterfacesChange(self, _, data):
+        self._allInterfaces = data
+        self.__restartIfServing()
+
+    def __callbackQualityChange(self, _, data):
+        self._quality = data
+        if self._server is not None:
+            self._server.quality = data
+
+    def __callbackMaxWidthChange(self, _, data):
+        self._maxWidth = data
+        if self._server is not None:
+            self._server.maxWidth = data
+
+    def __callbackServeStateChange(self, _, data):
+        self._isServing = data
+        if not data:
+            self.__stopServer()
+            dpg.set_value(item=self._statusTextTag, value=str())
+            return
+        self.__restartIfServing()
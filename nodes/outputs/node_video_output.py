@@ -1,19 +1,22 @@
+import threading
 from pathlib import Path
 from typing import Union
 
-import cv2
 import dearpygui.dearpygui as dpg
-import numpy as np
 
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
 from nodes.node import NodeBase
+from nodes.outputs.objects.writer_objects import SegmentedVideoWriter, VideoStreamWriter
 
 
 class Node(NodeBase):
     nodeLabel = "Video Writer"
 
     _encoderType = {".mp4": "mp4v", ".avi": "DIVX"}
+    # what write() does when the encoder thread is behind and its queue is full
+    _busyPolicies = {"wait": False, "drop frames": True}
+    _queueSize: int = 32
     _settings = None
 
     def __init__(self,
@@ -36,14 +39,19 @@ class Node(NodeBase):
         self._fpsRange: tuple = (1, 60)
         self._fps: int = 24
         self._fileFormat: str = list(self._encoderType.keys())[0]
-        self._saveModes: list[str] = ["record stop", "frame limit"]
+        self._saveModes: list[str] = ["record stop", "segments"]
         self._saveMode: str = self._saveModes[0]
-        self._frameLimitGroupTag: int = editorHandle.getUniqueTag()
-        self._frameLimitInputTag: int = editorHandle.getUniqueTag()
-        self._frameLimitMin: int = 10
-        self._frameLimit: int = 240
-        self._currentImage: np.ndarray = np.zeros(shape=(2, 2))
-        self._frameCache: list[np.ndarray] = list()
+        self._segmentGroupTag: int = editorHandle.getUniqueTag()
+        self._segmentLength: int = 60
+        self._segmentUnit: str = SegmentedVideoWriter.segmentUnits[0]
+        # number of most recent segments kept on disk, 0 keeps them all
+        self._keepSegments: int = 0
+        self._busyPolicy: str = list(self._busyPolicies.keys())[0]
+        self._writer: Union[VideoStreamWriter, None] = None
+        # the record callback opens and closes the writer on the UI thread while update() uses it
+        self._writerLock = threading.Lock()
+        self._lastVersion: int = 0
+        self._statusTextTag: int = editorHandle.getUniqueTag()
         self._isRecording: bool = True
         self._overwrite: bool = True
 
@@ -51,6 +59,8 @@ class Node(NodeBase):
                                              parentNodeTag=self._tag,
                                              attrType=AttributeType.Image)
 
+        self.inAttrs.append(self._attrImageInput)
+
         with dpg.node(tag=self._tag,
                       parent=editorHandle.tag,
                       label=self.nodeLabel,
@@ -106,14 +116,32 @@ class Node(NodeBase):
                                   width=self._width - 90,
                                   callback=self.__callbackSaveModeChange)
 
-                with dpg.group(tag=self._frameLimitGroupTag, horizontal=True, show=False):
-                    dpg.add_text(default_value="limit", indent=32)
-                    dpg.add_input_int(tag=self._frameLimitInputTag,
-                                      width=self._width - 90,
-                                      min_value=self._frameLimitMin,
-                                      min_clamped=True,
-                                      default_value=self._frameLimit,
-                                      callback=self.__callbackLimitChange)
+                with dpg.group(tag=self._segmentGroupTag, show=False):
+                    with dpg.group(horizontal=True):
+                        dpg.add_text(default_value="every", indent=32)
+                        dpg.add_input_int(width=(self._width - 98) // 2,
+                                          min_value=1,
+                                          min_clamped=True,
+                                          default_value=self._segmentLength,
+                                          callback=self.__callbackSegmentLengthChange)
+                        dpg.add_combo(items=SegmentedVideoWriter.segmentUnits,
+                                      default_value=self._segmentUnit,
+                                      width=(self._width - 98) // 2,
+                                      callback=self.__callbackSegmentUnitChange)
+                    with dpg.group(horizontal=True):
+                        dpg.add_text(default_value="keep last", indent=4)
+                        dpg.add_input_int(width=self._width - 90,
+                                          min_value=0,
+                                          min_clamped=True,
+                                          default_value=self._keepSegments,
+                                          callback=self.__callbackKeepSegmentsChange)
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value="when busy", indent=0)
+                    dpg.add_combo(items=list(self._busyPolicies.keys()),
+                                  default_value=self._busyPolicy,
+                                  width=self._width - 90,
+                                  callback=self.__callbackBusyPolicyChange)
 
                 dpg.add_checkbox(label="record",
                                  default_value=self._isRecording,
@@ -127,6 +155,8 @@ class Node(NodeBase):
                     dpg.add_text(tag=self._nameChangeIntTextTag, default_value="unq int: 1")
                     dpg.add_button(label="R", width=30, height=30, callback=self.__callbackResetNameChanger)
 
+                dpg.add_text(tag=self._statusTextTag, wrap=self._width - 10)
+
     def update(self):
         if self._outDirPath is None:
             return
@@ -139,37 +169,74 @@ class Node(NodeBase):
         if data is None:
             return
 
-        if np.array_equal(data, self._currentImage):
+        # a frame is recorded once, however often the graph runs before the next one arrives
+        if self._attrImageInput.version == self._lastVersion:
             return
+        self._lastVersion = self._attrImageInput.version
 
-        self._currentImage = data.copy()
-        self._frameCache.append(self._currentImage)
-        print(len(self._frameCache))
-        if self._saveMode == "frame limit":
-            if len(self._frameCache) < self._frameLimit:
+        with self._writerLock:
+            if not self._isRecording:
                 return
-            frames = self._frameCache.copy()
-            self.__writeVideo(frames=frames)
-            self._frameCache.clear()
-
-    def __writeVideo(self, frames: list[np.ndarray]):
-        filePath = self._outDirPath.joinpath(self._fileBaseName + "_"
-                                             + str(self._nameChangerInt)
-                                             + self._fileFormat)
-        if filePath.exists() and not self._overwrite:
-            return
-        self._nameChangerInt += 1
-        dpg.set_value(item=self._nameChangeIntTextTag, value=f"unq int: {self._nameChangerInt}")
-        theFormat = self._encoderType[self._fileFormat]
-        encoder = cv2.VideoWriter_fourcc(*theFormat)
-        writer = cv2.VideoWriter(str(filePath.resolve()),
-                                 encoder,
-                                 self._fps,
-                                 self._size,
-                                 True)
-        for frame in frames:
-            writer.write(frame[:, :, ::-1])
-        writer.release()
+            if self._writer is None and not self.__openWriter():
+                return
+            self._writer.write(img=data)
+            status = f"encoded {self._writer.fps:.1f} fps, queue {self._writer.queued}, dropped {self._writer.dropped}"
+            if isinstance(self._writer, SegmentedVideoWriter):
+                status += f", segment {self._writer.segmentIndex}"
+        dpg.set_value(item=self._statusTextTag, value=status)
+
+    def close(self):
+        with self._writerLock:
+            self.__closeWriter(wait=True)
+        dpg.delete_item(item=self._tag)
+
+    def __openWriter(self) -> bool:
+        filePath = self.__nextFilePath()
+        if filePath is None:
+            dpg.set_value(item=self._statusTextTag, value="all file names are taken, allow overwriting")
+            return False
+        if self._saveMode == "segments":
+            # the writer itself moves on to the next file, without a gap between segments
+            self._writer = SegmentedVideoWriter(filePath=filePath,
+                                                fourcc=self._encoderType[self._fileFormat],
+                                                fps=self._fps,
+                                                size=self._size,
+                                                segmentLength=self._segmentLength,
+                                                segmentUnit=self._segmentUnit,
+                                                keepSegments=self._keepSegments,
+                                                queueSize=self._queueSize,
+                                                dropWhenFull=self._busyPolicies[self._busyPolicy])
+        else:
+            self._writer = VideoStreamWriter(filePath=filePath,
+                                             fourcc=self._encoderType[self._fileFormat],
+                                             fps=self._fps,
+                                             size=self._size,
+                                             queueSize=self._queueSize,
+                                             dropWhenFull=self._busyPolicies[self._busyPolicy])
+        if not self._writer.isOpened():
+            print(f"can't open a video writer for this file:\n{filePath}")
+            self.__closeWriter()
+            self._isRecording = False
+            return False
+        return True
+
+    def __closeWriter(self, wait: bool = False):
+        if self._writer is not None:
+            self._writer.close(wait=wait)
+            self._writer = None
+
+    def __nextFilePath(self) -> Union[Path, None]:
+        for _ in range(10000):
+            filePath = self._outDirPath.joinpath(self._fileBaseName + "_"
+                                                 + str(self._nameChangerInt)
+                                                 + self._fileFormat)
+            self._nameChangerInt += 1
+            dpg.set_value(item=self._nameChangeIntTextTag, value=f"unq int: {self._nameChangerInt}")
+            # the first segment of a segmented recording is taken if its name is
+            firstSegmentPath = filePath.with_name(f"{filePath.stem}_0000{filePath.suffix}")
+            if self._overwrite or not (filePath.exists() or firstSegmentPath.exists()):
+                return filePath
+        return None
 
     def __callbackSetOutDir(self, _, data):
         self._outDirPath = Path(data["file_path_name"])
@@ -183,32 +250,40 @@ class Node(NodeBase):
         self._fps = data
 
     def __callbackSizeChange(self, _, data):
-        self._size = data
+        self._size = tuple(data[:2])
+
+    def __callbackSegmentLengthChange(self, _, data):
+        self._segmentLength = data
+
+    def __callbackSegmentUnitChange(self, _, data):
+        self._segmentUnit = data
 
-    def __callbackLimitChange(self, _, data):
-        self._frameLimit = data
+    def __callbackKeepSegmentsChange(self, _, data):
+        self._keepSegments = data
 
     def __callbackRecordStateChange(self, _, data):
-        self._isRecording = data
-        if self._outDirPath is None:
-            return
-        if not data:
-            if self._frameCache:
-                frames = self._frameCache.copy()
-                self.__writeVideo(frames=frames)
-                self._frameCache.clear()
+        with self._writerLock:
+            self._isRecording = data
+            if not data:
+                # the encoder thread finishes the file in the background
+                self.__closeWriter()
+            elif self._outDirPath is not None and self._writer is None:
+                self.__openWriter()
 
     def __callbackOverWriteStateChange(self, _, data):
         self._overwrite = data
 
+    def __callbackBusyPolicyChange(self, _, data):
+        self._busyPolicy = data
+
     def __callbackFileFormatChange(self, _, data):
         self._fileFormat = data
 
     def __callbackSaveModeChange(self, _, data):
         if data == "record stop":
-            dpg.hide_item(item=self._frameLimitGroupTag)
+            dpg.hide_item(item=self._segmentGroupTag)
         else:
-            dpg.show_item(item=self._frameLimitGroupTag)
+            dpg.show_item(item=self._segmentGroupTag)
         self._saveMode = data
 
     def __callbackResetNameChanger(self):
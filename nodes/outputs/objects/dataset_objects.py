@@ -0,0 +1,278 @@
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Union
+
+import cv2
+import numpy as np
+
+DATASET_DTYPES: tuple[str, ...] = ("uint8", "float16", "float32")
+_headerName: str = "dataset.json"
+_metadataName: str = "metadata.csv"
+_metadataColumns: list[str] = ["index", "chunk", "row", "timestamp", "version", "tags"]
+
+
+def _chunkName(chunk: int, compressed: bool) -> str:
+    return f"chunk-{chunk:06d}" + (".npz" if compressed else ".npy")
+
+
+class DatasetWriter:
+    # put on the queue to make the writer thread flush and stop
+    _endOfStream = None
+
+    def __init__(self,
+                 directory: Union[Path, str],
+                 chunkFrames: int = 256,
+                 dtype: str = "uint8",
+                 alpha: bool = False,
+                 compress: bool = False,
+                 queueSize: int = 64):
+        """append frames to a dataset of fixed-size chunk files with a metadata table next to them
+
+        The directory holds chunk-000000.npy, chunk-000001.npy, ... each an array of shape
+        (frames, height, width, channels), a metadata.csv with one row per frame and a dataset.json
+        describing the whole. Frames are converted and collected into a preallocated chunk on a
+        thread of its own, and a chunk is written in one go when it is full, under a temporary
+        name that is renamed when complete, so the dataset on disk is consistent at any moment.
+        Compressed chunks are .npz files, which are smaller but can't be memory-mapped by
+        DatasetReader. An existing dataset of the same frame shape and dtype is appended to.
+
+        Args:
+            directory (Path or str): dataset directory, created if needed
+            chunkFrames (int, optional): frames per chunk file. Defaults to 256.
+            dtype (str, optional): "uint8" (0-255), "float16" or "float32" (0-1). Defaults to "uint8".
+            alpha (bool, optional): whether to keep the alpha channel. Defaults to False.
+            compress (bool, optional): whether to write compressed .npz chunks. Defaults to False.
+            queueSize (int, optional): frames that may wait for the writer thread. Defaults to 64.
+        """
+        if dtype not in DATASET_DTYPES:
+            raise ValueError(f"unsupported dataset dtype: {dtype}")
+        self._directory: Path = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._chunkFrames: int = max(1, chunkFrames)
+        self._dtype: np.dtype = np.dtype(dtype)
+        self._alpha: bool = alpha
+        self._compress: bool = compress
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queueSize))
+        self._header: dict = self.__loadHeader()
+        self._frameShape: Union[tuple[int, ...], None] = \
+            tuple(self._header["frameShape"]) if self._header["frameShape"] else None
+        self._chunk: Union[np.ndarray, None] = None
+        self._rows: list[list] = list()
+        self._rejected: int = 0
+        self._error: Union[str, None] = None
+        self._closed: bool = False
+        self._thread = threading.Thread(target=self.__writeLoop, daemon=True)
+        self._thread.start()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def frames(self):
+        """number of frames in the chunks written so far"""
+        return self._header["frames"]
+
+    @property
+    def chunks(self):
+        return len(self._header["chunks"])
+
+    @property
+    def queued(self):
+        return self._queue.qsize()
+
+    @property
+    def rejected(self):
+        """number of frames left out because their shape differs from the dataset's"""
+        return self._rejected
+
+    @property
+    def error(self):
+        """why the dataset could not be written to, None while all is well"""
+        return self._error
+
+    def append(self, img: np.ndarray, version: int = 0, tags: str = str()) -> bool:
+        """queue a float frame in the range 0-1, waiting while the queue is full
+
+        Args:
+            img (np.ndarray): RGBA, RGB or gray frame; it must not be modified afterwards
+            version (int, optional): data version of the frame, stored in the metadata. Defaults to 0.
+            tags (str, optional): free text stored with the frame, e.g. the parameters it was made with. Defaults to "".
+
+        Returns:
+            bool: False if the writer is closed or failed
+        """
+        item = (img, time.time(), version, tags)
+        while self._error is None and self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                # the writer thread may have failed while the queue was full
+                continue
+        return False
+
+    def close(self, wait: bool = True):
+        """write the last, possibly shorter, chunk and stop; closing again only waits for that"""
+        if not self._closed:
+            self._closed = True
+            while self._error is None and self._thread.is_alive():
+                try:
+                    self._queue.put(self._endOfStream, timeout=0.5)
+                    break
+                except queue.Full:
+                    # a failed writer thread never empties the queue
+                    continue
+        if wait:
+            self._thread.join()
+
+    def __loadHeader(self) -> dict:
+        headerPath = self._directory.joinpath(_headerName)
+        header = dict(dtype=self._dtype.name, frameShape=None, frames=0, chunks=list())
+        if not headerPath.exists():
+            return header
+        existing = json.loads(headerPath.read_text(encoding="utf-8"))
+        if existing["dtype"] != self._dtype.name:
+            raise ValueError(f"the dataset in {self._directory} holds {existing['dtype']}, not {self._dtype.name}")
+        return existing
+
+    def __saveHeader(self):
+        headerPath = self._directory.joinpath(_headerName)
+        partialPath = headerPath.with_name(headerPath.name + ".partial")
+        partialPath.write_text(json.dumps(self._header, indent=4), encoding="utf-8")
+        os.replace(partialPath, headerPath)
+
+    def __convert(self, img: np.ndarray) -> np.ndarray:
+        if img.ndim == 2:
+            img = img[..., None]
+        elif img.shape[2] == 4 and not self._alpha:
+            img = img[..., :3]
+        if self._dtype == np.uint8:
+            return cv2.convertScaleAbs(src=np.clip(img, 0, 1), alpha=255).reshape(img.shape)
+        return img.astype(self._dtype)
+
+    def __writeLoop(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._endOfStream:
+                    if self._rows:
+                        self.__flushChunk()
+                    return
+                img, timestamp, version, tags = item
+                frame = self.__convert(img=img)
+                if self._frameShape is None:
+                    self._frameShape = frame.shape
+                    self._header["frameShape"] = list(frame.shape)
+                if frame.shape != self._frameShape:
+                    self._rejected += 1
+                    continue
+                if self._chunk is None:
+                    self._chunk = np.empty((self._chunkFrames,) + self._frameShape, dtype=self._dtype)
+                row = len(self._rows)
+                self._chunk[row] = frame
+                self._rows.append([self._header["frames"] + row, len(self._header["chunks"]), row,
+                                   f"{timestamp:.6f}", version, tags])
+                if len(self._rows) == self._chunkFrames:
+                    self.__flushChunk()
+        except (OSError, ValueError) as error:
+            self._error = str(error)
+            print(f"can't write to the dataset in {self._directory}: {error}")
+
+    def __flushChunk(self):
+        frames = len(self._rows)
+        name = _chunkName(chunk=len(self._header["chunks"]), compressed=self._compress)
+        chunkPath = self._directory.joinpath(name)
+        partialPath = chunkPath.with_name(chunkPath.name + ".partial")
+        with open(partialPath, "wb") as file:
+            if self._compress:
+                np.savez_compressed(file, frames=self._chunk[:frames])
+            else:
+                np.save(file, self._chunk[:frames])
+        os.replace(partialPath, chunkPath)
+        metadataPath = self._directory.joinpath(_metadataName)
+        newTable = not metadataPath.exists()
+        with open(metadataPath, "a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            if newTable:
+                writer.writerow(_metadataColumns)
+            writer.writerows(self._rows)
+        # the header is written last, a reader never sees a chunk it does not describe
+        self._header["chunks"].append(dict(file=name, frames=frames))
+        self._header["frames"] += frames
+        self.__saveHeader()
+        self._rows = list()
+
+
+class DatasetReader:
+    def __init__(self, directory: Union[Path, str]):
+        """read a dataset written by DatasetWriter, memory-mapping its .npy chunks
+
+        Frames are read straight from the page cache without copies; indexing returns a read-only
+        view into a chunk. Compressed .npz chunks are loaded whole when first needed.
+
+        Args:
+            directory (Path or str): dataset directory
+        """
+        self._directory: Path = Path(directory)
+        self._header: dict = json.loads(self._directory.joinpath(_headerName).read_text(encoding="utf-8"))
+        self._starts: np.ndarray = np.cumsum([0] + [chunk["frames"] for chunk in self._header["chunks"]])
+        self._arrays: dict[int, np.ndarray] = dict()
+        self._metadata: Union[list[dict], None] = None
+
+    @property
+    def dtype(self):
+        return np.dtype(self._header["dtype"])
+
+    @property
+    def frameShape(self):
+        return tuple(self._header["frameShape"] or ())
+
+    @property
+    def shape(self):
+        return (len(self),) + self.frameShape
+
+    @property
+    def metadata(self) -> list[dict]:
+        """one dictionary per frame with the columns of metadata.csv"""
+        if self._metadata is None:
+            with open(self._directory.joinpath(_metadataName), newline="", encoding="utf-8") as file:
+                # rows of a chunk that a crash kept out of the header are left out, and written again
+                # rows of the same frame replace the earlier ones
+                rows = {int(row["index"]): row for row in csv.DictReader(file)}
+            self._metadata = [rows[index] for index in range(len(self)) if index in rows]
+        return self._metadata
+
+    def __len__(self):
+        return int(self._header["frames"])
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"frame {index} is out of range for {len(self)} frames")
+        chunk = int(np.searchsorted(self._starts, index, side="right")) - 1
+        return self.chunk(index=chunk)[index - self._starts[chunk]]
+
+    def chunk(self, index: int) -> np.ndarray:
+        """all frames of a chunk as one array, memory-mapped for .npy chunks"""
+        array = self._arrays.get(index)
+        if array is None:
+            path = self._directory.joinpath(self._header["chunks"][index]["file"])
+            if path.suffix == ".npz":
+                with np.load(path) as archive:
+                    array = archive["frames"]
+            else:
+                array = np.load(path, mmap_mode="r")
+            self._arrays[index] = array
+        return array
+
+    def chunks(self) -> Iterator[np.ndarray]:
+        """the chunks in order, the natural batches to stream the dataset in"""
+        for index in range(len(self._header["chunks"])):
+            yield self.chunk(index=index)
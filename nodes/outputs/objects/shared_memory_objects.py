@@ -0,0 +1,239 @@
+"""frames passed between processes through a ring of slots in named shared memory
+
+The module only needs NumPy, so a consumer process can copy it or import it without the editor.
+
+Layout of the shared memory block, all little endian:
+    ring header (64 bytes): magic b"NDRG", layout version, number of slots, closed flag,
+        bytes per slot, sequence number of the newest frame
+    slot headers (64 bytes each): sequence lock, timestamp (time.time()), ndim, dtype string,
+        shape (up to 4 dimensions), bytes of the frame
+    slot data: one frame per slot, each slot 64-byte aligned
+
+A frame with sequence number n goes to slot (n - 1) % slots. Each slot is guarded by a sequence
+lock: the writer makes it odd while writing and sets it to 2n when done, so a reader that sees the
+same even value before and after reading knows it got frame n whole.
+"""
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Union
+
+import numpy as np
+
+_magic: bytes = b"NDRG"
+_layoutVersion: int = 1
+_ringHeader = struct.Struct("<4sIIIQQ")
+_slotHeader = struct.Struct("<QdI8s4IQ")
+_headerBytes: int = 64
+_alignment: int = 64
+_maxDims: int = 4
+_attachLock = threading.Lock()
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _alignment) * _alignment
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # before Python 3.13 every process that attaches registers the block with its resource tracker,
+    # which unlinks it when that process exits, taking it away from the writer. Unregistering it
+    # afterwards is no way out: a child process, forked or spawned, shares the tracker of its
+    # parent and would drop the registration of the writer. The block is therefore opened without
+    # registering it at all, and tracking is left to the process that created it.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    attachingThread = threading.get_ident()
+
+    def registerUnlessAttaching(resourceName: str, resourceType: str):
+        if resourceType == "shared_memory" and threading.get_ident() == attachingThread:
+            return
+        register(resourceName, resourceType)
+
+    with _attachLock:
+        resource_tracker.register = registerUnlessAttaching
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class FrameRingWriter:
+    def __init__(self, name: str, slotBytes: int, slots: int = 4):
+        """create a named frame ring other processes can read with FrameRingReader
+
+        A block of the same name left behind by a writer that did not close is replaced.
+
+        Args:
+            name (str): name of the shared memory block
+            slotBytes (int): largest frame in bytes
+            slots (int, optional): frames kept in the ring; a reader has slots - 1 frames of time
+                before the frame it holds a view of is overwritten. Defaults to 4.
+        """
+        self._name: str = name
+        self._slots: int = max(2, slots)
+        self._slotBytes: int = _aligned(max(1, slotBytes))
+        size = _headerBytes + self._slots * _headerBytes + self._slots * self._slotBytes
+        try:
+            self._block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._sequence: int = 0
+        _ringHeader.pack_into(self._block.buf, 0, _magic, _layoutVersion, self._slots, 0, self._slotBytes, 0)
+        for slot in range(self._slots):
+            _slotHeader.pack_into(self._block.buf, self.__slotHeaderOffset(slot), 0, 0, 0, b"", 0, 0, 0, 0, 0)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def slotBytes(self):
+        return self._slotBytes
+
+    @property
+    def sequence(self):
+        """sequence number of the newest frame, 0 before the first one"""
+        return self._sequence
+
+    def __slotHeaderOffset(self, slot: int) -> int:
+        return _headerBytes + slot * _headerBytes
+
+    def __slotDataOffset(self, slot: int) -> int:
+        return _headerBytes + self._slots * _headerBytes + slot * self._slotBytes
+
+    def fits(self, img: np.ndarray) -> bool:
+        return img.nbytes <= self._slotBytes and img.ndim <= _maxDims
+
+    def write(self, img: np.ndarray, timestamp: Union[float, None] = None) -> int:
+        """publish a frame
+
+        Args:
+            img (np.ndarray): frame of at most slotBytes bytes and 4 dimensions
+            timestamp (float, optional): time.time() of the frame. Defaults to now.
+
+        Returns:
+            int: sequence number of the frame
+        """
+        if not self.fits(img=img):
+            raise ValueError(f"a frame of {img.nbytes} bytes and {img.ndim} dimensions does not fit the ring")
+        sequence = self._sequence + 1
+        slot = (sequence - 1) % self._slots
+        headerOffset = self.__slotHeaderOffset(slot)
+        buf = self._block.buf
+        # odd while the slot is being written
+        struct.pack_into("<Q", buf, headerOffset, 2 * sequence - 1)
+        dataOffset = self.__slotDataOffset(slot)
+        target = np.ndarray(img.shape, dtype=img.dtype, buffer=buf, offset=dataOffset)
+        np.copyto(target, img)
+        shape = tuple(img.shape) + (0,) * (_maxDims - img.ndim)
+        _slotHeader.pack_into(buf, headerOffset, 2 * sequence - 1, time.time() if timestamp is None else timestamp,
+                              img.ndim, img.dtype.str.encode(), *shape, img.nbytes)
+        struct.pack_into("<Q", buf, headerOffset, 2 * sequence)
+        # the newest sequence number is published last
+        struct.pack_into("<Q", buf, _ringHeader.size - 8, sequence)
+        self._sequence = sequence
+        return sequence
+
+    def close(self):
+        """mark the ring closed for the readers and remove it"""
+        struct.pack_into("<I", self._block.buf, 12, 1)
+        self._block.close()
+        try:
+            self._block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameRingReader:
+    def __init__(self, name: str):
+        """attach to a frame ring created by FrameRingWriter, in this or any other process
+
+        Raises:
+            FileNotFoundError: if there is no ring of that name
+            ValueError: if the block is not a frame ring of a known layout
+        """
+        self._name: str = name
+        self._block = _attach(name=name)
+        magic, layoutVersion, self._slots, _, self._slotBytes, _ = _ringHeader.unpack_from(self._block.buf, 0)
+        if magic != _magic or layoutVersion != _layoutVersion:
+            self._block.close()
+            raise ValueError(f"{name} is not a frame ring this reader understands")
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def closed(self):
+        """whether the writer closed the ring; a new writer of the same name needs a new reader"""
+        return struct.unpack_from("<I", self._block.buf, 12)[0] == 1
+
+    @property
+    def sequence(self):
+        """sequence number of the newest published frame"""
+        return struct.unpack_from("<Q", self._block.buf, _ringHeader.size - 8)[0]
+
+    def read(self, after: int = 0, copy: bool = True) -> Union[tuple[int, float, np.ndarray], None]:
+        """the newest frame if it is newer than sequence number `after`
+
+        Args:
+            after (int, optional): sequence number of the last frame the caller has. Defaults to 0.
+            copy (bool, optional): return a copy instead of a view into the shared memory. A view is
+                only valid until the writer comes round to its slot again, see isCurrent(). Defaults to True.
+
+        Returns:
+            tuple: sequence number, timestamp and frame, None if there is no newer frame
+        """
+        for _ in range(8):
+            sequence = self.sequence
+            if sequence <= after:
+                return None
+            slot = (sequence - 1) % self._slots
+            headerOffset = _headerBytes + slot * _headerBytes
+            lock, timestamp, ndim, dtype, *rest = _slotHeader.unpack_from(self._block.buf, headerOffset)
+            if lock != 2 * sequence:
+                # the writer is already at this slot again, the next sequence number is tried
+                continue
+            shape, dataOffset = tuple(rest[:ndim]), _headerBytes + self._slots * _headerBytes + slot * self._slotBytes
+            frame = np.ndarray(shape, dtype=np.dtype(dtype.rstrip(b"\0").decode()), buffer=self._block.buf,
+                               offset=dataOffset)
+            if copy:
+                frame = frame.copy()
+            if struct.unpack_from("<Q", self._block.buf, headerOffset)[0] == lock:
+                if not copy:
+                    frame.flags.writeable = False
+                return sequence, timestamp, frame
+        return None
+
+    def isCurrent(self, sequence: int) -> bool:
+        """whether a view returned by read(copy=False) for this sequence number still holds that frame"""
+        slot = (sequence - 1) % self._slots
+        return struct.unpack_from("<Q", self._block.buf, _headerBytes + slot * _headerBytes)[0] == 2 * sequence
+
+    def wait(self, after: int = 0, timeout: Union[float, None] = None,
+             copy: bool = True) -> Union[tuple[int, float, np.ndarray], None]:
+        """wait for a frame newer than `after` and return it like read(), None on timeout or when the ring closes"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self.closed:
+            frame = self.read(after=after, copy=copy)
+            if frame is not None:
+                return frame
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            # there is no cross-process condition to wait on, a millisecond of polling costs next to nothing
+            time.sleep(0.001)
+        return None
+
+    def close(self):
+        self._block.close()
@@ -0,0 +1,235 @@
+import socket
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Union
+
+import cv2
+import numpy as np
+
+from nodes.outputs.objects.writer_objects import toBGR8
+
+_boundary: str = "nodiumframe"
+# a small send buffer makes a slow client block its own thread after a frame or two, at which
+# point it skips to the newest frame, instead of the kernel queueing up seconds of video for it
+_sendBufferBytes: int = 256 * 1024
+_page: bytes = (b"<!DOCTYPE html><html><head><title>NodiumPy</title></head>"
+                b"<body style=\"margin:0;background:#202020\">"
+                b"<img src=\"/stream\" style=\"max-width:100%;max-height:100vh\"></body></html>")
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    # one thread per client; every client waits for the frame that is newest when it is ready
+    # to send, so a slow client skips frames instead of queueing them
+    server: "_StreamHTTPServer"
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/":
+            self.__sendBytes(body=_page, contentType="text/html")
+        elif path == "/snapshot.jpg":
+            # a frame newer than the request if one comes soon, the last one otherwise, as the graph
+            # only sends frames when something changes
+            stream = self.server.stream
+            frame = stream.waitForFrame(after=stream.frameId, timeout=1) or stream.waitForFrame(after=0, timeout=5)
+            if frame is None:
+                self.send_error(HTTPStatus.SERVICE_UNAVAILABLE, "no frame yet")
+                return
+            self.__sendBytes(body=frame[1], contentType="image/jpeg")
+        elif path == "/stream":
+            self.__stream()
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def log_message(self, format, *args):
+        pass
+
+    def __sendBytes(self, body: bytes, contentType: str):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __stream(self):
+        stream = self.server.stream
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_boundary}")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _sendBufferBytes)
+        stream.addClient()
+        try:
+            frameId = 0
+            while True:
+                frame = stream.waitForFrame(after=frameId, timeout=1)
+                if frame is None:
+                    if stream.closed:
+                        return
+                    continue
+                if frameId and frame[0] > frameId + 1:
+                    stream.countSkipped(frame[0] - frameId - 1)
+                frameId, jpeg = frame
+                self.wfile.write(f"--{_boundary}\r\nContent-Type: image/jpeg\r\n"
+                                 f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (ConnectionError, OSError):
+            # the client went away
+            pass
+        finally:
+            stream.removeClient()
+
+
+class _StreamHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stream: "MJPEGServer"
+
+
+class MJPEGServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, quality: int = 80, maxWidth: int = 0):
+        """serve frames as an MJPEG stream over HTTP, for watching a graph from a browser
+
+        http://host:port/ shows the stream in a page, /stream is the multipart/x-mixed-replace stream
+        itself (for browsers, VLC, ffplay or cv2.VideoCapture) and /snapshot.jpg the latest frame.
+        A frame handed over with publish() is encoded once, on an encoder thread, whatever the
+        number of clients, and not at all while nobody is watching. The encoder and every client
+        always take the newest frame, so neither a slow encoder nor a slow client makes frames pile up.
+
+        Args:
+            host (str, optional): address to listen on, "0.0.0.0" for all interfaces. Defaults to "127.0.0.1".
+            port (int, optional): port to listen on, 0 for any free port. Defaults to 8080.
+            quality (int, optional): JPEG quality, 0-100. Defaults to 80.
+            maxWidth (int, optional): frames wider than this are downscaled before encoding, 0 for
+                no limit. Defaults to 0.
+
+        Raises:
+            OSError: if the address can't be listened on, e.g. when the port is taken
+        """
+        self.quality: int = quality
+        self.maxWidth: int = maxWidth
+        self._condition = threading.Condition()
+        # the frame waiting for the encoder, replaced when a newer one arrives first
+        self._pending: Union[np.ndarray, None] = None
+        self._frameId: int = 0
+        self._jpeg: Union[bytes, None] = None
+        self._clients: int = 0
+        self._waiters: int = 0
+        self._encoded: int = 0
+        self._dropped: int = 0
+        self._skipped: int = 0
+        self._closed: bool = False
+        self._server = _StreamHTTPServer((host, port), _StreamHandler)
+        self._server.stream = self
+        self._serverThread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._encoderThread = threading.Thread(target=self.__encodeLoop, daemon=True)
+        self._serverThread.start()
+        self._encoderThread.start()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}/"
+
+    @property
+    def frameId(self):
+        """number of the newest encoded frame, 0 before the first one"""
+        return self._frameId
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def clients(self):
+        """number of clients watching the stream"""
+        return self._clients
+
+    @property
+    def encoded(self):
+        return self._encoded
+
+    @property
+    def dropped(self):
+        """number of frames replaced by a newer one before the encoder got to them"""
+        return self._dropped
+
+    @property
+    def skipped(self):
+        """number of encoded frames clients missed because they were still sending an earlier one"""
+        return self._skipped
+
+    def publish(self, img: np.ndarray) -> bool:
+        """hand a float frame in the range 0-1 to the encoder without waiting
+
+        Args:
+            img (np.ndarray): RGBA, RGB or gray frame; it must not be modified afterwards
+
+        Returns:
+            bool: False if nobody watches and the frame was ignored
+        """
+        with self._condition:
+            if self._closed or (self._clients == 0 and self._waiters == 0):
+                return False
+            if self._pending is not None:
+                self._dropped += 1
+            self._pending = img
+            self._condition.notify_all()
+        return True
+
+    def waitForFrame(self, after: int, timeout: float) -> Union[tuple[int, bytes], None]:
+        """the newest encoded frame once its number is above `after`, None on timeout or when closed"""
+        with self._condition:
+            # frames are encoded while anyone waits for one
+            self._waiters += 1
+            try:
+                self._condition.wait_for(lambda: self._closed or (self._jpeg is not None and self._frameId > after),
+                                         timeout=timeout)
+            finally:
+                self._waiters -= 1
+            if self._closed or self._jpeg is None or self._frameId <= after:
+                return None
+            return self._frameId, self._jpeg
+
+    def addClient(self):
+        with self._condition:
+            self._clients += 1
+
+    def removeClient(self):
+        with self._condition:
+            self._clients -= 1
+
+    def countSkipped(self, frames: int):
+        with self._condition:
+            self._skipped += frames
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._encoderThread.join()
+
+    def __encodeLoop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._pending is not None)
+                if self._closed:
+                    return
+                img, self._pending = self._pending, None
+            size = None
+            width = img.shape[1]
+            if 0 < self.maxWidth < width:
+                size = (self.maxWidth, max(1, round(img.shape[0] * self.maxWidth / width)))
+            success, jpeg = cv2.imencode(ext=".jpg", img=toBGR8(img=img, size=size),
+                                         params=[cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not success:
+                continue
+            with self._condition:
+                self._frameId += 1
+                self._jpeg = jpeg.tobytes()
+                self._encoded += 1
+                self._condition.notify_all()
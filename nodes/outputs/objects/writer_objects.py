@@ -0,0 +1,415 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+
+def toBGR8(img: np.ndarray, size: Union[tuple[int, int], None] = None) -> np.ndarray:
+    """convert an RGBA (or RGB, or gray) float32 frame in the range 0-1 to uint8 BGR, optionally resized
+
+    Values outside 0-1 are clipped instead of wrapping around, and the frame is converted to 8 bits
+    before it is resized, so the resize touches a quarter of the bytes.
+
+    Args:
+        img (np.ndarray): float frame
+        size (tuple, optional): (width, height) of the result. Defaults to the frame's own.
+
+    Returns:
+        np.ndarray: contiguous uint8 BGR frame
+    """
+    if img.ndim == 2:
+        bgr = cv2.cvtColor(src=img, code=cv2.COLOR_GRAY2BGR)
+    elif img.shape[2] == 4:
+        bgr = cv2.cvtColor(src=img, code=cv2.COLOR_RGBA2BGR)
+    else:
+        bgr = cv2.cvtColor(src=img, code=cv2.COLOR_RGB2BGR)
+    np.clip(bgr, 0, 1, out=bgr)
+    bgr = cv2.convertScaleAbs(src=bgr, alpha=255)
+    if size is not None and (bgr.shape[1], bgr.shape[0]) != tuple(size):
+        interpolation = cv2.INTER_AREA if size[0] < bgr.shape[1] else cv2.INTER_LINEAR
+        bgr = cv2.resize(src=bgr, dsize=tuple(size), interpolation=interpolation)
+    return bgr
+
+
+def toImageArray(img: np.ndarray, depth: int = 8, alpha: bool = False) -> np.ndarray:
+    """convert a float frame in the range 0-1 to the BGR(A) integer array cv2.imwrite() expects
+
+    Args:
+        img (np.ndarray): RGBA, RGB or gray float frame
+        depth (int, optional): 8 for uint8, 16 for uint16. Defaults to 8.
+        alpha (bool, optional): whether to keep the alpha channel of an RGBA frame. Defaults to False.
+
+    Returns:
+        np.ndarray: BGR, BGRA or gray array of the given depth
+    """
+    if img.ndim == 2:
+        converted = img.astype(np.float32)
+    elif img.shape[2] == 4:
+        converted = cv2.cvtColor(src=img, code=cv2.COLOR_RGBA2BGRA if alpha else cv2.COLOR_RGBA2BGR)
+    else:
+        converted = cv2.cvtColor(src=img, code=cv2.COLOR_RGB2BGR)
+    np.clip(converted, 0, 1, out=converted)
+    if depth == 8:
+        return cv2.convertScaleAbs(src=converted, alpha=255)
+    if depth == 16:
+        converted *= 65535
+        converted += 0.5
+        return converted.astype(np.uint16)
+    raise ValueError(f"unsupported bit depth: {depth}")
+
+
+class ImageWriterPool:
+    def __init__(self, workers: Union[int, None] = None, queueSize: int = 8, dropWhenFull: bool = False):
+        """write images on a pool of encoder threads
+
+        At most queueSize images wait for or are in the hands of the encoders; write() waits for a
+        free place or drops the image when that many are pending. Conversion, encoding and the file
+        write all happen on the pool, and cv2 releases the GIL for them, so several PNGs compress at
+        once. Every image is written to a temporary name and renamed when complete, so a file that
+        exists under its final name is never half-written.
+
+        Args:
+            workers (int, optional): encoder threads. Defaults to the number of CPUs.
+            queueSize (int, optional): images that may be pending. Defaults to 8.
+            dropWhenFull (bool, optional): drop images instead of waiting when queueSize are pending. Defaults to False.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._slots = threading.Semaphore(value=max(1, queueSize))
+        self._dropWhenFull: bool = dropWhenFull
+        self._lock = threading.Lock()
+        self._pending: int = 0
+        self._written: int = 0
+        self._dropped: int = 0
+        self._failed: int = 0
+
+    @property
+    def dropWhenFull(self):
+        return self._dropWhenFull
+
+    @dropWhenFull.setter
+    def dropWhenFull(self, value: bool):
+        self._dropWhenFull = value
+
+    @property
+    def pending(self):
+        """number of images queued or being written"""
+        return self._pending
+
+    @property
+    def written(self):
+        return self._written
+
+    @property
+    def dropped(self):
+        """number of images dropped because queueSize were pending"""
+        return self._dropped
+
+    @property
+    def failed(self):
+        return self._failed
+
+    def write(self, filePath: Union[Path, str], img: np.ndarray, depth: int = 8, alpha: bool = False,
+              params: Union[list[int], None] = None) -> Union[Future, None]:
+        """queue a float frame to be written to filePath, the format follows its suffix
+
+        The frame must not be modified afterwards; the graph hands every node a fresh copy, so the
+        input data of a node can be passed as it is.
+
+        Args:
+            filePath (Path or str): image file to create
+            img (np.ndarray): RGBA, RGB or gray float frame in the range 0-1
+            depth (int, optional): 8 or 16 bits per channel. Defaults to 8.
+            alpha (bool, optional): whether to keep the alpha channel. Defaults to False.
+            params (list[int], optional): cv2.IMWRITE_* flags and values. Defaults to None.
+
+        Returns:
+            Future: resolves to True once the file is complete, None if the image was dropped
+        """
+        if not self._slots.acquire(blocking=not self._dropWhenFull):
+            self._dropped += 1
+            return None
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(self.__write, Path(filePath), img, depth, alpha, params or list())
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def __write(self, filePath: Path, img: np.ndarray, depth: int, alpha: bool, params: list[int]) -> bool:
+        partialPath = filePath.with_name(filePath.name + ".partial")
+        success = False
+        try:
+            success, encoded = cv2.imencode(ext=filePath.suffix, img=toImageArray(img=img, depth=depth, alpha=alpha),
+                                            params=params)
+            if success:
+                partialPath.write_bytes(encoded.data)
+                os.replace(partialPath, filePath)
+        except (OSError, cv2.error) as error:
+            print(f"can't write this image:\n{filePath}\n{error}")
+            success = False
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if success:
+                    self._written += 1
+                else:
+                    self._failed += 1
+            self._slots.release()
+        return success
+
+
+class VideoStreamWriter:
+    # put on the queue to make the encoder thread finish the file
+    _endOfStream = None
+
+    def __init__(self,
+                 filePath: Union[Path, str],
+                 fourcc: str,
+                 fps: float,
+                 size: tuple[int, int],
+                 queueSize: int = 32,
+                 dropWhenFull: bool = False):
+        """write a video file while it is being recorded, encoding on a thread of its own
+
+        The container is opened right away. write() converts a frame to uint8 BGR at the target size
+        and hands it to the encoder thread through a queue of at most queueSize frames, so memory
+        stays bounded however long the recording runs. When the encoder falls behind and the queue
+        is full, write() either waits for it or drops the frame.
+
+        Args:
+            filePath (Path or str): video file to create
+            fourcc (str): four character code of the codec, e.g. "mp4v"
+            fps (float): frame rate stored in the file
+            size (tuple): (width, height) of the video, frames of another size are resized
+            queueSize (int, optional): frames that may wait for the encoder. Defaults to 32.
+            dropWhenFull (bool, optional): drop frames instead of waiting when the queue is full. Defaults to False.
+        """
+        self._filePath: Path = Path(filePath)
+        self._size: tuple[int, int] = (int(size[0]), int(size[1]))
+        self._dropWhenFull: bool = dropWhenFull
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queueSize))
+        self._written: int = 0
+        self._dropped: int = 0
+        self._encodeTimes: deque[float] = deque(maxlen=30)
+        self._closed: bool = False
+        self._fourcc: str = fourcc
+        self._fps: float = fps
+        self._writer: cv2.VideoWriter = self._openFile(filePath=self._filePath)
+        self._thread = threading.Thread(target=self.__encodeLoop, daemon=True)
+        self._thread.start()
+
+    @property
+    def filePath(self):
+        return self._filePath
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def written(self):
+        """number of frames encoded so far"""
+        return self._written
+
+    @property
+    def dropped(self):
+        """number of frames dropped because the queue was full"""
+        return self._dropped
+
+    @property
+    def queued(self):
+        """number of frames waiting for the encoder"""
+        return self._queue.qsize()
+
+    @property
+    def fps(self):
+        """frames encoded per second over the last 30 frames, 0 while idle"""
+        times = list(self._encodeTimes)
+        if len(times) < 2 or time.perf_counter() - times[-1] > 1:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def isOpened(self) -> bool:
+        return self._writer.isOpened()
+
+    def write(self, img: np.ndarray) -> bool:
+        """queue a float RGBA frame for encoding
+
+        Returns:
+            bool: False if the frame was dropped or the writer is closed
+        """
+        if self._closed:
+            return False
+        frame = toBGR8(img=img, size=self._size)
+        try:
+            self._queue.put((time.perf_counter(), frame), block=not self._dropWhenFull)
+        except queue.Full:
+            self._dropped += 1
+            return False
+        return True
+
+    def close(self, wait: bool = True):
+        """finish the file after the queued frames are encoded
+
+        Args:
+            wait (bool, optional): whether to return only once the file is complete. Defaults to True.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._endOfStream)
+        if wait:
+            self._thread.join()
+
+    def _openFile(self, filePath: Path) -> cv2.VideoWriter:
+        return cv2.VideoWriter(str(filePath.resolve()), cv2.VideoWriter_fourcc(*self._fourcc), self._fps,
+                               self._size, True)
+
+    def _encode(self, timestamp: float, frame: np.ndarray):
+        """write one frame, called on the encoder thread with the time write() was called"""
+        self._writer.write(frame)
+
+    def _finish(self):
+        self._writer.release()
+
+    def __encodeLoop(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._endOfStream:
+                    return
+                self._encode(*item)
+                self._written += 1
+                self._encodeTimes.append(time.perf_counter())
+        finally:
+            self._finish()
+
+
+class SegmentedVideoWriter(VideoStreamWriter):
+    segmentUnits: tuple[str, ...] = ("seconds", "frames", "MB")
+
+    def __init__(self,
+                 filePath: Union[Path, str],
+                 fourcc: str,
+                 fps: float,
+                 size: tuple[int, int],
+                 segmentLength: float,
+                 segmentUnit: str = "seconds",
+                 keepSegments: int = 0,
+                 queueSize: int = 32,
+                 dropWhenFull: bool = False):
+        """a VideoStreamWriter that starts a new file every segmentLength seconds, frames or megabytes
+
+        Segments are named after filePath with a running number, e.g. rec_0000.mp4, rec_0001.mp4.
+        The encoder thread opens the next segment before the frame that crosses the limit and
+        releases the previous one on a short-lived thread of its own, so no frame is lost or held
+        up at a boundary and memory does not depend on how long the recording runs. Seconds are
+        counted between the write() calls of the frames, megabytes by the size of the file on disk.
+
+        Args:
+            filePath (Path or str): name the segment names are derived from
+            fourcc (str): four character code of the codec, e.g. "mp4v"
+            fps (float): frame rate stored in the files
+            size (tuple): (width, height) of the video
+            segmentLength (float): length of a segment in segmentUnit
+            segmentUnit (str, optional): "seconds", "frames" or "MB". Defaults to "seconds".
+            keepSegments (int, optional): number of most recent segments kept on disk, 0 keeps all. Defaults to 0.
+            queueSize (int, optional): frames that may wait for the encoder. Defaults to 32.
+            dropWhenFull (bool, optional): drop frames instead of waiting when the queue is full. Defaults to False.
+        """
+        if segmentUnit not in self.segmentUnits:
+            raise ValueError(f"unknown segment unit: {segmentUnit}")
+        self._basePath: Path = Path(filePath)
+        self._segmentLength: float = segmentLength
+        self._segmentUnit: str = segmentUnit
+        self._keepSegments: int = keepSegments
+        self._segmentIndex: int = 0
+        self._segmentFrames: int = 0
+        self._segmentStart: Union[float, None] = None
+        self._segments: deque[Path] = deque()
+        self._released: set[Path] = set()
+        self._segmentsLock = threading.Lock()
+        self._releasing: list[threading.Thread] = list()
+        super().__init__(filePath=self.__segmentPath(index=0), fourcc=fourcc, fps=fps, size=size,
+                         queueSize=queueSize, dropWhenFull=dropWhenFull)
+        with self._segmentsLock:
+            self._segments.append(self._filePath)
+
+    @property
+    def segmentIndex(self):
+        """number of the segment being written"""
+        return self._segmentIndex
+
+    def __segmentPath(self, index: int) -> Path:
+        return self._basePath.with_name(f"{self._basePath.stem}_{index:04d}{self._basePath.suffix}")
+
+    def __segmentFull(self, timestamp: float) -> bool:
+        if self._segmentFrames == 0:
+            return False
+        if self._segmentUnit == "frames":
+            return self._segmentFrames >= self._segmentLength
+        if self._segmentUnit == "seconds":
+            return timestamp - self._segmentStart >= self._segmentLength
+        # the container only grows in chunks, so the size is looked at every few frames
+        if self._segmentFrames % 8:
+            return False
+        try:
+            return self._filePath.stat().st_size >= self._segmentLength * 1024 ** 2
+        except OSError:
+            return False
+
+    def _encode(self, timestamp: float, frame: np.ndarray):
+        if self.__segmentFull(timestamp=timestamp):
+            self.__nextSegment()
+        if self._segmentFrames == 0:
+            self._segmentStart = timestamp
+        self._writer.write(frame)
+        self._segmentFrames += 1
+
+    def _finish(self):
+        self._writer.release()
+        for thread in self._releasing:
+            thread.join()
+        with self._segmentsLock:
+            self._released.add(self._filePath)
+        self.__dropOldSegments()
+
+    def __nextSegment(self):
+        previous, previousPath = self._writer, self._filePath
+        self._segmentIndex += 1
+        self._filePath = self.__segmentPath(index=self._segmentIndex)
+        self._writer = self._openFile(filePath=self._filePath)
+        self._segmentFrames = 0
+        with self._segmentsLock:
+            self._segments.append(self._filePath)
+        # finishing a file can take a while, the next segment does not wait for it
+        self._releasing = [thread for thread in self._releasing if thread.is_alive()]
+        thread = threading.Thread(target=self.__releaseSegment, args=(previous, previousPath), daemon=True)
+        self._releasing.append(thread)
+        thread.start()
+
+    def __releaseSegment(self, writer: cv2.VideoWriter, filePath: Path):
+        writer.release()
+        with self._segmentsLock:
+            self._released.add(filePath)
+        self.__dropOldSegments()
+
+    def __dropOldSegments(self):
+        if self._keepSegments <= 0:
+            return
+        # the segment being written counts as one of the kept ones, a segment still being released is
+        # deleted by the thread that releases it
+        with self._segmentsLock:
+            while len(self._segments) > self._keepSegments and self._segments[0] in self._released:
+                filePath = self._segments.popleft()
+                self._released.discard(filePath)
+                try:
+                    filePath.unlink(missing_ok=True)
+                except OSError as error:
+                    print(f"can't delete an old segment: {error}")
@@ -1,3 +1,6 @@
+import time
+from typing import Union
+
 import cv2
 import dearpygui.dearpygui as dpg
 import numpy as np
@@ -5,6 +8,7 @@ import numpy as np
 from node_editor.connection_objects import NodeAttribute, AttributeType
 from node_editor.editor import NodeEditor
 from nodes.node import NodeBase
+from nodes.viewers.objects.preview_objects import createPreviewBuffer, renderPreview
 
 
 class Node(NodeBase):
@@ -22,7 +26,15 @@ class Node(NodeBase):
         self._currentWidth: int = self._baseWidth * 2
         self._currentHeight: int = self._baseHeight * 2
 
-        self._currentImage: np.ndarray = np.zeros(shape=(2, 2))
+        self._currentImage: Union[np.ndarray, None] = None
+        self._shownVersion: int = 0
+        self._lastUploadTime: float = 0
+        # the preview is drawn at most at the rate the window is redrawn
+        self._uploadInterval: float = 1 / self.settings.displayRefreshRate
+        # raw textures read straight from the buffer they were given; two buffers are taken in
+        # turns so the one on screen is not drawn into
+        self._previews: list[np.ndarray] = list()
+        self._previewIndex: int = 0
 
         self._attrImageInput = NodeAttribute(tag=editorHandle.getUniqueTag(),
                                              parentNodeTag=self._tag,
@@ -41,15 +53,7 @@ class Node(NodeBase):
         self._customWidthInputTag: int = editorHandle.getUniqueTag()
         self._customHeightInputTag: int = editorHandle.getUniqueTag()
 
-        background = np.zeros(shape=(self._currentWidth, self._currentHeight, 4), dtype=np.float32)
-        background[:, :, 3] = 1
-        background = background.ravel()
-        with dpg.texture_registry(show=False):
-            dpg.add_raw_texture(width=self._currentWidth,
-                                height=self._currentHeight,
-                                default_value=background,
-                                tag=self._previewTextureTag,
-                                format=dpg.mvFormat_Float_rgba)
+        self.__createPreviewTexture()
 
         editorHandle.createSaveImageDialog(tag=self._saveImageDialogTag,
                                            callback=self.__callbackSaveImage)
@@ -98,15 +102,19 @@ class Node(NodeBase):
 
     def update(self):
         data = self._attrImageInput.data
-        if data is None:
-            return
-        if np.array_equal(a1=data, a2=self._currentImage):
+        if data is None or self._attrImageInput.version == self._shownVersion:
             return
         if self._editor.paused:
             return
-        self._currentImage = data.copy()
-        previewImg = cv2.resize(src=data, dsize=(self._currentWidth, self._currentHeight))
-        dpg.set_value(item=self._previewTextureTag, value=previewImg.ravel())
+        now = time.perf_counter()
+        if now - self._lastUploadTime < self._uploadInterval:
+            # the newest version is shown on a later tick
+            return
+        self._lastUploadTime = now
+        self._shownVersion = self._attrImageInput.version
+        # every version arrives in an array of its own, so keeping a reference is enough
+        self._currentImage = data
+        self.__uploadPreview()
 
     def close(self):
         dpg.delete_item(item=self._tag)
@@ -166,23 +174,27 @@ class Node(NodeBase):
         dpg.set_item_width(item=self._previewImageTag, width=self._currentWidth)
         dpg.set_item_height(item=self._previewImageTag, height=self._currentHeight)
         dpg.delete_item(self._previewTextureTag)
-        background = np.zeros(shape=(self._currentWidth, self._currentHeight, 4), dtype=np.float32)
-        background[:, :, 3] = 1
-        background = background.ravel()
+        self.__createPreviewTexture()
+        dpg.configure_item(item=self._previewImageTag, texture_tag=self._previewTextureTag)
+        if self._currentImage is not None:
+            self.__uploadPreview()
+        self._editor.resume()
+
+    def __createPreviewTexture(self):
+        self._previews = [createPreviewBuffer(width=self._currentWidth, height=self._currentHeight)
+                          for _ in range(2)]
+        self._previewIndex = 0
         with dpg.texture_registry(show=False):
             dpg.add_raw_texture(width=self._currentWidth,
                                 height=self._currentHeight,
-                                default_value=background,
+                                default_value=self._previews[0].ravel(),
                                 tag=self._previewTextureTag,
                                 format=dpg.mvFormat_Float_rgba)
-        dpg.configure_item(item=self._previewImageTag, texture_tag=self._previewTextureTag)
-        if self._attrImageInput.data is None:
-            self._editor.resume()
-            return
-        img = self._currentImage.copy()
-        previewImg = cv2.resize(src=img, dsize=(self._currentWidth, self._currentHeight))
-        dpg.set_value(item=self._previewTextureTag, value=previewImg.ravel())
-        self._editor.resume()
+
+    def __uploadPreview(self):
+        self._previewIndex = 1 - self._previewIndex
+        preview = renderPreview(img=self._currentImage, out=self._previews[self._previewIndex])
+        dpg.set_value(item=self._previewTextureTag, value=preview.ravel())
 
     def __callbackShowSaveFileDialog(self):
         self._editor.pause()
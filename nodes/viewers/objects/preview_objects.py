@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+
+
+def createPreviewBuffer(width: int, height: int) -> np.ndarray:
+    """an opaque black RGBA float32 buffer, the layout Dear PyGui raw textures read"""
+    buffer = np.zeros(shape=(height, width, 4), dtype=np.float32)
+    buffer[:, :, 3] = 1
+    return buffer
+
+
+def renderPreview(img: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """downscale a frame into a preview buffer without allocating a full-size intermediate
+
+    INTER_AREA averages every source pixel, so a fine pattern does not alias into moire as it does
+    with the default linear interpolation, and it is several times faster for whole scale factors
+    than for fractional ones. The frame is therefore reduced by the largest whole factor with
+    INTER_AREA first, and the remaining less-than-2x step is interpolated linearly into `out`.
+
+    Args:
+        img (np.ndarray): RGBA, RGB or gray frame
+        out (np.ndarray): RGBA float32 buffer of the preview size, see createPreviewBuffer()
+
+    Returns:
+        np.ndarray: `out`
+    """
+    height, width = out.shape[:2]
+    factor = min(img.shape[1] // width, img.shape[0] // height)
+    if factor >= 2:
+        img = cv2.resize(src=img,
+                         dsize=(img.shape[1] // factor, img.shape[0] // factor),
+                         interpolation=cv2.INTER_AREA)
+    if img.dtype != np.float32:
+        img = img.astype(np.float32)
+    if img.ndim == 3 and img.shape[2] == 4:
+        cv2.resize(src=img, dsize=(width, height), dst=out, interpolation=cv2.INTER_LINEAR)
+        return out
+    resized = cv2.resize(src=img, dsize=(width, height), interpolation=cv2.INTER_LINEAR)
+    code = cv2.COLOR_GRAY2RGBA if resized.ndim == 2 else cv2.COLOR_RGB2RGBA
+    cv2.cvtColor(src=resized, code=code, dst=out)
+    return out
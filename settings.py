@@ -37,6 +37,11 @@ class AppSettings:
         self._outputDirPath: Path = self.CacheDirPath.joinpath("viewers")
         self._outputDirPath.mkdir(parents=True, exist_ok=True)
         self._treeUpdateInterval: float = 0.1
+        self._phycvBackend: str = "numpy"
+        self._videoDecoderBackend: str = "opencv"
+        self._videoDecoderThreads: int = 0
+        self._decodedImageCacheBudget: int = 4 * 1024 ** 3
+        self._displayRefreshRate: int = 30
 
     @property
     def windowWidth(self):
@@ -150,6 +155,46 @@ class AppSettings:
     def useGPU(self, value: bool):
         self._useGPU = value
 
+    @property
+    def phycvBackend(self):
+        return self._phycvBackend
+
+    @phycvBackend.setter
+    def phycvBackend(self, value: str):
+        self._phycvBackend = value
+
+    @property
+    def videoDecoderBackend(self):
+        return self._videoDecoderBackend
+
+    @videoDecoderBackend.setter
+    def videoDecoderBackend(self, value: str):
+        self._videoDecoderBackend = value
+
+    @property
+    def videoDecoderThreads(self):
+        return self._videoDecoderThreads
+
+    @videoDecoderThreads.setter
+    def videoDecoderThreads(self, value: int):
+        self._videoDecoderThreads = value
+
+    @property
+    def decodedImageCacheBudget(self):
+        return self._decodedImageCacheBudget
+
+    @decodedImageCacheBudget.setter
+    def decodedImageCacheBudget(self, value: int):
+        self._decodedImageCacheBudget = value
+
+    @property
+    def displayRefreshRate(self):
+        return self._displayRefreshRate
+
+    @displayRefreshRate.setter
+    def displayRefreshRate(self, value: int):
+        self._displayRefreshRate = value
+
     @property
     def treeUpdateInterval(self):
         return self._treeUpdateInterval
@@ -187,6 +232,11 @@ class AppSettings:
             self._usePrefCounter = data["usePrefCounter"]
             self._drawInfoOnResult = data["drawInfoOnResult"]
             self._outputDirPath = Path(data["outputDirPath"])
+            self._phycvBackend = data["phycvBackend"]
+            self._videoDecoderBackend = data["videoDecoderBackend"]
+            self._videoDecoderThreads = data["videoDecoderThreads"]
+            self._decodedImageCacheBudget = data["decodedImageCacheBudget"]
+            self._displayRefreshRate = data["displayRefreshRate"]
 
         except KeyError:
             self.updateSettingsFile()
@@ -204,7 +254,12 @@ class AppSettings:
                     videoWriterFPS=self._videoWriterFPS,
                     usePrefCounter=self._usePrefCounter,
                     drawInfoOnResult=self._drawInfoOnResult,
-                    outputDirPath=str(self._outputDirPath.resolve()))
+                    outputDirPath=str(self._outputDirPath.resolve()),
+                    phycvBackend=self._phycvBackend,
+                    videoDecoderBackend=self._videoDecoderBackend,
+                    videoDecoderThreads=self._videoDecoderThreads,
+                    decodedImageCacheBudget=self._decodedImageCacheBudget,
+                    displayRefreshRate=self._displayRefreshRate)
         jstring = json.dumps(data, ensure_ascii=False, indent=4)
         self.SettingsFilePath.write_text(data=jstring, encoding="utf-8")
 
@@ -0,0 +1,58 @@
+"""compare the decoding speed of the video decoder backends
+
+decode fps per backend, thread count and file, e.g. for the same clip at several resolutions,
+run from the repository root:
+    python -m tools.benchmark_decoders clip_480p.mp4 clip_1080p.mp4 --threads 0 1 4
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+from nodes.inputs.objects.decoder_backends import availableDecoderBackends, createDecoderBackend
+
+
+def measureDecodeFps(filePath: Union[Path, str], name: str = "opencv", threads: int = 0,
+                     maxFrames: int = 500) -> Union[float, None]:
+    """decode up to maxFrames frames to BGR and return the decoding rate in frames per second,
+    None if the backend can't open the file
+    """
+    backend = createDecoderBackend(name=name, filePath=filePath, threads=threads)
+    if not backend.isOpened():
+        backend.release()
+        return None
+    image = np.empty(shape=(backend.frameHeight, backend.frameWidth, 3), dtype=np.uint8)
+    try:
+        decoded = 0
+        start = time.perf_counter()
+        while decoded < maxFrames and backend.read(image=image)[0]:
+            decoded += 1
+        return decoded / (time.perf_counter() - start)
+    finally:
+        backend.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare the decoding speed of the video decoder backends")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--backends", nargs="+", default=availableDecoderBackends())
+    parser.add_argument("--threads", nargs="+", type=int, default=[0])
+    parser.add_argument("--frames", type=int, default=500)
+    args = parser.parse_args()
+    print(f"{'file':<32}{'resolution':>12}{'backend':>20}{'threads':>9}{'fps':>10}")
+    for file in args.files:
+        probe = cv2.VideoCapture(file)
+        resolution = f"{int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))}"
+        probe.release()
+        for backendName in args.backends:
+            for threadCount in args.threads:
+                fps = measureDecodeFps(filePath=file, name=backendName, threads=threadCount, maxFrames=args.frames)
+                fps = f"{fps:.1f}" if fps is not None else "-"
+                print(f"{Path(file).name:<32}{resolution:>12}{backendName:>20}{threadCount:>9}{fps:>10}")
+
+
+if __name__ == '__main__':
+    main()